@@ -1,11 +1,33 @@
 from django.contrib import admin
 from django.contrib.admin import SimpleListFilter
 from django.utils import timezone
-from django.http import HttpResponse
-import csv
-import json
 from datetime import timedelta
+from . import exportacao
 from .models import InteressadoAdocao, LocalAdocao, Pet, SolicitacaoAdocao, TwoFactorAuth, AceitacaoTermos, UserLoginAttempt, AuditLog
+
+
+class ExportacaoAdminMixin:
+    """Ações de exportação em fluxo (core.exportacao) dos registros selecionados."""
+    especificacao_exportacao = None
+    actions = ['exportar_csv', 'exportar_csv_gz', 'exportar_ndjson', 'exportar_ndjson_gz']
+
+    def exportar_csv(self, request, queryset):
+        return exportacao.resposta(queryset, self.especificacao_exportacao, 'csv')
+    exportar_csv.short_description = 'Exportar selecionados como CSV'
+
+    def exportar_csv_gz(self, request, queryset):
+        return exportacao.resposta(queryset, self.especificacao_exportacao, 'csv', compactar=True)
+    exportar_csv_gz.short_description = 'Exportar selecionados como CSV compactado (gzip)'
+
+    def exportar_ndjson(self, request, queryset):
+        return exportacao.resposta(queryset, self.especificacao_exportacao, 'ndjson')
+    exportar_ndjson.short_description = 'Exportar selecionados como NDJSON'
+
+    def exportar_ndjson_gz(self, request, queryset):
+        return exportacao.resposta(queryset, self.especificacao_exportacao, 'ndjson', compactar=True)
+    exportar_ndjson_gz.short_description = 'Exportar selecionados como NDJSON compactado (gzip)'
+
+
 # Admin para tentativas de login
 @admin.register(UserLoginAttempt)
 class UserLoginAttemptAdmin(admin.ModelAdmin):
@@ -44,7 +66,8 @@ class LocalAdocaoAdmin(admin.ModelAdmin):
     readonly_fields = ['data_criacao']
 
 @admin.register(Pet)
-class PetAdmin(admin.ModelAdmin):
+class PetAdmin(ExportacaoAdminMixin, admin.ModelAdmin):
+    especificacao_exportacao = exportacao.PETS
     list_display = ['nome', 'especie', 'idade', 'sexo', 'status', 'local_adocao', 'data_cadastro']
     list_filter = ['especie', 'sexo', 'porte', 'status', 'castrado', 'vacinado', 'data_cadastro']
     search_fields = ['nome', 'raca', 'local_adocao__usuario__username', 'local_adocao__nome_fantasia']
@@ -79,7 +102,8 @@ class PetAdmin(admin.ModelAdmin):
     )
 
 @admin.register(SolicitacaoAdocao)
-class SolicitacaoAdocaoAdmin(admin.ModelAdmin):
+class SolicitacaoAdocaoAdmin(ExportacaoAdminMixin, admin.ModelAdmin):
+    especificacao_exportacao = exportacao.SOLICITACOES
     list_display = ['pet', 'interessado', 'status', 'data_solicitacao', 'data_resposta']
     list_filter = ['status', 'data_solicitacao', 'pet__especie']
     search_fields = ['pet__nome', 'interessado__usuario__username', 'interessado__usuario__first_name']
@@ -129,7 +153,8 @@ class AceitacaoTermosAdmin(admin.ModelAdmin):
 
 
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
+class AuditLogAdmin(ExportacaoAdminMixin, admin.ModelAdmin):
+    especificacao_exportacao = exportacao.AUDITLOG
     list_display = ['criado_em', 'usuario', 'metodo', 'caminho', 'status_code', 'duracao_ms']
     search_fields = ['caminho', 'view_name', 'usuario__username', 'mensagem', 'ip', 'user_agent']
     readonly_fields = ['criado_em']
@@ -185,29 +210,3 @@ class AuditLogAdmin(admin.ModelAdmin):
             return queryset
 
     list_filter = ['metodo', 'status_code', StatusClassFilter, PeriodoFilter, 'criado_em']
-
-    actions = ['exportar_csv']
-
-    def exportar_csv(self, request, queryset):
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="auditlog.csv"'
-        writer = csv.writer(response)
-        headers = ['criado_em', 'usuario', 'metodo', 'caminho', 'view_name', 'status_code', 'ip', 'user_agent', 'params', 'body', 'mensagem', 'duracao_ms']
-        writer.writerow(headers)
-        for obj in queryset.iterator():
-            writer.writerow([
-                timezone.localtime(obj.criado_em).strftime('%Y-%m-%d %H:%M:%S') if obj.criado_em else '',
-                obj.usuario.username if obj.usuario else '',
-                obj.metodo,
-                obj.caminho,
-                obj.view_name,
-                obj.status_code,
-                obj.ip or '',
-                (obj.user_agent or '')[:200],
-                json.dumps(obj.params, ensure_ascii=False)[:10000] if obj.params is not None else '{}',
-                json.dumps(obj.body, ensure_ascii=False)[:10000] if obj.body is not None else '{}',
-                (obj.mensagem or '')[:10000],
-                obj.duracao_ms,
-            ])
-        return response
-    exportar_csv.short_description = 'Exportar selecionados como CSV'
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .geo import registrar_funcoes_sqlite
+        connection_created.connect(registrar_funcoes_sqlite, dispatch_uid='core_registrar_funcoes_sqlite')
+        from django.db.models.signals import post_migrate
+        from .busca import garantir_indice_pos_migracao
+        post_migrate.connect(garantir_indice_pos_migracao, sender=self, dispatch_uid='core_indice_busca')
+        from . import signals  # noqa: F401
@@ -0,0 +1,150 @@
+# Gravação do AuditLog fora do caminho da requisição: fila em memória e inserções em lote
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class GravadorAuditoria:
+    """Acumula registros numa fila limitada e os grava com bulk_create numa thread própria.
+
+    A thread grava quando a fila junta AUDITLOG_LOTE registros ou a cada
+    AUDITLOG_INTERVALO segundos, o que vier antes. Com a fila cheia (banco lento ou
+    fora do ar) o registro é descartado e contado em `descartados`: a requisição nunca
+    espera o banco. No encerramento do processo o que estiver na fila é gravado.
+    Com AUDITLOG_ASYNC=False (testes) cada registro é gravado na hora.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fila = None
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._acordar = threading.Event()
+        self.descartados = 0
+        self.gravados = 0
+        self.falhas = 0
+        atexit.register(self.parar)
+
+    @staticmethod
+    def habilitado():
+        return getattr(settings, 'AUDITLOG_ASYNC', False)
+
+    def _garantir(self):
+        # Após um fork (workers do gunicorn com --preload) a thread não existe no filho
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._fila = queue.Queue(maxsize=getattr(settings, 'AUDITLOG_FILA_MAXIMA', 10000))
+            self._parar.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar, name='auditlog-gravador', daemon=True)
+            self._thread.start()
+
+    def registrar(self, **campos):
+        """Enfileira um AuditLog com os campos dados (a hora do registro é a da chamada)."""
+        campos.setdefault('criado_em', timezone.now())
+        if not self.habilitado():
+            AuditLog.objects.create(**campos)
+            return
+        self._garantir()
+        try:
+            self._fila.put_nowait(AuditLog(**campos))
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+                descartados = self.descartados
+            if descartados == 1 or descartados % 1000 == 0:
+                logger.warning('Fila do AuditLog cheia: %s registros descartados até agora', descartados)
+            return
+        if self._fila.qsize() >= getattr(settings, 'AUDITLOG_LOTE', 200):
+            self._acordar.set()
+
+    def _executar(self):
+        intervalo = getattr(settings, 'AUDITLOG_INTERVALO', 2.0)
+        try:
+            while not self._parar.is_set():
+                self._acordar.wait(intervalo)
+                self._acordar.clear()
+                self.descarregar()
+            self.descarregar()
+        finally:
+            connection.close()
+
+    def descarregar(self):
+        """Grava em lotes tudo o que está na fila agora; retorna quantos registros gravou."""
+        fila = self._fila
+        if fila is None:
+            return 0
+        tamanho = getattr(settings, 'AUDITLOG_LOTE', 200)
+        total = 0
+        while True:
+            lote = []
+            while len(lote) < tamanho:
+                try:
+                    lote.append(fila.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return total
+            close_old_connections()
+            try:
+                AuditLog.objects.bulk_create(lote)
+                gravados = len(lote)
+            except Exception:
+                # Um registro ruim não leva o lote junto: regrava um a um
+                logger.warning('Falha ao gravar lote de %s registros do AuditLog; regravando um a um', len(lote), exc_info=True)
+                gravados = sum(self._gravar_um(registro) for registro in lote)
+            total += gravados
+            with self._lock:
+                self.gravados += gravados
+                self.falhas += len(lote) - gravados
+
+    @staticmethod
+    def _gravar_um(registro):
+        """Grava um registro; se o usuário sumiu (excluído antes da gravação) grava sem ele."""
+        try:
+            with transaction.atomic():
+                registro.save(force_insert=True)
+            return True
+        except IntegrityError:
+            if registro.usuario_id is None:
+                logger.exception('Registro do AuditLog descartado: %s %s', registro.metodo, registro.caminho)
+                return False
+            registro.usuario_id = None
+            return GravadorAuditoria._gravar_um(registro)
+        except Exception:
+            logger.exception('Registro do AuditLog descartado: %s %s', registro.metodo, registro.caminho)
+            return False
+
+    def parar(self, timeout=10):
+        """Encerra a thread gravando o que estiver pendente (chamado também no atexit)."""
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        self._parar.set()
+        self._acordar.set()
+        thread.join(timeout)
+
+    def estatisticas(self):
+        return {
+            'pendentes': self._fila.qsize() if self._fila is not None else 0,
+            'gravados': self.gravados,
+            'descartados': self.descartados,
+            'falhas': self.falhas,
+        }
+
+
+gravador = GravadorAuditoria()
@@ -0,0 +1,232 @@
+# Autocompletar de raças e nomes de pets por trie de prefixos em memória
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Pet
+from .trigramas import normalizar
+
+CAMPOS = ('raca', 'nome')
+# Quantas conclusões cada nó guarda prontas (limite máximo da API)
+TOPO = 10
+
+
+class _No:
+    __slots__ = ('filhos', 'terminais', 'topo', 'sujo')
+
+    def __init__(self):
+        self.filhos = {}
+        self.terminais = set()  # chaves que terminam neste nó
+        self.topo = []  # até TOPO chaves da subárvore, da mais frequente
+        self.sujo = False
+
+
+class Trie:
+    """Trie dos valores distintos de um campo, com as conclusões mais frequentes por nó.
+
+    Cada valor é inserido pela forma normalizada (sem acento, minúscula) e também a
+    partir de cada palavra ("retr" encontra "Golden Retriever"). Um aumento de
+    frequência atualiza o topo dos nós do caminho; uma redução só marca o nó como sujo
+    e o topo é recalculado pela subárvore na próxima consulta a ele.
+    """
+
+    def __init__(self):
+        self.raiz = _No()
+        self.contagem = Counter()  # chave -> quantidade de pets
+        self.grafias = {}  # chave -> Counter(grafias originais)
+
+    @staticmethod
+    def _variantes(chave):
+        palavras = chave.split()
+        return {' '.join(palavras[i:]) for i in range(len(palavras))}
+
+    def _ordem(self, chave):
+        return (-self.contagem[chave], chave)
+
+    def alterar(self, valor, delta):
+        chave = normalizar(valor)
+        if not chave:
+            return
+        self.contagem[chave] += delta
+        grafias = self.grafias.setdefault(chave, Counter())
+        grafias[valor] += delta
+        if grafias[valor] <= 0:
+            del grafias[valor]
+        removida = self.contagem[chave] <= 0
+        if removida:
+            del self.contagem[chave]
+            del self.grafias[chave]
+        for variante in self._variantes(chave):
+            caminho = [self.raiz]
+            for letra in variante:
+                no = caminho[-1].filhos.get(letra)
+                if no is None:
+                    if delta < 0:
+                        break
+                    no = caminho[-1].filhos[letra] = _No()
+                caminho.append(no)
+            else:
+                if removida:
+                    caminho[-1].terminais.discard(chave)
+                else:
+                    caminho[-1].terminais.add(chave)
+                for no in caminho:
+                    self._atualizar_topo(no, chave, delta, removida)
+                if removida:
+                    self._podar(variante, caminho)
+
+    def _atualizar_topo(self, no, chave, delta, removida):
+        if delta < 0:
+            if chave in no.topo:
+                no.sujo = True
+            return
+        if chave not in no.topo:
+            if len(no.topo) >= TOPO and self._ordem(chave) > self._ordem(no.topo[-1]):
+                return
+            no.topo.append(chave)
+        no.topo.sort(key=self._ordem)
+        del no.topo[TOPO:]
+
+    @staticmethod
+    def _podar(variante, caminho):
+        for letra, pai, no in zip(reversed(variante), reversed(caminho[:-1]), reversed(caminho[1:])):
+            if no.filhos or no.terminais:
+                break
+            del pai.filhos[letra]
+
+    def _recalcular(self, no):
+        chaves, pilha = set(), [no]
+        while pilha:
+            atual = pilha.pop()
+            chaves.update(atual.terminais)
+            pilha.extend(atual.filhos.values())
+        no.topo = sorted(chaves, key=self._ordem)[:TOPO]
+        no.sujo = False
+
+    def sugerir(self, prefixo, limite=TOPO):
+        no = self.raiz
+        for letra in normalizar(prefixo):
+            no = no.filhos.get(letra)
+            if no is None:
+                return []
+        if no.sujo:
+            self._recalcular(no)
+        return [(self.grafias[chave].most_common(1)[0][0], self.contagem[chave]) for chave in no.topo[:limite]]
+
+
+class Autocompletar:
+    """Uma trie por campo com os pets disponíveis, mantida pelos sinais de Pet (core.signals)."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tries = None
+        self._pets = {}  # id do pet -> {campo: valor} contado nas tries
+        self._construido_em = None
+
+    @staticmethod
+    def habilitado():
+        return getattr(settings, 'AUTOCOMPLETAR_ENABLED', False)
+
+    @property
+    def construido(self):
+        return self._tries is not None
+
+    def invalidar(self):
+        with self._lock:
+            self._tries = None
+            self._pets = {}
+            self._construido_em = None
+
+    def reconstruir(self):
+        linhas = Pet.objects.disponiveis().order_by().values_list('id', *CAMPOS)
+        with self._lock:
+            self._tries = {campo: Trie() for campo in CAMPOS}
+            self._pets = {}
+            for pet_id, *valores in linhas:
+                self._somar(pet_id, dict(zip(CAMPOS, valores)))
+            self._construido_em = time.monotonic()
+
+    def _garantir(self):
+        ttl = getattr(settings, 'AUTOCOMPLETAR_TTL', 300)
+        if self._tries is None or (ttl and time.monotonic() - self._construido_em > ttl):
+            self.reconstruir()
+
+    def _somar(self, pet_id, registro):
+        for campo, valor in registro.items():
+            if valor:
+                self._tries[campo].alterar(valor, 1)
+        self._pets[pet_id] = registro
+
+    def _subtrair(self, pet_id):
+        registro = self._pets.pop(pet_id, None)
+        for campo, valor in (registro or {}).items():
+            if valor:
+                self._tries[campo].alterar(valor, -1)
+
+    # ---- atualização incremental ----
+
+    def atualizar_pet(self, pet):
+        if not self.construido:
+            return
+        with self._lock:
+            if self._tries is None:
+                return
+            registro = {campo: getattr(pet, campo) for campo in CAMPOS}
+            if self._pets.get(pet.pk) == registro and pet.status == 'disponivel' and pet.ativo:
+                return
+            self._subtrair(pet.pk)
+            if pet.status == 'disponivel' and pet.ativo:
+                self._somar(pet.pk, registro)
+
+    def remover(self, pet_id):
+        with self._lock:
+            if self._tries is not None:
+                self._subtrair(pet_id)
+
+    # ---- consulta ----
+
+    def sugerir(self, prefixo, campo, limite=TOPO):
+        """[(valor, quantidade)] que começam por `prefixo` (ou por uma palavra que começa)."""
+        with self._lock:
+            self._garantir()
+            return self._tries[campo].sugerir(prefixo, limite)
+
+
+autocompletar = Autocompletar()
+
+
+def _sugerir_no_banco(prefixo, campo, limite):
+    """[(valor, quantidade)] por GROUP BY: o valor ou uma palavra dele começa pelo prefixo.
+
+    Usado com a trie desligada; distingue acentos e agrupa pela grafia exata.
+    """
+    linhas = (
+        Pet.objects.disponiveis()
+        .filter(Q(**{f'{campo}__istartswith': prefixo}) | Q(**{f'{campo}__icontains': f' {prefixo}'}))
+        .order_by().values(campo).annotate(quantidade=Count('id'))
+        .order_by('-quantidade', campo)[:limite]
+    )
+    return [(linha[campo], linha['quantidade']) for linha in linhas]
+
+
+def sugerir(prefixo, campos=CAMPOS, limite=TOPO):
+    """Conclusões de raça/nome para o prefixo, das mais frequentes às menos.
+
+    Retorna [{'campo', 'valor', 'quantidade'}].
+    """
+    prefixo = prefixo.strip()
+    if autocompletar.habilitado():
+        consultar = autocompletar.sugerir
+    else:
+        consultar = _sugerir_no_banco
+    resultados = [
+        {'campo': campo, 'valor': valor, 'quantidade': quantidade}
+        for campo in campos
+        for valor, quantidade in consultar(prefixo, campo, limite)
+        if valor
+    ]
+    resultados.sort(key=lambda item: (-item['quantidade'], item['valor']))
+    return resultados[:limite]
@@ -0,0 +1,133 @@
+# Busca textual indexada de pets (Postgres: tsvector + GIN; SQLite: FTS5)
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABELA = 'core_pet'
+CAMPOS = ('nome', 'raca', 'cor', 'descricao', 'cuidados_especiais')
+# Peso de cada campo na relevância: nome/raça valem mais que a descrição
+PESOS_PG = {'nome': 'A', 'raca': 'A', 'cor': 'B', 'descricao': 'C', 'cuidados_especiais': 'C'}
+PESOS_FTS5 = (10.0, 8.0, 4.0, 1.0, 1.0)
+
+INDICE_PG = 'core_pet_busca_gin'
+TABELA_FTS = 'core_pet_fts'
+
+
+def _vetor_pg(prefixo=''):
+    """Expressão tsvector (português). Índice e consultas usam exatamente a mesma expressão."""
+    partes = [
+        f"setweight(to_tsvector('portuguese'::regconfig, COALESCE({prefixo}{campo}, '')), '{peso}')"
+        for campo, peso in PESOS_PG.items()
+    ]
+    return '(' + ' || '.join(partes) + ')'
+
+
+# ------------------ Criação/manutenção do índice ------------------
+
+def _sql_sqlite():
+    colunas = ', '.join(CAMPOS)
+    novos = ', '.join(f'new.{campo}' for campo in CAMPOS)
+    antigos = ', '.join(f'old.{campo}' for campo in CAMPOS)
+    remover = f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, {colunas}) VALUES ('delete', old.id, {antigos});"
+    inserir = f"INSERT INTO {TABELA_FTS}(rowid, {colunas}) VALUES (new.id, {novos});"
+    return [
+        # Tabela de conteúdo externo: o texto fica só em core_pet, o FTS5 guarda o índice invertido
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5({colunas}, content='{TABELA}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON {TABELA} BEGIN {inserir} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON {TABELA} BEGIN {remover} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE OF {colunas} ON {TABELA} BEGIN {remover} {inserir} END",
+    ]
+
+
+def garantir_indice(conexao=None):
+    """Cria o índice de busca do banco atual se ele não existir (idempotente).
+
+    No SQLite também recria os gatilhos, que somem quando uma migração reconstrói
+    a tabela core_pet, e repovoa o índice nesse caso.
+    """
+    conexao = conexao or connection
+    with conexao.cursor() as cursor:
+        if conexao.vendor == 'postgresql':
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {INDICE_PG} ON {TABELA} USING gin ({_vetor_pg()})")
+        elif conexao.vendor == 'sqlite':
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{TABELA_FTS}_%'])
+            gatilhos = cursor.fetchone()[0]
+            for sql in _sql_sqlite():
+                cursor.execute(sql)
+            if gatilhos < 3:
+                cursor.execute(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')")
+
+
+def remover_indice(conexao=None):
+    conexao = conexao or connection
+    with conexao.cursor() as cursor:
+        if conexao.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {INDICE_PG}")
+        elif conexao.vendor == 'sqlite':
+            for sufixo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {TABELA_FTS}_{sufixo}")
+            cursor.execute(f"DROP TABLE IF EXISTS {TABELA_FTS}")
+
+
+def garantir_indice_pos_migracao(sender, using='default', **kwargs):
+    """Handler de post_migrate: mantém o índice íntegro após migrações posteriores."""
+    from django.db import connections
+    garantir_indice(connections[using])
+
+
+# ------------------ Consulta ------------------
+
+def _termos(texto):
+    return re.findall(r'\w+', texto.lower())
+
+
+def _consulta_fts5(texto):
+    """Consulta FTS5 segura: cada termo vira um prefixo entre aspas (E implícito).
+
+    Sem stemmer português no FTS5, o plural simples é removido e o prefixo cobre
+    variações (ex.: "gatos" -> "gato"*, que casa com gato, gata não).
+    """
+    tokens = []
+    for termo in _termos(texto):
+        if len(termo) > 3 and termo.endswith('s'):
+            termo = termo[:-1]
+        tokens.append('"' + termo.replace('"', '""') + '"*')
+    return ' '.join(tokens)
+
+
+def buscar(queryset, texto):
+    """Filtra `queryset` (de Pet) pelo texto e anota `relevancia` (maior = mais relevante)."""
+    texto = (texto or '').strip()
+    if not _termos(texto):
+        return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        vetor = _vetor_pg(f'"{TABELA}".')
+        consulta = "websearch_to_tsquery('portuguese'::regconfig, %s)"
+        # Mesma expressão do índice: o planejador usa o GIN para o @@
+        return queryset.filter(
+            RawSQL(f"{vetor} @@ {consulta}", [texto], output_field=BooleanField())
+        ).annotate(
+            relevancia=RawSQL(f"ts_rank({vetor}, {consulta})", [texto], output_field=FloatField())
+        )
+    if vendor == 'sqlite':
+        consulta = _consulta_fts5(texto)
+        pesos = ', '.join(str(peso) for peso in PESOS_FTS5)
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s", [consulta])
+        ).annotate(
+            # bm25 é negativo (menor = melhor); invertido para manter "maior = melhor"
+            relevancia=RawSQL(
+                f"(SELECT -bm25({TABELA_FTS}, {pesos}) FROM {TABELA_FTS} "
+                f"WHERE {TABELA_FTS} MATCH %s AND {TABELA_FTS}.rowid = \"{TABELA}\".\"id\")",
+                [consulta], output_field=FloatField(),
+            )
+        )
+    # Outros bancos: sem índice textual, recorre a icontains
+    filtro = Q()
+    for termo in _termos(texto):
+        filtro &= Q(*(Q(**{f'{campo}__icontains': termo}) for campo in CAMPOS), _connector=Q.OR)
+    return queryset.filter(filtro).annotate(relevancia=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,179 @@
+# Contadores de status por local e por pet: os painéis do local leem linhas prontas em vez de COUNTs
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from . import funil, rollups
+from .models import ContadorStatus, Pet, SolicitacaoAdocao
+
+PETS = 'pet'
+SOLICITACOES = 'solicitacao'
+
+
+def _incrementar(tipo, local_id, pet_id, status, delta):
+    filtro = {'tipo': tipo, 'local_adocao_id': local_id, 'pet_id': pet_id, 'status': status}
+    if ContadorStatus.objects.filter(**filtro).update(quantidade=F('quantidade') + delta) or delta < 0:
+        # Decremento sem linha: o dono está sendo apagado em cascata (ou já havia desvio,
+        # que a reconciliação corrige); criar a linha só atrapalharia o DELETE
+        return
+    try:
+        with transaction.atomic():
+            ContadorStatus.objects.create(quantidade=delta, **filtro)
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT
+        ContadorStatus.objects.filter(**filtro).update(quantidade=F('quantidade') + delta)
+
+
+def aplicar(tipo, deltas):
+    """Soma {(local_id, pet_id, status): delta} aos contadores, tudo na transação corrente.
+
+    As linhas são atualizadas sempre na mesma ordem, para que transações concorrentes
+    não travem uma à outra.
+    """
+    with transaction.atomic():
+        for (local_id, pet_id, status), delta in sorted(deltas.items(), key=lambda item: (item[0][0] or 0, item[0][1] or 0, item[0][2])):
+            if delta:
+                _incrementar(tipo, local_id, pet_id, status, delta)
+
+
+def transicao_pet(antes, depois):
+    """Pet passou do estado `antes` para `depois`: (local_id, status), ou None se inativo/inexistente."""
+    if antes == depois:
+        return
+    deltas = Counter()
+    if antes:
+        deltas[(antes[0], None, antes[1])] -= 1
+    if depois:
+        deltas[(depois[0], None, depois[1])] += 1
+    aplicar(PETS, deltas)
+
+
+def transicao_solicitacao(antes, depois):
+    """Solicitação passou de `antes` para `depois`: (local_id, pet_id, status), ou None se inexistente.
+
+    Conta no local do pet e no próprio pet.
+    """
+    if antes == depois:
+        return
+    deltas = Counter()
+    for estado, sinal in ((antes, -1), (depois, 1)):
+        if estado:
+            local_id, pet_id, status = estado
+            deltas[(local_id, None, status)] += sinal
+            deltas[(None, pet_id, status)] += sinal
+    aplicar(SOLICITACOES, deltas)
+
+
+def mover_solicitacoes_do_pet(pet_id, local_antigo, local_novo):
+    """Pet mudou de local: as solicitações dele passam a contar no novo local."""
+    if local_antigo == local_novo:
+        return
+    deltas = Counter()
+    for status, quantidade in ContadorStatus.objects.filter(pet_id=pet_id, tipo=SOLICITACOES).values_list('status', 'quantidade'):
+        deltas[(local_antigo, None, status)] -= quantidade
+        deltas[(local_novo, None, status)] += quantidade
+    aplicar(SOLICITACOES, deltas)
+
+
+def atualizar_solicitacoes(queryset, status, **campos):
+    """`queryset.update(status=status, **campos)` mantendo os contadores e o registro de transições.
+
+    O update() em massa não dispara sinais, então as linhas afetadas são travadas e
+    lidas antes, e os contadores ajustados na mesma transação. Retorna quantas mudaram.
+    """
+    with transaction.atomic():
+        travadas = list(queryset.select_for_update(of=('self',)).order_by().select_related('pet').only(
+            'pet__local_adocao_id', 'pet_id', 'status', 'data_solicitacao', 'data_resposta', 'data_cancelamento',
+        ))
+        if not travadas:
+            return 0
+        linhas = [(s.id, s.pet.local_adocao_id, s.pet_id, s.status) for s in travadas]
+        atualizadas = SolicitacaoAdocao.objects.filter(id__in=[linha[0] for linha in linhas]).update(status=status, **campos)
+        # Dias já consolidados das séries (core.rollups) que ganharam ou perderam eventos
+        dias = set()
+        for solicitacao in travadas:
+            antes = rollups.estado_solicitacao(solicitacao)
+            solicitacao.status = status
+            for campo, valor in campos.items():
+                setattr(solicitacao, campo, valor)
+            depois = rollups.estado_solicitacao(solicitacao)
+            if antes != depois:
+                dias.update(antes[1:] + depois[1:])
+        rollups.marcar_dias(dias)
+        deltas = Counter()
+        for _, local_id, pet_id, anterior in linhas:
+            for chave in ((local_id, None), (None, pet_id)):
+                deltas[(*chave, anterior)] -= 1
+                deltas[(*chave, status)] += 1
+        aplicar(SOLICITACOES, deltas)
+        # O registro de transições do funil também depende dos sinais
+        funil.registrar([(solicitacao_id, local_id, anterior, status) for solicitacao_id, local_id, _, anterior in linhas if anterior != status])
+    return atualizadas
+
+
+# ---- leitura ----
+
+def _por_status(contadores):
+    # Linhas zeradas ficam na tabela (serão reaproveitadas), mas não aparecem
+    return {status: quantidade for status, quantidade in contadores.values_list('status', 'quantidade') if quantidade}
+
+
+def do_local(local, tipo):
+    """{status: quantidade} dos pets ativos ou das solicitações do local, em uma consulta."""
+    if local is None:
+        return {}
+    return _por_status(ContadorStatus.objects.filter(local_adocao=local, tipo=tipo))
+
+
+def do_pet(pet):
+    """{status: quantidade} das solicitações do pet."""
+    return _por_status(ContadorStatus.objects.filter(pet=pet, tipo=SOLICITACOES))
+
+
+# ---- reconciliação ----
+
+def contagens_reais():
+    """Os mesmos contadores calculados das tabelas: {(tipo, local_id, pet_id, status): quantidade}."""
+    reais = Counter()
+    pets = Pet.objects.filter(ativo=True).order_by().values_list('local_adocao_id', 'status').annotate(n=Count('id'))
+    for local_id, status, quantidade in pets:
+        reais[(PETS, local_id, None, status)] += quantidade
+    solicitacoes = (
+        SolicitacaoAdocao.objects.order_by()
+        .values_list('pet__local_adocao_id', 'pet_id', 'status').annotate(n=Count('id'))
+    )
+    for local_id, pet_id, status, quantidade in solicitacoes:
+        reais[(SOLICITACOES, local_id, None, status)] += quantidade
+        reais[(SOLICITACOES, None, pet_id, status)] += quantidade
+    return reais
+
+
+def reconciliar(corrigir=True):
+    """Compara os contadores com as tabelas e, se `corrigir`, regrava os divergentes.
+
+    Os contadores são travados antes da contagem, então transições concorrentes
+    esperam a reconciliação terminar. Retorna [(chave, gravado, real)] das divergências.
+    """
+    with transaction.atomic():
+        gravados = {
+            (c.tipo, c.local_adocao_id, c.pet_id, c.status): c
+            for c in ContadorStatus.objects.select_for_update()
+        }
+        reais = contagens_reais()
+        divergencias = []
+        for chave in sorted(set(gravados) | set(reais), key=lambda chave: tuple(str(parte) for parte in chave)):
+            contador = gravados.get(chave)
+            gravado, real = (contador.quantidade if contador else 0), reais.get(chave, 0)
+            if gravado == real:
+                continue
+            divergencias.append((chave, gravado, real))
+            if not corrigir:
+                continue
+            if contador is None:
+                tipo, local_id, pet_id, status = chave
+                ContadorStatus.objects.create(tipo=tipo, local_adocao_id=local_id, pet_id=pet_id, status=status, quantidade=real)
+            else:
+                contador.quantidade = real
+                contador.save(update_fields=['quantidade'])
+    return divergencias
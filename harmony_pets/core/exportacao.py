@@ -0,0 +1,153 @@
+# Exportação em fluxo (CSV ou NDJSON, opcionalmente gzip) de AuditLog, pets e solicitações
+import csv
+import json
+import zlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+
+def _data(valor):
+    return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S') if valor else ''
+
+
+def _json(valor):
+    return json.dumps(valor, ensure_ascii=False)[:10000] if valor is not None else '{}'
+
+
+# Especificação de cada exportação: relações carregadas junto e colunas (cabeçalho, extrator).
+# O mesmo extrator serve aos dois formatos; no NDJSON os campos JSON vão como objeto.
+AUDITLOG = {
+    'nome': 'auditlog',
+    'relacionados': ('usuario',),
+    'colunas': [
+        ('criado_em', lambda obj: _data(obj.criado_em)),
+        ('usuario', lambda obj: obj.usuario.username if obj.usuario else ''),
+        ('metodo', lambda obj: obj.metodo),
+        ('caminho', lambda obj: obj.caminho),
+        ('view_name', lambda obj: obj.view_name),
+        ('status_code', lambda obj: obj.status_code),
+        ('ip', lambda obj: obj.ip or ''),
+        ('user_agent', lambda obj: (obj.user_agent or '')[:200]),
+        ('params', lambda obj: obj.params if obj.params is not None else {}),
+        ('body', lambda obj: obj.body if obj.body is not None else {}),
+        ('mensagem', lambda obj: (obj.mensagem or '')[:10000]),
+        ('duracao_ms', lambda obj: obj.duracao_ms),
+    ],
+}
+
+PETS = {
+    'nome': 'pets',
+    'relacionados': ('local_adocao',),
+    'colunas': [
+        ('id', lambda obj: obj.id),
+        ('nome', lambda obj: obj.nome),
+        ('especie', lambda obj: obj.especie),
+        ('raca', lambda obj: obj.raca),
+        ('idade_meses', lambda obj: obj.idade),
+        ('sexo', lambda obj: obj.sexo),
+        ('porte', lambda obj: obj.porte),
+        ('status', lambda obj: obj.status),
+        ('ativo', lambda obj: obj.ativo),
+        ('local_adocao', lambda obj: obj.local_adocao.nome_fantasia or str(obj.local_adocao)),
+        ('data_cadastro', lambda obj: _data(obj.data_cadastro)),
+        ('data_adocao', lambda obj: _data(obj.data_adocao)),
+    ],
+}
+
+SOLICITACOES = {
+    'nome': 'solicitacoes_adocao',
+    'relacionados': ('pet__local_adocao', 'interessado__usuario'),
+    'colunas': [
+        ('id', lambda obj: obj.id),
+        ('pet_id', lambda obj: obj.pet_id),
+        ('pet', lambda obj: obj.pet.nome),
+        ('local_adocao', lambda obj: obj.pet.local_adocao.nome_fantasia or str(obj.pet.local_adocao)),
+        ('interessado', lambda obj: obj.interessado.usuario.username if obj.interessado.usuario else ''),
+        ('status', lambda obj: obj.status),
+        ('data_solicitacao', lambda obj: _data(obj.data_solicitacao)),
+        ('data_resposta', lambda obj: _data(obj.data_resposta)),
+        ('data_cancelamento', lambda obj: _data(obj.data_cancelamento)),
+    ],
+}
+
+
+def linhas(queryset, especificacao, chunk_size=None):
+    """Gera uma lista de valores por registro, lendo o banco em blocos de `chunk_size`.
+
+    O iterator() não guarda os objetos no cache do queryset: a memória fica presa a um
+    bloco, qualquer que seja o tamanho da exportação.
+    """
+    chunk_size = chunk_size or getattr(settings, 'EXPORTACAO_CHUNK', 2000)
+    extratores = [extrator for _, extrator in especificacao['colunas']]
+    consulta = queryset.select_related(*especificacao['relacionados'])
+    for obj in consulta.iterator(chunk_size=chunk_size):
+        yield [extrator(obj) for extrator in extratores]
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha formatada em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def _csv(cabecalhos, registros, por_pedaco):
+    escritor = csv.writer(_Eco())
+    pedaco = [escritor.writerow(cabecalhos)]
+    for registro in registros:
+        pedaco.append(escritor.writerow([_json(v) if isinstance(v, (dict, list)) else v for v in registro]))
+        if len(pedaco) >= por_pedaco:
+            yield ''.join(pedaco).encode('utf-8')
+            pedaco = []
+    if pedaco:
+        yield ''.join(pedaco).encode('utf-8')
+
+
+def _ndjson(cabecalhos, registros, por_pedaco):
+    pedaco = []
+    for registro in registros:
+        pedaco.append(json.dumps(dict(zip(cabecalhos, registro)), ensure_ascii=False, default=str) + '\n')
+        if len(pedaco) >= por_pedaco:
+            yield ''.join(pedaco).encode('utf-8')
+            pedaco = []
+    if pedaco:
+        yield ''.join(pedaco).encode('utf-8')
+
+
+def _gzip(pedacos):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: cabeçalho e rodapé gzip
+    for pedaco in pedacos:
+        comprimido = compressor.compress(pedaco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def conteudo(queryset, especificacao, formato='csv', compactar=False, chunk_size=None):
+    """Gera os bytes da exportação; nenhum momento guarda mais que um bloco de registros."""
+    chunk_size = chunk_size or getattr(settings, 'EXPORTACAO_CHUNK', 2000)
+    cabecalhos = [cabecalho for cabecalho, _ in especificacao['colunas']]
+    gerador = _csv if formato == 'csv' else _ndjson
+    # Pedaços de algumas centenas de linhas: menos chamadas ao servidor sem juntar o bloco todo
+    pedacos = gerador(cabecalhos, linhas(queryset, especificacao, chunk_size), max(1, chunk_size // 4))
+    return _gzip(pedacos) if compactar else pedacos
+
+
+def resposta(queryset, especificacao, formato='csv', compactar=False):
+    """StreamingHttpResponse para download da exportação (arquivo .gz quando `compactar`)."""
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato de exportação desconhecido: {formato}')
+    tipo, extensao = FORMATOS[formato]
+    nome = f"{especificacao['nome']}.{extensao}"
+    if compactar:
+        tipo, nome = 'application/gzip', f'{nome}.gz'
+    response = StreamingHttpResponse(conteudo(queryset, especificacao, formato, compactar), content_type=tipo)
+    response['Content-Disposition'] = f'attachment; filename="{nome}"'
+    return response
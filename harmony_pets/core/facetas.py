@@ -0,0 +1,94 @@
+# Contagens por faceta (espécie, porte, sexo e características) da listagem de pets
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Pet
+
+DIMENSOES = {
+    'especie': Pet.ESPECIES_CHOICES,
+    'porte': Pet.PORTES_CHOICES,
+    'sexo': Pet.SEXOS_CHOICES,
+}
+CARACTERISTICAS = [
+    ('castrado', 'Castrado'),
+    ('vacinado', 'Vacinado'),
+    ('vermifugado', 'Vermifugado'),
+    ('docil', 'Dócil'),
+    ('brincalhao', 'Brincalhão'),
+    ('calmo', 'Calmo'),
+]
+CHAVE_VERSAO = 'facetas_pets_versao'
+
+
+def filtros_da_requisicao(params):
+    """Filtros válidos da query string: {campo: valor}; características ativas valem True."""
+    filtros = {}
+    for dimensao, choices in DIMENSOES.items():
+        valor = params.get(dimensao)
+        if valor in dict(choices):
+            filtros[dimensao] = valor
+    for caracteristica, _ in CARACTERISTICAS:
+        if params.get(caracteristica) in ('1', 'true'):
+            filtros[caracteristica] = True
+    return filtros
+
+
+def _condicao(filtros, exceto=None):
+    return Q(**{campo: valor for campo, valor in filtros.items() if campo != exceto})
+
+
+def contar(queryset, filtros):
+    """Todas as contagens em uma única consulta com agregação condicional.
+
+    A contagem de cada opção aplica os demais filtros ativos, mas não o da própria
+    dimensão (assim as outras espécies continuam mostrando quantos pets teriam).
+    """
+    agregados, opcoes = {}, []
+    for dimensao, choices in DIMENSOES.items():
+        for valor, _ in choices:
+            alias = f'f{len(opcoes)}'
+            agregados[alias] = Count('id', filter=Q(**{dimensao: valor}) & _condicao(filtros, dimensao))
+            opcoes.append((alias, dimensao, valor))
+    for caracteristica, _ in CARACTERISTICAS:
+        alias = f'f{len(opcoes)}'
+        agregados[alias] = Count('id', filter=Q(**{caracteristica: True}) & _condicao(filtros, caracteristica))
+        opcoes.append((alias, 'caracteristicas', caracteristica))
+    agregados['total'] = Count('id', filter=_condicao(filtros) or None)
+    linha = queryset.order_by().aggregate(**agregados)
+    contagens = {dimensao: {} for dimensao in (*DIMENSOES, 'caracteristicas')}
+    for alias, dimensao, valor in opcoes:
+        contagens[dimensao][valor] = linha[alias]
+    contagens['total'] = linha['total']
+    return contagens
+
+
+def _versao():
+    # A versão entra na chave: invalidar é trocar de versão, sem apagar entradas
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO, time.time_ns(), None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def invalidar():
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        cache.set(CHAVE_VERSAO, time.time_ns(), None)
+
+
+def contar_com_cache(queryset, filtros, contexto=()):
+    """`contar` guardada no cache; `contexto` identifica o que mais restringe o queryset (busca, raio)."""
+    assinatura = json.dumps([sorted(filtros.items()), list(contexto)], default=str)
+    chave = f'facetas_pets:{_versao()}:{hashlib.md5(assinatura.encode("utf-8")).hexdigest()}'
+    contagens = cache.get(chave)
+    if contagens is None:
+        contagens = contar(queryset, filtros)
+        cache.set(chave, contagens, getattr(settings, 'FACETAS_PETS_TTL', 300))
+    return contagens
@@ -0,0 +1,168 @@
+# Funil de adoção: registro das transições de status e agregado mensal por local
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateField, Max, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import FunilMensal, MarcaProcessamento, SolicitacaoAdocao, TransicaoSolicitacao
+
+MARCA = 'funil_adocao'
+# Caminho da adoção, em ordem: chegar a uma etapa implica ter passado pelas anteriores
+ETAPAS = ['pendente', 'em_entrevista', 'entrevista_aprovada', 'agendado', 'concluida']
+# Desfechos fora do caminho
+DESFECHOS = ['rejeitada', 'entrevista_rejeitada', 'cancelada']
+# Limites superiores (segundos) das faixas do histograma: 1 min, 2 min, 4 min, ... ~1 ano;
+# uma última faixa aberta recebe o que passar disso
+LIMITES = [60 * 2 ** i for i in range(20)]
+
+
+def registrar(transicoes):
+    """Acrescenta [(solicitacao_id, local_id, de, para)] ao registro, na transação corrente."""
+    agora = timezone.now()
+    TransicaoSolicitacao.objects.bulk_create(
+        TransicaoSolicitacao(solicitacao_id=solicitacao_id, local_adocao_id=local_id, de=de or '', para=para, criado_em=agora)
+        for solicitacao_id, local_id, de, para in transicoes
+    )
+
+
+# ---- histogramas ----
+
+def _vazio():
+    return [0] * (len(LIMITES) + 1)
+
+
+def _faixa(segundos):
+    return bisect_left(LIMITES, segundos)
+
+
+def percentil(histograma, fracao):
+    """Estimativa do percentil (em segundos), interpolando dentro da faixa; None sem dados."""
+    total = sum(histograma)
+    if not total:
+        return None
+    alvo = fracao * total
+    acumulado = 0
+    for indice, quantidade in enumerate(histograma):
+        if quantidade and acumulado + quantidade >= alvo:
+            inferior = LIMITES[indice - 1] if indice else 0
+            superior = LIMITES[indice] if indice < len(LIMITES) else LIMITES[-1] * 2
+            return round(inferior + (superior - inferior) * (alvo - acumulado) / quantidade)
+        acumulado += quantidade
+
+
+# ---- agregado mensal ----
+
+def _limites_do_mes(mes):
+    proximo = (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return [timezone.make_aware(datetime.combine(dia, time.min)) for dia in (mes, proximo)]
+
+
+def calcular_mes(local_id, mes):
+    """{etapa: (solicitacoes, histograma)} das solicitações do local criadas no mês."""
+    inicio, fim = _limites_do_mes(mes)
+    eventos = (
+        TransicaoSolicitacao.objects
+        .filter(local_adocao_id=local_id, solicitacao__data_solicitacao__gte=inicio, solicitacao__data_solicitacao__lt=fim)
+        .order_by('solicitacao_id', 'criado_em', 'id')
+        .values_list('solicitacao_id', 'para', 'criado_em')
+    )
+    etapas = {etapa: [0, _vazio()] for etapa in ETAPAS + DESFECHOS}
+    for _, transicoes in groupby(eventos.iterator(chunk_size=2000), key=lambda evento: evento[0]):
+        criada_em, primeiras = None, {}
+        for _, para, momento in transicoes:
+            criada_em = criada_em or momento
+            primeiras.setdefault(para, momento)
+        alcancada = max((ETAPAS.index(para) for para in primeiras if para in ETAPAS), default=0)
+        alcancadas = ETAPAS[:alcancada + 1] + [para for para in DESFECHOS if para in primeiras]
+        for etapa in alcancadas:
+            etapas[etapa][0] += 1
+            # Tempo até a etapa só quando a entrada nela foi registrada (e não na própria criação)
+            if etapa in primeiras and etapa != ETAPAS[0]:
+                etapas[etapa][1][_faixa((primeiras[etapa] - criada_em).total_seconds())] += 1
+    return {etapa: tuple(valores) for etapa, valores in etapas.items() if valores[0]}
+
+
+def atualizar(completo=False):
+    """Recalcula os meses (por local) tocados por transições novas desde a marca d'água.
+
+    A marca é o último id lido do registro (que só recebe inclusões). Transações ainda
+    abertas podem gravar ids menores depois da leitura, então as transições dos últimos
+    FUNIL_MARGEM_SEGUNDOS também marcam seus meses para recálculo. Retorna quantos
+    pares (local, mês) foram regravados.
+    """
+    with transaction.atomic():
+        marca, _ = MarcaProcessamento.objects.select_for_update().get_or_create(nome=MARCA)
+        novas = TransicaoSolicitacao.objects.all()
+        if completo:
+            FunilMensal.objects.all().delete()
+        elif marca.ultimo_id is not None:
+            margem = timedelta(seconds=getattr(settings, 'FUNIL_MARGEM_SEGUNDOS', 60))
+            novas = novas.filter(Q(id__gt=marca.ultimo_id) | Q(criado_em__gte=marca.processado_ate - margem))
+        ultimo_id = novas.aggregate(ultimo=Max('id'))['ultimo']
+        meses = set(
+            novas.order_by()
+            .annotate(mes=TruncMonth('solicitacao__data_solicitacao', output_field=DateField()))
+            .values_list('local_adocao_id', 'mes').distinct()
+        )
+        for local_id, mes in meses:
+            FunilMensal.objects.filter(local_adocao_id=local_id, mes=mes).delete()
+            FunilMensal.objects.bulk_create(
+                FunilMensal(local_adocao_id=local_id, mes=mes, etapa=etapa, solicitacoes=quantidade, histograma=histograma)
+                for etapa, (quantidade, histograma) in calcular_mes(local_id, mes).items()
+            )
+        marca.ultimo_id = max(ultimo_id or 0, marca.ultimo_id or 0)
+        marca.processado_ate = timezone.now()
+        marca.save()
+    return len(meses)
+
+
+def processado_ate():
+    return MarcaProcessamento.objects.filter(nome=MARCA).values_list('processado_ate', flat=True).first()
+
+
+# ---- consulta ----
+
+def funil(local=None, inicio=None, fim=None):
+    """Funil das solicitações criadas entre os meses `inicio` e `fim` (date), somando os agregados.
+
+    Cada etapa traz quantas solicitações chegaram a ela, a conversão sobre o total e
+    sobre a etapa anterior, e p50/p90 (segundos) do tempo desde a criação.
+    """
+    linhas = FunilMensal.objects.all()
+    if local is not None:
+        linhas = linhas.filter(local_adocao=local)
+    if inicio is not None:
+        linhas = linhas.filter(mes__gte=inicio.replace(day=1))
+    if fim is not None:
+        linhas = linhas.filter(mes__lte=fim)
+    somas = {etapa: [0, _vazio()] for etapa in ETAPAS + DESFECHOS}
+    for etapa, quantidade, histograma in linhas.values_list('etapa', 'solicitacoes', 'histograma'):
+        if etapa in somas:
+            somas[etapa][0] += quantidade
+            somas[etapa][1] = [a + b for a, b in zip(somas[etapa][1], histograma)]
+    rotulos = dict(SolicitacaoAdocao.STATUS_CHOICES)
+    total = somas[ETAPAS[0]][0]
+
+    def item(etapa):
+        quantidade, histograma = somas[etapa]
+        return {
+            'etapa': etapa,
+            'rotulo': rotulos.get(etapa, etapa),
+            'solicitacoes': quantidade,
+            'conversao': round(quantidade / total * 100, 1) if total else 0,
+            'p50_segundos': percentil(histograma, 0.5),
+            'p90_segundos': percentil(histograma, 0.9),
+        }
+
+    etapas, anterior = [], total
+    for etapa in ETAPAS:
+        dados = item(etapa)
+        dados['conversao_etapa'] = round(dados['solicitacoes'] / anterior * 100, 1) if anterior else 0
+        anterior = dados['solicitacoes']
+        etapas.append(dados)
+    return {'total': total, 'etapas': etapas, 'desfechos': [item(etapa) for etapa in DESFECHOS]}
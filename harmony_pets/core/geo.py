@@ -0,0 +1,190 @@
+# Índice espacial simples baseado em geohash para buscas por proximidade
+import math
+
+from django.db.models import FloatField, Func, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+from .utils import RAIO_TERRA_KM, calcular_distancia
+
+# Alfabeto base32 do geohash (sem a, i, l, o)
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precisão armazenada em Pet.geo_cell (8 caracteres ~ 38m x 19m)
+GEO_CELL_PRECISAO = 8
+
+# Quilômetros por grau de latitude (aproximação esférica)
+KM_POR_GRAU = 111.32
+
+
+def geohash(latitude: float, longitude: float, precisao: int = GEO_CELL_PRECISAO) -> str:
+    """Codifica uma coordenada em geohash com `precisao` caracteres."""
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    latitude, longitude = float(latitude), float(longitude)
+    resultado = []
+    bit = 0
+    valor = 0
+    par = True  # bits pares codificam longitude
+    while len(resultado) < precisao:
+        if par:
+            meio = (lon_min + lon_max) / 2
+            if longitude >= meio:
+                valor = (valor << 1) | 1
+                lon_min = meio
+            else:
+                valor <<= 1
+                lon_max = meio
+        else:
+            meio = (lat_min + lat_max) / 2
+            if latitude >= meio:
+                valor = (valor << 1) | 1
+                lat_min = meio
+            else:
+                valor <<= 1
+                lat_max = meio
+        par = not par
+        bit += 1
+        if bit == 5:
+            resultado.append(_BASE32[valor])
+            bit = 0
+            valor = 0
+    return ''.join(resultado)
+
+
+def dimensoes_celula(precisao: int):
+    """Retorna (altura, largura) em graus de uma célula geohash de `precisao` caracteres."""
+    bits = precisao * 5
+    bits_lon = (bits + 1) // 2
+    bits_lat = bits // 2
+    return 180.0 / (2 ** bits_lat), 360.0 / (2 ** bits_lon)
+
+
+def celulas_no_raio(latitude: float, longitude: float, raio_km: float):
+    """Lista os prefixos geohash que cobrem o círculo de `raio_km` ao redor do ponto.
+
+    Escolhe a maior precisão cuja célula seja maior que o raio em ambas as direções;
+    assim a célula do ponto e suas 8 vizinhas cobrem todo o círculo. Retorna None
+    quando nenhuma precisão atende (raios enormes ou pontos próximos aos polos).
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    delta_lat = raio_km / KM_POR_GRAU
+    lat_extrema = min(abs(latitude) + delta_lat, 90.0)
+    cos_lat = math.cos(math.radians(lat_extrema))
+    if cos_lat <= 1e-9:
+        return None
+    delta_lon = raio_km / (KM_POR_GRAU * cos_lat)
+
+    for precisao in range(GEO_CELL_PRECISAO, 0, -1):
+        altura, largura = dimensoes_celula(precisao)
+        if altura >= delta_lat and largura >= delta_lon:
+            break
+    else:
+        return None
+
+    celulas = set()
+    for dy in (-1, 0, 1):
+        lat = max(-90.0, min(90.0, latitude + dy * altura))
+        for dx in (-1, 0, 1):
+            lon = (longitude + dx * largura + 180.0) % 360.0 - 180.0
+            celulas.add(geohash(lat, lon, precisao))
+    return sorted(celulas)
+
+
+def celulas_no_retangulo(sul: float, norte: float, oeste: float, leste: float, precisao: int, maximo: int = 64):
+    """(precisão, células) que cobrem o retângulo, na maior precisão até `precisao` com no máximo `maximo` células.
+
+    Usa a grade do geohash: cada célula é uma linha/coluna da divisão do globo na
+    precisão. Se oeste > leste o retângulo cruza o antimeridiano. Na precisão 1 o
+    globo inteiro tem 32 células, então sempre há resposta para `maximo` >= 32.
+    """
+    extensao = leste - oeste if oeste <= leste else leste - oeste + 360.0
+    for nivel in range(precisao, 0, -1):
+        altura, largura = dimensoes_celula(nivel)
+        linhas, colunas = round(180.0 / altura), round(360.0 / largura)
+        primeira_linha = min(linhas - 1, int((max(sul, -90.0) + 90.0) // altura))
+        ultima_linha = min(linhas - 1, int((min(norte, 90.0) + 90.0) // altura))
+        primeira_coluna = int((oeste + 180.0) % 360.0 // largura)
+        ultima_coluna = int(((oeste + 180.0) % 360.0 + extensao) // largura)  # pode passar de `colunas`
+        quantidade_colunas = min(colunas, ultima_coluna - primeira_coluna + 1)
+        if (ultima_linha - primeira_linha + 1) * quantidade_colunas <= maximo:
+            break
+    celulas = set()
+    for linha in range(primeira_linha, ultima_linha + 1):
+        latitude = -90.0 + (linha + 0.5) * altura
+        for deslocamento in range(quantidade_colunas):
+            coluna = (primeira_coluna + deslocamento) % colunas
+            celulas.add(geohash(latitude, -180.0 + (coluna + 0.5) * largura, nivel))
+    return nivel, sorted(celulas)
+
+
+def proximo_prefixo(prefixo: str):
+    """Menor string (no alfabeto geohash) maior que todas as que começam com `prefixo`.
+
+    Permite consultar as células por intervalo (`>=` / `<`), que usa o índice B-tree
+    tanto no Postgres quanto no SQLite. Retorna None se não houver limite superior.
+    """
+    caracteres = list(prefixo)
+    while caracteres:
+        pos = _BASE32.index(caracteres[-1])
+        if pos + 1 < len(_BASE32):
+            caracteres[-1] = _BASE32[pos + 1]
+            return ''.join(caracteres)
+        caracteres.pop()
+    return None
+
+
+def bounding_box(latitude: float, longitude: float, raio_km: float):
+    """Retângulo (lat_min, lat_max, lon_min, lon_max) que contém o círculo.
+
+    Os limites de longitude vêm como None quando o círculo cruza o antimeridiano
+    ou alcança um polo; nesse caso apenas a latitude é restringida.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    delta_lat = raio_km / KM_POR_GRAU
+    lat_min, lat_max = latitude - delta_lat, latitude + delta_lat
+    cos_lat = math.cos(math.radians(min(abs(latitude) + delta_lat, 90.0)))
+    if lat_min <= -90.0 or lat_max >= 90.0 or cos_lat <= 1e-9:
+        return max(lat_min, -90.0), min(lat_max, 90.0), None, None
+    delta_lon = raio_km / (KM_POR_GRAU * cos_lat)
+    lon_min, lon_max = longitude - delta_lon, longitude + delta_lon
+    if lon_min < -180.0 or lon_max > 180.0:
+        return lat_min, lat_max, None, None
+    return lat_min, lat_max, lon_min, lon_max
+
+
+# ------------------ Haversine no banco de dados ------------------
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    return calcular_distancia(lat1, lon1, lat2, lon2)
+
+
+def registrar_funcoes_sqlite(sender, connection, **kwargs):
+    """Registra HAVERSINE_KM em cada nova conexão SQLite (handler de connection_created)."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('HAVERSINE_KM', 4, _haversine_km, deterministic=True)
+
+
+class Haversine(Func):
+    """Distância em km entre dois pares (lat, lon) calculada pelo próprio banco.
+
+    No SQLite usa a função determinística HAVERSINE_KM registrada na conexão;
+    nos demais bancos (Postgres) expande para a fórmula com funções trigonométricas.
+    """
+    function = 'HAVERSINE_KM'
+    arity = 4
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        lat1, lon1, lat2, lon2 = self.get_source_expressions()
+        a = (
+            Power(Sin(Radians(lat2 - lat1) / Value(2.0)), 2)
+            + Cos(Radians(lat1)) * Cos(Radians(lat2)) * Power(Sin(Radians(lon2 - lon1) / Value(2.0)), 2)
+        )
+        # Least evita erro de domínio do ASIN por arredondamento (raiz ligeiramente > 1)
+        expressao = Value(2 * RAIO_TERRA_KM) * ASin(Least(Sqrt(a), Value(1.0)))
+        return compiler.compile(expressao)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, **extra_context)
@@ -0,0 +1,263 @@
+# Geocodificação de endereços com cache persistente e fallback offline
+import csv
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GeocodeCache
+
+logger = logging.getLogger('core')
+
+GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+CENTROIDES_CSV = Path(__file__).resolve().parent / 'data' / 'centroides_br.csv'
+
+_sessao = None
+_sessao_lock = threading.Lock()
+
+
+def obter_sessao() -> requests.Session:
+    """Sessão HTTP compartilhada: reaproveita conexões TCP/TLS e repete falhas transitórias."""
+    global _sessao
+    if _sessao is None:
+        with _sessao_lock:
+            if _sessao is None:
+                sessao = requests.Session()
+                tentativas = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504), allowed_methods=('GET',))
+                sessao.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=tentativas))
+                _sessao = sessao
+    return _sessao
+
+
+def normalizar_endereco(endereco: str) -> str:
+    """Forma canônica usada como chave do cache: sem acentos, minúscula, espaços e pontuação uniformes."""
+    texto = unicodedata.normalize('NFKD', endereco or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r'[^\w\s,-]', ' ', texto)
+    partes = [' '.join(parte.split()) for parte in texto.split(',')]
+    return ', '.join(parte for parte in partes if parte)
+
+
+def _chave(endereco_normalizado: str) -> str:
+    return hashlib.sha256(endereco_normalizado.encode('utf-8')).hexdigest()
+
+
+def _expirado(entrada: GeocodeCache) -> bool:
+    # Centroides offline são aproximados: valem como negativos e a rede é tentada de novo
+    if entrada.origem == 'google':
+        validade = timedelta(days=getattr(settings, 'GEOCODE_CACHE_TTL_DIAS', 90))
+    else:
+        validade = timedelta(hours=getattr(settings, 'GEOCODE_CACHE_TTL_NEGATIVO_HORAS', 24))
+    return timezone.now() - entrada.atualizado_em > validade
+
+
+# ------------------ Fallback offline (CEP / cidade -> centroide) ------------------
+
+@lru_cache(maxsize=1)
+def _centroides():
+    faixas, cidades = [], {}
+    with open(CENTROIDES_CSV, encoding='utf-8') as arquivo:
+        for linha in csv.DictReader(arquivo):
+            coordenadas = (float(linha['latitude']), float(linha['longitude']))
+            faixas.append((int(linha['cep_inicio']), int(linha['cep_fim']), coordenadas))
+            cidades[normalizar_endereco(linha['cidade'])] = coordenadas
+            cidades[normalizar_endereco(f"{linha['cidade']} {linha['uf']}")] = coordenadas
+    # Nomes mais longos primeiro: "sao jose dos campos" antes de "campos"
+    return faixas, sorted(cidades.items(), key=lambda item: -len(item[0]))
+
+
+def centroide_offline(endereco: str) -> Optional[Tuple[float, float]]:
+    """Centroide aproximado pelo CEP (faixa) ou pelo nome da cidade, usando a tabela local."""
+    faixas, cidades = _centroides()
+    cep = re.search(r'\b(\d{5})-?(\d{3})\b', endereco or '')
+    if cep:
+        numero = int(cep.group(1) + cep.group(2))
+        for inicio, fim, coordenadas in faixas:
+            if inicio <= numero <= fim:
+                return coordenadas
+    normalizado = f" {normalizar_endereco(endereco).replace(',', ' ').replace('-', ' ')} "
+    normalizado = ' '.join(normalizado.split())
+    for cidade, coordenadas in cidades:
+        if re.search(rf'(^|\s){re.escape(cidade)}(\s|$)', normalizado):
+            return coordenadas
+    return None
+
+
+# ------------------ Google Geocoding ------------------
+
+def _consultar_google(endereco: str):
+    """Retorna (coordenadas, definitivo). `definitivo` indica que a resposta pode ir para o cache."""
+    api_key = os.environ.get('GOOGLE_MAPS_API_KEY')
+    if not api_key:
+        return None, False
+    try:
+        resposta = obter_sessao().get(
+            GOOGLE_GEOCODE_URL,
+            params={'address': endereco, 'key': api_key, 'region': 'br'},
+            timeout=getattr(settings, 'GEOCODE_TIMEOUT', (3.05, 5)),
+        )
+        data = resposta.json()
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Falha ao geocodificar endereço: %s", e)
+        return None, False
+    if data.get('status') == 'OK' and data.get('results'):
+        local = data['results'][0]['geometry']['location']
+        return (local['lat'], local['lng']), True
+    # ZERO_RESULTS é uma resposta definitiva (cache negativo); cota/chave inválida não são
+    return None, data.get('status') == 'ZERO_RESULTS'
+
+
+def _salvar_cache(chave, normalizado, coordenadas, origem):
+    GeocodeCache.objects.update_or_create(chave=chave, defaults={
+        'endereco': normalizado,
+        'latitude': coordenadas[0] if coordenadas else None,
+        'longitude': coordenadas[1] if coordenadas else None,
+        'origem': origem,
+    })
+
+
+def _com_fallback(endereco, coordenadas):
+    """Aplica o fallback offline quando a rede não resolveu; retorna (coordenadas, origem)."""
+    if coordenadas is not None:
+        return coordenadas, 'google'
+    if getattr(settings, 'GEOCODE_OFFLINE_FALLBACK', True):
+        coordenadas = centroide_offline(endereco)
+        if coordenadas is not None:
+            return coordenadas, 'offline'
+    return None, 'nenhuma'
+
+
+def geocodificar(endereco: str, usar_rede: bool = True) -> Optional[Tuple[float, float]]:
+    """Geocodifica `endereco` consultando primeiro o cache persistente (GeocodeCache).
+
+    Em caso de falta no cache chama a API do Google (se `usar_rede` e houver chave) e,
+    não havendo resultado, a tabela local de centroides (GEOCODE_OFFLINE_FALLBACK).
+    Resultados e respostas negativas definitivas são gravados com validade própria.
+    """
+    normalizado = normalizar_endereco(endereco)
+    if not normalizado:
+        return None
+    chave = _chave(normalizado)
+    entrada = GeocodeCache.objects.filter(chave=chave).first()
+    if entrada is not None and not _expirado(entrada):
+        return (entrada.latitude, entrada.longitude) if entrada.encontrado else None
+
+    coordenadas, definitivo = _consultar_google(endereco) if usar_rede else (None, False)
+    coordenadas, origem = _com_fallback(endereco, coordenadas)
+    if coordenadas is not None or definitivo:
+        _salvar_cache(chave, normalizado, coordenadas, origem)
+    return coordenadas
+
+
+# ------------------ Geocodificação em lote ------------------
+
+class LimitadorTaxa:
+    """Limite global de requisições por segundo, compartilhado entre threads (balde de fichas)."""
+
+    def __init__(self, por_segundo: float, rajada: int = 1):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0.0
+        self.rajada = max(1, rajada)
+        self._fichas = float(self.rajada)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        if not self.intervalo:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._fichas = min(self.rajada, self._fichas + (agora - self._ultimo) / self.intervalo)
+                self._ultimo = agora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) * self.intervalo
+            time.sleep(espera)
+
+
+def consultar_stub(endereco: str):
+    """Geocodificador determinístico e sem rede (para testes e execuções offline).
+
+    Usa a tabela de centroides e, para endereços desconhecidos, um ponto derivado do hash
+    do endereço dentro do território brasileiro. Mesma assinatura de _consultar_google.
+    """
+    coordenadas = centroide_offline(endereco)
+    if coordenadas is None:
+        digest = hashlib.sha256(normalizar_endereco(endereco).encode('utf-8')).digest()
+        fracao_lat = int.from_bytes(digest[:4], 'big') / 2 ** 32
+        fracao_lon = int.from_bytes(digest[4:8], 'big') / 2 ** 32
+        coordenadas = (round(-33.7 + 38.9 * fracao_lat, 6), round(-73.9 + 39.1 * fracao_lon, 6))
+    return coordenadas, True
+
+
+def geocodificar_lote(enderecos, consultar=None, workers=4, limitador=None, estatisticas=None, gravar_cache=True):
+    """Geocodifica vários endereços de uma vez; retorna {endereco: (lat, lon) ou None}.
+
+    O cache é lido e gravado em poucas consultas pela thread chamadora; apenas as
+    chamadas externas (`consultar`, padrão: Google) rodam no pool de `workers` threads,
+    passando pelo `limitador` de taxa global. `estatisticas` (dict) acumula contadores.
+    Com `gravar_cache=False` (geocodificador stub) o cache é lido mas não alterado.
+    """
+    consultar = consultar or _consultar_google
+    estatisticas = estatisticas if estatisticas is not None else {}
+    normalizados = {endereco: normalizar_endereco(endereco) for endereco in set(enderecos)}
+    chaves = {endereco: _chave(normalizado) for endereco, normalizado in normalizados.items() if normalizado}
+    cache = {entrada.chave: entrada for entrada in GeocodeCache.objects.filter(chave__in=set(chaves.values()))}
+
+    resultados, pendentes, repetidos = {}, [], {}
+    pendentes_por_chave = {}
+    for endereco in normalizados:
+        entrada = cache.get(chaves.get(endereco))
+        if endereco not in chaves:
+            resultados[endereco] = None
+        elif entrada is not None and not _expirado(entrada):
+            resultados[endereco] = (entrada.latitude, entrada.longitude) if entrada.encontrado else None
+            estatisticas['cache'] = estatisticas.get('cache', 0) + 1
+        elif chaves[endereco] in pendentes_por_chave:
+            repetidos[endereco] = pendentes_por_chave[chaves[endereco]]
+        else:
+            pendentes_por_chave[chaves[endereco]] = endereco
+            pendentes.append(endereco)
+
+    def tarefa(endereco):
+        if limitador is not None:
+            limitador.aguardar()
+        return consultar(endereco)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        respostas = list(pool.map(tarefa, pendentes))
+    estatisticas['consultas'] = estatisticas.get('consultas', 0) + len(pendentes)
+
+    novos = {}  # por chave: endereços com grafias diferentes podem normalizar igual
+    for endereco, (coordenadas, definitivo) in zip(pendentes, respostas):
+        coordenadas, origem = _com_fallback(endereco, coordenadas)
+        if gravar_cache and (coordenadas is not None or definitivo):
+            novos[chaves[endereco]] = GeocodeCache(
+                chave=chaves[endereco], endereco=normalizados[endereco], origem=origem,
+                latitude=coordenadas[0] if coordenadas else None,
+                longitude=coordenadas[1] if coordenadas else None,
+            )
+        resultados[endereco] = coordenadas
+    GeocodeCache.objects.bulk_create(
+        list(novos.values()), update_conflicts=True, unique_fields=['chave'],
+        update_fields=['endereco', 'latitude', 'longitude', 'origem', 'atualizado_em'],
+    )
+    for endereco, original in repetidos.items():
+        resultados[endereco] = resultados[original]
+    return resultados
@@ -0,0 +1,292 @@
+# Logs rotacionados comprimidos em blocos, com índice lateral para busca por período e nível.
+# Só usa a biblioteca padrão: o handler é carregado pelo LOGGING antes das apps do Django.
+import gzip
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+import zlib
+from logging.handlers import RotatingFileHandler
+
+logger = logging.getLogger(__name__)
+
+# Texto (sem compressão) por bloco; cada bloco começa num registro e vira um membro gzip próprio
+BLOCO = 64 * 1024
+SUFIXO_INDICE = '.idx'
+VERSAO_INDICE = 1
+# Cabeçalho do formato `verbose` do LOGGING: "[2026-10-18 10:00:00] ERROR logger mensagem"
+CABECALHO = re.compile(rb'\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] (DEBUG|INFO|WARNING|ERROR|CRITICAL) ')
+NIVEIS = {'DEBUG': 1, 'INFO': 2, 'WARNING': 4, 'ERROR': 8, 'CRITICAL': 16}
+TODOS_NIVEIS = sum(NIVEIS.values())
+# Arquivo truncado ou corrompido (gzip/zlib), esvaziado pela rotação durante o mmap etc.:
+# a leitura pula o arquivo e o informa em vez de derrubar a página
+ERROS_DE_LEITURA = (OSError, EOFError, ValueError, zlib.error)
+
+
+def _blocos(dados, inicio=0, final=False, tamanho=None):
+    """Divide dados[inicio:] em blocos de registros inteiros.
+
+    Cada bloco é [posição, comprimento, primeiro horário, último horário, máscara dos
+    níveis presentes]; linhas de continuação (tracebacks) ficam no bloco do seu registro.
+    Sem `final`, uma última linha sem quebra fica de fora (ainda está sendo escrita).
+    Retorna (blocos, posição até onde leu).
+    """
+    tamanho = tamanho or BLOCO
+    blocos, atual = [], None
+    posicao, total = inicio, len(dados)
+    while posicao < total:
+        quebra = dados.find(b'\n', posicao)
+        if quebra == -1:
+            if not final:
+                break
+            quebra = total - 1
+        cabecalho = CABECALHO.match(dados[posicao:posicao + 64])
+        if atual is None or (cabecalho and posicao - atual[0] >= tamanho):
+            atual = [posicao, 0, None, None, 0]
+            blocos.append(atual)
+        atual[1] = quebra + 1 - atual[0]
+        if cabecalho:
+            horario = cabecalho.group(1).decode()
+            atual[2] = min(atual[2] or horario, horario)
+            atual[3] = max(atual[3] or horario, horario)
+            atual[4] |= NIVEIS[cabecalho.group(2).decode()]
+        posicao = quebra + 1
+    return blocos, posicao
+
+
+def caminho_indice(arquivo):
+    return arquivo + SUFIXO_INDICE
+
+
+def _gravar_indice(arquivo, compactado, blocos):
+    temporario = caminho_indice(arquivo) + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as saida:
+        json.dump({'versao': VERSAO_INDICE, 'compactado': compactado,
+                   'tamanho': os.path.getsize(arquivo), 'blocos': blocos}, saida)
+    os.replace(temporario, caminho_indice(arquivo))
+
+
+def arquivar(origem, destino, compactar=True):
+    """Move o log rotacionado para `destino` (comprimido bloco a bloco) e grava o índice lateral.
+
+    Os blocos são membros gzip concatenados: o arquivo continua legível por zcat/gzip,
+    e a busca descomprime só os blocos que o índice indicar.
+    """
+    with open(origem, 'rb') as entrada:
+        dados = entrada.read()
+    blocos, _ = _blocos(dados, final=True)
+    if compactar:
+        temporario = destino + '.tmp'
+        with open(temporario, 'wb') as saida:
+            for bloco in blocos:
+                membro = gzip.compress(dados[bloco[0]:bloco[0] + bloco[1]], compresslevel=6)
+                bloco[0], bloco[1] = saida.tell(), len(membro)
+                saida.write(membro)
+        os.replace(temporario, destino)
+        os.remove(origem)
+    else:
+        os.replace(origem, destino)
+    _gravar_indice(destino, compactar, blocos)
+
+
+class ArquivoRotativoIndexado(RotatingFileHandler):
+    """RotatingFileHandler que comprime os backups (app.log.1.gz, ...) e os indexa por bloco.
+
+    O índice lateral (app.log.1.gz.idx) acompanha o arquivo na troca de nomes da rotação.
+    A compressão roda dentro do rollover, com o lock do handler: ~5 MB levam cerca de
+    um quarto de segundo, uma vez a cada rotação.
+    """
+
+    def __init__(self, *args, compactar=True, **kwargs):
+        self.compactar = compactar
+        super().__init__(*args, **kwargs)
+        if compactar:
+            self.namer = lambda nome: nome + '.gz'
+
+    def rotate(self, source, dest):
+        if os.path.exists(source):
+            arquivar(source, dest, compactar=self.compactar)
+
+    def doRollover(self):
+        # Igual ao RotatingFileHandler.doRollover, movendo também os índices laterais
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if self.backupCount > 0:
+            for indice in range(self.backupCount - 1, 0, -1):
+                origem = self.rotation_filename(f'{self.baseFilename}.{indice}')
+                destino = self.rotation_filename(f'{self.baseFilename}.{indice + 1}')
+                for sufixo in ('', SUFIXO_INDICE):
+                    if os.path.exists(origem + sufixo):
+                        if os.path.exists(destino + sufixo):
+                            os.remove(destino + sufixo)
+                        os.rename(origem + sufixo, destino + sufixo)
+            destino = self.rotation_filename(self.baseFilename + '.1')
+            for sufixo in ('', SUFIXO_INDICE):
+                if os.path.exists(destino + sufixo):
+                    os.remove(destino + sufixo)
+            self.rotate(self.baseFilename, destino)
+        if not self.delay:
+            self.stream = self._open()
+
+
+# ------------------ Leitura ------------------
+
+_vivos = {}
+_vivos_lock = threading.Lock()
+
+
+def _indice_vivo(arquivo):
+    """Índice de um arquivo sem índice lateral (o app.log corrente), mantido em memória.
+
+    O arquivo só cresce até a rotação, então cada chamada indexa apenas o que foi
+    acrescentado desde a anterior (reabrindo o último bloco, que ainda pode crescer).
+    """
+    estado = os.stat(arquivo)
+    with _vivos_lock:
+        inode, lido, blocos = _vivos.get(arquivo, (None, 0, []))
+        if inode != estado.st_ino or estado.st_size < lido:
+            lido, blocos = 0, []
+        if estado.st_size > lido:
+            inicio = blocos[-1][0] if blocos else 0
+            with open(arquivo, 'rb') as entrada, mmap.mmap(entrada.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                novos, lido = _blocos(mapa, inicio)
+            blocos = blocos[:-1] + novos
+        _vivos[arquivo] = (estado.st_ino, lido, blocos)
+        return list(blocos)
+
+
+def indice(arquivo):
+    """(compactado, blocos) do arquivo, do índice lateral quando ele existe e confere."""
+    compactado = arquivo.endswith('.gz')
+    try:
+        with open(caminho_indice(arquivo), encoding='utf-8') as entrada:
+            lateral = json.load(entrada)
+        if lateral.get('versao') == VERSAO_INDICE and lateral.get('tamanho') == os.path.getsize(arquivo):
+            return lateral['compactado'], lateral['blocos']
+    except (OSError, ValueError):
+        pass
+    if compactado:
+        # .gz de fora do handler: sem fronteiras de bloco conhecidas, um bloco só com tudo
+        return None, [[0, os.path.getsize(arquivo), '0000-00-00 00:00:00', '9999-12-31 23:59:59', TODOS_NIVEIS]]
+    return False, _indice_vivo(arquivo)
+
+
+class _Leitor:
+    """Lê blocos de um arquivo: fatias do mmap no texto puro, um membro gzip no comprimido."""
+
+    def __init__(self, arquivo, compactado):
+        self.compactado = compactado
+        self.entrada = open(arquivo, 'rb')
+        self.mapa = None
+        if compactado is False and os.fstat(self.entrada.fileno()).st_size:
+            self.mapa = mmap.mmap(self.entrada.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def ler(self, posicao, comprimento):
+        if self.compactado is None:
+            self.entrada.seek(0)
+            return gzip.decompress(self.entrada.read())
+        if self.compactado:
+            self.entrada.seek(posicao)
+            return zlib.decompress(self.entrada.read(comprimento), 31)
+        return self.mapa[posicao:posicao + comprimento] if self.mapa is not None else b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.mapa is not None:
+            self.mapa.close()
+        self.entrada.close()
+
+
+def registrar_falha(falhas, arquivo, erro):
+    logger.warning('Arquivo de log ilegível, ignorado: %s (%s)', arquivo, erro)
+    if falhas is not None:
+        falhas.append((arquivo, erro))
+
+
+def arquivos(caminho):
+    """app.log e seus backups (app.log.1.gz ou app.log.1, ...), do mais novo para o mais antigo."""
+    encontrados = [caminho] if os.path.exists(caminho) else []
+    numero = 1
+    while True:
+        candidatos = [f'{caminho}.{numero}.gz', f'{caminho}.{numero}']
+        existente = next((candidato for candidato in candidatos if os.path.exists(candidato)), None)
+        if existente is None:
+            return encontrados
+        encontrados.append(existente)
+        numero += 1
+
+
+def _registros(texto):
+    """[(horário, nível, texto)] dos registros do bloco; continuações somam ao registro anterior."""
+    registros = []
+    for linha in texto.split(b'\n'):
+        cabecalho = CABECALHO.match(linha)
+        if cabecalho or not registros:
+            horario, nivel = (cabecalho.group(1).decode(), cabecalho.group(2).decode()) if cabecalho else (None, None)
+            registros.append((horario, nivel, [linha]))
+        else:
+            registros[-1][2].append(linha)
+    return [
+        (horario, nivel, b'\n'.join(linhas).rstrip(b'\n').decode('utf-8', errors='ignore'))
+        for horario, nivel, linhas in registros if any(linhas)
+    ]
+
+
+def linhas_reversas(arquivo):
+    """Linhas de um backup da última para a primeira, descomprimindo um bloco por vez."""
+    compactado, blocos = indice(arquivo)
+    with _Leitor(arquivo, compactado) as leitor:
+        for posicao, comprimento, *_ in reversed(blocos):
+            texto = leitor.ler(posicao, comprimento).decode('utf-8', errors='ignore')
+            yield from reversed(texto.rstrip('\n').split('\n'))
+
+
+def buscar(caminho, inicio=None, fim=None, niveis=None, busca='', limite=500, falhas=None):
+    """Registros de app.log e dos backups no período [inicio, fim], nos níveis e com o trecho dados.
+
+    `inicio`/`fim` são textos 'AAAA-MM-DD HH:MM:SS' (o formato dos logs). O índice de
+    cada arquivo descarta os blocos fora do período ou sem os níveis pedidos antes de
+    qualquer leitura. Percorre do mais recente para o mais antigo e para ao juntar
+    `limite` registros ou passar de `inicio`; retorna em ordem cronológica. Um registro
+    é a linha com cabeçalho mais as de continuação (tracebacks). Arquivos ilegíveis são
+    pulados e acrescentados a `falhas` (lista de (arquivo, erro)), quando dada.
+    """
+    mascara = TODOS_NIVEIS
+    if niveis:
+        mascara = sum(NIVEIS.get(nivel.upper(), 0) for nivel in niveis)
+    busca = busca.lower()
+    filtra_nivel = mascara != TODOS_NIVEIS
+    encontrados = []
+    for arquivo in arquivos(caminho):
+        try:
+            compactado, blocos = indice(arquivo)
+            with _Leitor(arquivo, compactado) as leitor:
+                for posicao, comprimento, primeiro, ultimo, niveis_bloco in reversed(blocos):
+                    if inicio and ultimo is not None and ultimo < inicio:
+                        return encontrados[::-1]  # daqui para trás tudo é anterior ao período
+                    if (inicio or fim) and primeiro is None:
+                        continue
+                    if (fim and primeiro > fim) or not niveis_bloco & mascara:
+                        continue
+                    for horario, nivel, texto in reversed(_registros(leitor.ler(posicao, comprimento))):
+                        if (inicio or fim) and horario is None:
+                            continue
+                        if (inicio and horario < inicio) or (fim and horario > fim):
+                            continue
+                        if filtra_nivel and not (nivel and NIVEIS[nivel] & mascara):
+                            continue
+                        if busca and busca not in texto.lower():
+                            continue
+                        encontrados.append(texto)
+                        if len(encontrados) >= limite:
+                            return encontrados[::-1]
+        except FileNotFoundError:
+            continue  # rotacionado durante a busca
+        except ERROS_DE_LEITURA as erro:
+            registrar_falha(falhas, arquivo, erro)
+    return encontrados[::-1]
@@ -0,0 +1,74 @@
+# Indicadores (KPIs) do painel administrativo: uma agregação por modelo, em instantâneo no cache
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import InteressadoAdocao, LocalAdocao, Pet, SolicitacaoAdocao, TwoFactorAuth
+
+CHAVE_CACHE = 'admin_kpis_snapshot'
+
+
+def calcular_kpis():
+    """Todos os contadores do painel em seis consultas (uma agregação condicional por modelo)."""
+    pets = Pet.objects.order_by().aggregate(
+        total=Count('id'),
+        disponiveis=Count('id', filter=Q(status='disponivel')),
+        adotados=Count('id', filter=Q(status='adotado')),
+        reservados=Count('id', filter=Q(status='reservado')),
+    )
+    solicitacoes = SolicitacaoAdocao.objects.order_by().aggregate(
+        total=Count('id'),
+        pendentes=Count('id', filter=Q(status='pendente')),
+        aprovadas=Count('id', filter=Q(status='entrevista_aprovada')),
+        rejeitadas=Count('id', filter=Q(status__in=['rejeitada', 'entrevista_rejeitada'])),
+    )
+    twofa = TwoFactorAuth.objects.order_by().aggregate(
+        total=Count('id'),
+        ativos=Count('id', filter=Q(is_enabled=True)),
+    )
+    return {
+        'users_total': User.objects.order_by().aggregate(total=Count('id'))['total'],
+        'interessados_total': InteressadoAdocao.objects.order_by().aggregate(total=Count('id'))['total'],
+        'locais_total': LocalAdocao.objects.order_by().aggregate(total=Count('id'))['total'],
+        'pets_total': pets['total'],
+        'pets_disponiveis': pets['disponiveis'],
+        'pets_adotados': pets['adotados'],
+        'pets_reservados': pets['reservados'],
+        'sol_total': solicitacoes['total'],
+        'sol_pendentes': solicitacoes['pendentes'],
+        'sol_aprovadas': solicitacoes['aprovadas'],
+        'sol_rejeitadas': solicitacoes['rejeitadas'],
+        'twofa_total': twofa['total'],
+        'twofa_ativos': twofa['ativos'],
+        'twofa_taxa': round((twofa['ativos'] / twofa['total'] * 100) if twofa['total'] else 0, 2),
+    }
+
+
+def atualizar_snapshot():
+    snapshot = {'kpis': calcular_kpis(), 'calculado_em': timezone.now()}
+    cache.set(CHAVE_CACHE, snapshot, getattr(settings, 'ADMIN_KPIS_TTL', 60))
+    return snapshot
+
+
+def obter_snapshot(forcar=False):
+    """Instantâneo {'kpis', 'calculado_em'} do cache, recalculado quando expira.
+
+    O cache padrão fica fora do banco (settings.CACHES): com o instantâneo válido,
+    carregar o painel não faz nenhuma consulta de indicadores.
+
+    `forcar` recalcula na hora, exceto se o instantâneo tiver menos de
+    ADMIN_KPIS_INTERVALO_MINIMO segundos: cliques repetidos em "Atualizar" não
+    geram uma rajada de agregações no banco.
+    """
+    snapshot = cache.get(CHAVE_CACHE)
+    if snapshot is None:
+        return atualizar_snapshot()
+    if forcar and idade_segundos(snapshot) >= getattr(settings, 'ADMIN_KPIS_INTERVALO_MINIMO', 5):
+        return atualizar_snapshot()
+    return snapshot
+
+
+def idade_segundos(snapshot):
+    return int((timezone.now() - snapshot['calculado_em']).total_seconds())
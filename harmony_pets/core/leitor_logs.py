@@ -0,0 +1,75 @@
+# Leitura do fim do log da aplicação (app.log e backups da rotação) sem carregar os arquivos
+import os
+
+from . import indice_logs
+
+# Bytes lidos por vez, do fim para o começo do arquivo
+BLOCO = 64 * 1024
+
+
+def arquivos_da_rotacao(caminho):
+    """app.log e os backups da rotação que existirem, do mais novo para o mais antigo."""
+    return indice_logs.arquivos(caminho)
+
+
+def linhas_reversas(caminho, bloco=None):
+    """Gera as linhas do arquivo da última para a primeira, lendo blocos a partir do fim.
+
+    Só o bloco corrente (mais o pedaço de linha que o atravessa) fica em memória; quem
+    para de consumir cedo lê apenas o final do arquivo. As linhas são separadas ainda
+    em bytes, então um caractere UTF-8 partido entre blocos não se perde.
+    """
+    bloco = bloco or BLOCO
+    with open(caminho, 'rb') as arquivo:
+        posicao = arquivo.seek(0, os.SEEK_END)
+        if not posicao:
+            return
+        arquivo.seek(posicao - 1)
+        if arquivo.read(1) == b'\n':
+            posicao -= 1  # quebra de linha que encerra o arquivo
+        resto = b''
+        while posicao > 0:
+            tamanho = min(bloco, posicao)
+            posicao -= tamanho
+            arquivo.seek(posicao)
+            partes = (arquivo.read(tamanho) + resto).split(b'\n')
+            # A primeira parte pode ser o fim de uma linha que começa no bloco anterior
+            resto = partes.pop(0)
+            for linha in reversed(partes):
+                yield linha.rstrip(b'\r').decode('utf-8', errors='ignore')
+        yield resto.rstrip(b'\r').decode('utf-8', errors='ignore')
+
+
+def ultimas_linhas(caminho, n, nivel='', busca='', falhas=None):
+    """Das `n` últimas linhas do log (continuando pelos backups), as que passam nos filtros.
+
+    `nivel` casa com " NIVEL " (formato `[data] NIVEL logger mensagem`) e `busca` é um
+    trecho sem diferenciar maiúsculas. Os filtros são aplicados durante a leitura, então
+    memória e tempo dependem de `n`, não do tamanho dos arquivos. Retorna em ordem
+    cronológica, como no arquivo; arquivos ilegíveis são pulados e vão para `falhas`.
+    """
+    nivel = f' {nivel.upper()} ' if nivel else ''
+    busca = busca.lower()
+    vistas = 0
+    encontradas = []
+    for arquivo in arquivos_da_rotacao(caminho):
+        if vistas >= n:
+            break
+        try:
+            # Backups comprimidos (app.log.1.gz) são lidos de trás para frente bloco a bloco, pelo índice
+            leitor = indice_logs.linhas_reversas(arquivo) if arquivo.endswith('.gz') else linhas_reversas(arquivo)
+            try:
+                for linha in leitor:
+                    vistas += 1
+                    if (not nivel or nivel in linha) and (not busca or busca in linha.lower()):
+                        encontradas.append(linha)
+                    if vistas >= n:
+                        break
+            finally:
+                leitor.close()
+        except FileNotFoundError:
+            continue  # rotacionado entre a listagem e a abertura
+        except indice_logs.ERROS_DE_LEITURA as erro:
+            indice_logs.registrar_falha(falhas, arquivo, erro)
+    encontradas.reverse()
+    return encontradas
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.funil import atualizar
+
+
+class Command(BaseCommand):
+    help = "Recalcula o funil de adoção mensal por local a partir das transições novas (agende no cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Recalcula todos os meses')
+
+    def handle(self, *args, **options):
+        meses = atualizar(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(f"{meses} meses (por local) recalculados."))
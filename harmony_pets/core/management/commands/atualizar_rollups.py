@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.rollups import atualizar
+
+
+class Command(BaseCommand):
+    help = "Consolida adoções e solicitações em séries diárias e semanais, a partir da última marca d'água (agende no cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Reprocessa a partir desta data (AAAA-MM-DD), ignorando a marca')
+        parser.add_argument('--completo', action='store_true', help='Reprocessa todo o histórico')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            desde = parse_date(options['desde'])
+            if desde is None:
+                raise CommandError('Data inválida em --desde (use AAAA-MM-DD).')
+        resumo = atualizar(desde=desde, completo=options['completo'])
+        inicio = resumo['desde'].isoformat() if resumo['desde'] else 'o início'
+        self.stdout.write(self.style.SUCCESS(
+            f"Consolidado de {inicio} até {resumo['ate']:%Y-%m-%d %H:%M}: {resumo['dias']} linhas diárias, {resumo['semanas']} semanais"
+            f" ({resumo['dias_alterados']} dias anteriores alterados refeitos)."
+        ))
@@ -0,0 +1,110 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.geocoding import LimitadorTaxa, consultar_stub, geocodificar_lote
+from core.models import InteressadoAdocao, LocalAdocao
+from core.signals import local_alterado
+
+MODELOS = {
+    'interessados': InteressadoAdocao,
+    'locais': LocalAdocao,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche latitude/longitude de interessados e locais de adoção que têm endereço mas não têm "
+        "coordenadas, em lotes, com threads limitadas e taxa global de requisições. Pode ser interrompido "
+        "e retomado: o último ID processado fica no arquivo de checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modelos', nargs='+', choices=sorted(MODELOS), default=sorted(MODELOS))
+        parser.add_argument('--lote', type=int, default=200, help='Registros por lote (bulk_update)')
+        parser.add_argument('--workers', type=int, default=4, help='Threads para as consultas externas')
+        parser.add_argument('--taxa', type=float, default=10.0, help='Máximo de consultas externas por segundo (0 = sem limite)')
+        parser.add_argument('--limite', type=int, default=0, help='Para após N registros (0 = todos)')
+        parser.add_argument('--stub', action='store_true', help=(
+            'Simulação sem rede com geocodificador determinístico: só relata, não grava '
+            'coordenadas, cache nem checkpoint'))
+        parser.add_argument('--checkpoint', default=str(Path(settings.LOG_DIR) / 'geocodificacao_checkpoint.json'))
+        parser.add_argument('--reiniciar', action='store_true', help='Ignora o checkpoint e recomeça do início')
+
+    def handle(self, *args, **options):
+        checkpoint = Path(options['checkpoint'])
+        progresso = {}
+        if checkpoint.exists() and not options['reiniciar']:
+            progresso = json.loads(checkpoint.read_text())
+            self.stdout.write(f"Retomando do checkpoint {checkpoint}: {progresso}")
+
+        limitador = LimitadorTaxa(options['taxa'], rajada=max(1, options['workers'])) if options['taxa'] > 0 else None
+        # As coordenadas do stub são fictícias: nunca vão para o banco
+        simular = options['stub']
+        consultar = consultar_stub if simular else None
+        estatisticas = {}
+        inicio = time.monotonic()
+        processados = atualizados = 0
+        restante = options['limite'] or None
+
+        for nome in options['modelos']:
+            modelo = MODELOS[nome]
+            pendentes = (
+                modelo.objects.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True)).exclude(endereco='')
+                .order_by('pk').only('pk', 'endereco', 'latitude', 'longitude')
+            )
+            ultimo = progresso.get(nome, 0)
+            while restante is None or restante > 0:
+                tamanho = options['lote'] if restante is None else min(options['lote'], restante)
+                lote = list(pendentes.filter(pk__gt=ultimo)[:tamanho])
+                if not lote:
+                    break
+                resultados = geocodificar_lote(
+                    [registro.endereco for registro in lote], consultar=consultar, workers=options['workers'],
+                    limitador=limitador, estatisticas=estatisticas, gravar_cache=not simular,
+                )
+                alterados = []
+                for registro in lote:
+                    coordenadas = resultados.get(registro.endereco)
+                    if coordenadas:
+                        registro.latitude, registro.longitude = coordenadas
+                        alterados.append(registro)
+                ultimo = lote[-1].pk
+                if not simular:
+                    modelo.objects.bulk_update(alterados, ['latitude', 'longitude'])
+                    if modelo is LocalAdocao:
+                        # bulk_update não chama save() nem dispara post_save: propaga a célula
+                        # espacial aos pets e invalida o que os sinais invalidariam
+                        for local in alterados:
+                            local.atualizar_celula_dos_pets()
+                            local_alterado(local)
+                    progresso[nome] = ultimo
+                    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+                    checkpoint.write_text(json.dumps(progresso))
+                processados += len(lote)
+                atualizados += len(alterados)
+                if restante is not None:
+                    restante -= len(lote)
+                self._relatar(processados, atualizados, estatisticas, inicio)
+
+        if not simular and (restante is None or restante > 0):
+            # Percorreu tudo: a próxima execução recomeça (falhas ficam no cache negativo)
+            checkpoint.unlink(missing_ok=True)
+        duracao = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Simulação (nada gravado)' if simular else 'Concluído'}: {atualizados}/{processados} registros geocodificados em {duracao:.1f}s "
+            f"({processados / duracao if duracao else 0:.1f} registros/s; "
+            f"{estatisticas.get('cache', 0)} do cache, {estatisticas.get('consultas', 0)} consultas externas)."
+        ))
+
+    def _relatar(self, processados, atualizados, estatisticas, inicio):
+        duracao = time.monotonic() - inicio
+        self.stdout.write(
+            f"  {processados} processados, {atualizados} atualizados, "
+            f"{estatisticas.get('consultas', 0)} consultas externas - "
+            f"{processados / duracao if duracao else 0:.1f} registros/s"
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.retencao_auditoria import podar
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga os registros do AuditLog vencidos pela política de retenção, em lotes curtos "
+        "(no Postgres também remove partições vencidas e cria as dos próximos meses; agende no cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Retenção das respostas até 3xx (padrão: AUDITLOG_RETENCAO_DIAS)')
+        parser.add_argument('--dias-erros', type=int, help='Retenção das respostas 4xx/5xx (padrão: AUDITLOG_RETENCAO_ERROS_DIAS)')
+        parser.add_argument('--lote', type=int, help='Registros apagados por transação (padrão: AUDITLOG_PODA_LOTE)')
+        parser.add_argument('--pausa', type=float, help='Segundos de espera entre lotes (padrão: AUDITLOG_PODA_PAUSA)')
+        parser.add_argument('--simular', action='store_true', help='Apenas conta o que seria apagado')
+
+    def handle(self, *args, **options):
+        for opcao in ('dias', 'dias_erros', 'lote', 'pausa'):
+            if options[opcao] is not None and options[opcao] < 0:
+                raise CommandError(f"--{opcao.replace('_', '-')} não pode ser negativo.")
+        if options['lote'] == 0:
+            raise CommandError('--lote precisa ser maior que zero.')
+        resumo = podar(
+            dias=options['dias'], dias_erros=options['dias_erros'], lote=options['lote'],
+            pausa=options['pausa'], simular=options['simular'],
+        )
+        for nome in resumo['particoes_criadas']:
+            self.stdout.write(f"Partição criada: {nome}")
+        for nome in resumo['particoes_removidas']:
+            self.stdout.write(f"Partição {'vencida' if options['simular'] else 'removida'}: {nome}")
+        for nome in resumo['particoes_adiadas']:
+            self.stdout.write(self.style.WARNING(f"Partição adiada (lock ocupado): {nome}"))
+        if options['simular']:
+            self.stdout.write(self.style.SUCCESS(f"{resumo['registros']} registros seriam apagados."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{resumo['registros']} registros apagados em {resumo['lotes']} lotes."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.pet_snapshot import PetSnapshot, publicar
+
+
+class Command(BaseCommand):
+    help = "Grava uma nova versão do instantâneo de pets disponíveis em PET_SNAPSHOT_DIR, mapeada pelos workers (PET_SNAPSHOT_MMAP)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--diretorio', help='Diretório de destino (padrão: settings.PET_SNAPSHOT_DIR)')
+        parser.add_argument('--manter', type=int, default=3, help='Quantidade de versões antigas mantidas em disco')
+
+    def handle(self, *args, **options):
+        if not PetSnapshot.habilitado():
+            raise CommandError('Instantâneo desabilitado (PET_SNAPSHOT_ENABLED=False ou NumPy ausente).')
+        caminho, total = publicar(options['diretorio'], manter=max(options['manter'], 1))
+        self.stdout.write(self.style.SUCCESS(f"{total} pets publicados em {caminho}."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.contadores import reconciliar
+
+
+class Command(BaseCommand):
+    help = "Recalcula os contadores de status por local e por pet a partir das tabelas e corrige os desvios."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true', help='Apenas lista as divergências, sem corrigir')
+
+    def handle(self, *args, **options):
+        divergencias = reconciliar(corrigir=not options['verificar'])
+        for (tipo, local_id, pet_id, status), gravado, real in divergencias:
+            dono = f"local {local_id}" if local_id is not None else f"pet {pet_id}"
+            self.stdout.write(f"{dono} {tipo}/{status}: {gravado} -> {real}")
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS('Contadores consistentes.'))
+        elif options['verificar']:
+            self.stdout.write(self.style.WARNING(f"{len(divergencias)} contadores divergentes."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(divergencias)} contadores corrigidos."))
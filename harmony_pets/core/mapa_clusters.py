@@ -0,0 +1,217 @@
+# Pirâmide de agregados (clusters) por célula geohash para a API do mapa de pets
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Substr
+
+from .geo import GEO_CELL_PRECISAO, celulas_no_retangulo, geohash
+from .models import Pet
+
+# A partir deste zoom (Google Maps) a API devolve os pets individualmente
+ZOOM_PETS_INDIVIDUAIS = 15
+
+
+def precisao_para_zoom(zoom: int) -> int:
+    """Precisão geohash cujas células têm aproximadamente o tamanho de um tile no `zoom`.
+
+    Um tile no zoom z cobre 360/2^z graus; uma célula de precisão p cobre 360/2^(5p/2).
+    """
+    return max(1, min(GEO_CELL_PRECISAO, round(zoom * 2 / 5)))
+
+
+def _cluster(celula, quantidade, soma_lat, soma_lon, especies):
+    return {
+        'celula': celula,
+        'quantidade': quantidade,
+        'latitude': round(soma_lat / quantidade, 6),
+        'longitude': round(soma_lon / quantidade, 6),
+        'especies': dict(especies),
+    }
+
+
+def clusters_do_banco(precisao, prefixos=None):
+    """Agregados da precisão pedida calculados pelo banco em uma única consulta.
+
+    Com `prefixos` (geohash de precisão até `precisao`), só as células dentro deles.
+    """
+    pets = Pet.objects.disponiveis().com_coordenadas().exclude(geo_cell='')
+    if prefixos is not None:
+        pets = pets.nas_celulas(prefixos)
+    linhas = (
+        pets.annotate(celula=Substr('geo_cell', 1, precisao))
+        .order_by().values('celula', 'especie')
+        .annotate(quantidade=Count('id'), soma_lat=Sum('lat_efetiva'), soma_lon=Sum('lon_efetiva'))
+    )
+    agregados = {}
+    for linha in linhas:
+        agregado = agregados.setdefault(linha['celula'], [0, 0.0, 0.0, Counter()])
+        agregado[0] += linha['quantidade']
+        agregado[1] += linha['soma_lat']
+        agregado[2] += linha['soma_lon']
+        agregado[3][linha['especie']] += linha['quantidade']
+    return [_cluster(celula, *agregado) for celula, agregado in agregados.items()]
+
+
+class PiramideMapa:
+    """Contagem, soma das coordenadas e espécies por célula, em todas as precisões geohash.
+
+    Cada pet disponível contribui para uma célula de cada nível (os prefixos do seu
+    geo_cell), então qualquer zoom é respondido sem varrer os pets. É construída sob
+    demanda e mantida pelos sinais de Pet/LocalAdocao (core.signals): uma alteração
+    retira a contribuição antiga do pet e soma a nova, em O(GEO_CELL_PRECISAO).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._niveis = None  # precisão -> {célula: [quantidade, soma_lat, soma_lon, Counter(espécies)]}
+        self._pets = {}  # id do pet -> (geo_cell, lat, lon, espécie) somado na pirâmide
+        self._construida_em = None
+
+    @staticmethod
+    def habilitado():
+        return getattr(settings, 'MAPA_PIRAMIDE_ENABLED', False)
+
+    @property
+    def construida(self):
+        return self._niveis is not None
+
+    def invalidar(self):
+        with self._lock:
+            self._niveis = None
+            self._pets = {}
+            self._construida_em = None
+
+    def reconstruir(self):
+        linhas = (
+            Pet.objects.disponiveis().com_coordenadas().exclude(geo_cell='')
+            .order_by().values_list('id', 'geo_cell', 'lat_efetiva', 'lon_efetiva', 'especie')
+        )
+        with self._lock:
+            self._niveis = {precisao: {} for precisao in range(1, GEO_CELL_PRECISAO + 1)}
+            self._pets = {}
+            for pet_id, *registro in linhas:
+                if registro[1] is not None:
+                    self._somar(pet_id, tuple(registro))
+            self._construida_em = time.monotonic()
+
+    def _garantir(self):
+        ttl = getattr(settings, 'MAPA_PIRAMIDE_TTL', 300)
+        if self._niveis is None or (ttl and time.monotonic() - self._construida_em > ttl):
+            self.reconstruir()
+
+    def _somar(self, pet_id, registro):
+        geo_cell, lat, lon, especie = registro
+        for precisao, celulas in self._niveis.items():
+            agregado = celulas.setdefault(geo_cell[:precisao], [0, 0.0, 0.0, Counter()])
+            agregado[0] += 1
+            agregado[1] += lat
+            agregado[2] += lon
+            agregado[3][especie] += 1
+        self._pets[pet_id] = registro
+
+    def _subtrair(self, pet_id):
+        registro = self._pets.pop(pet_id, None)
+        if registro is None:
+            return
+        geo_cell, lat, lon, especie = registro
+        for precisao, celulas in self._niveis.items():
+            celula = geo_cell[:precisao]
+            agregado = celulas[celula]
+            agregado[0] -= 1
+            if not agregado[0]:
+                del celulas[celula]
+                continue
+            agregado[1] -= lat
+            agregado[2] -= lon
+            agregado[3][especie] -= 1
+            if not agregado[3][especie]:
+                del agregado[3][especie]
+
+    # ---- atualização incremental ----
+
+    def atualizar_pet(self, pet):
+        """Troca a contribuição do pet conforme o status, a espécie e a localização atuais."""
+        if not self.construida:
+            return
+        coordenadas = pet.coordenadas
+        with self._lock:
+            if self._niveis is None:
+                return
+            self._subtrair(pet.pk)
+            if pet.status == 'disponivel' and pet.ativo and coordenadas:
+                # Célula recalculada: no post_save do local o geo_cell dos pets ainda é o antigo
+                self._somar(pet.pk, (geohash(*coordenadas), coordenadas[0], coordenadas[1], pet.especie))
+
+    def remover(self, pet_id):
+        with self._lock:
+            if self._niveis is not None:
+                self._subtrair(pet_id)
+
+    def atualizar_local(self, local):
+        """Reposiciona os pets do local que herdam as coordenadas dele."""
+        if not self.construida:
+            return
+        for pet in local.pets.disponiveis().filter(Q(latitude__isnull=True) | Q(longitude__isnull=True)).select_related('local_adocao'):
+            self.atualizar_pet(pet)
+
+    # ---- consultas ----
+
+    def total(self):
+        with self._lock:
+            self._garantir()
+            return len(self._pets)
+
+    def clusters(self, precisao, prefixos=None):
+        """Clusters da precisão; com `prefixos`, só as células dentro deles."""
+        with self._lock:
+            self._garantir()
+            celulas = self._niveis[precisao]
+            if prefixos is None:
+                itens = celulas.items()
+            elif all(len(prefixo) == precisao for prefixo in prefixos):
+                itens = ((celula, celulas[celula]) for celula in prefixos if celula in celulas)
+            else:
+                nivel = len(prefixos[0])
+                prefixos = set(prefixos)
+                itens = ((celula, agregado) for celula, agregado in celulas.items() if celula[:nivel] in prefixos)
+            return [_cluster(celula, *agregado) for celula, agregado in itens]
+
+
+piramide = PiramideMapa()
+
+
+def _no_viewport(cluster, viewport):
+    sul, norte, oeste, leste = viewport
+    if not sul <= cluster['latitude'] <= norte:
+        return False
+    if oeste > leste:  # cruza o antimeridiano
+        return cluster['longitude'] >= oeste or cluster['longitude'] <= leste
+    return oeste <= cluster['longitude'] <= leste
+
+
+def clusters_para_zoom(zoom, limite, viewport=None):
+    """Clusters do zoom pedido, no máximo `limite`, do maior para o menor.
+
+    Quando a precisão do zoom gera mais células que o limite, sobe na pirâmide
+    (células maiores) em vez de descartar pets; só no nível 1 o excesso é cortado.
+    Com `viewport` (sul, norte, oeste, leste) só as células geohash que o cobrem são
+    lidas, e ficam os clusters com centroide nele.
+    """
+    fonte = piramide.clusters if piramide.habilitado() else clusters_do_banco
+
+    def obter(precisao):
+        if viewport is None:
+            return fonte(precisao)
+        _, prefixos = celulas_no_retangulo(*viewport, precisao)
+        return [cluster for cluster in fonte(precisao, prefixos) if _no_viewport(cluster, viewport)]
+
+    precisao = precisao_para_zoom(zoom)
+    clusters = obter(precisao)
+    while len(clusters) > limite and precisao > 1:
+        precisao -= 1
+        clusters = obter(precisao)
+    clusters.sort(key=lambda cluster: (-cluster['quantidade'], cluster['celula']))
+    return precisao, clusters[:limite]
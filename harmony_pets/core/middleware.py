@@ -6,7 +6,7 @@ from .models import TwoFactorAuth, AceitacaoTermos
 from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpRequest
 from django.urls import resolve
-from .models import AuditLog
+from .auditoria import gravador
 from .utils import sanitize_payload
 
 
@@ -153,8 +153,9 @@ class AuditLogMiddleware(MiddlewareMixin):
                 except Exception:
                     pass
 
-                AuditLog.objects.create(
-                    usuario=user,
+                # Enfileirado: a gravação em lote acontece fora da requisição
+                gravador.registrar(
+                    usuario_id=user.pk if user else None,
                     metodo=request.method,
                     caminho=path[:512],
                     view_name=view_name[:255],
@@ -194,8 +195,8 @@ class AdminAccessRedirectMiddleware:
                     messages.warning(request, 'Acesso restrito: necessário usuário administrador.')
                     # AuditLog rápido (sem corpo) para tentativa de acesso administrador
                     try:
-                        AuditLog.objects.create(
-                            usuario=request.user if request.user.is_authenticated else None,
+                        gravador.registrar(
+                            usuario_id=request.user.pk if request.user.is_authenticated else None,
                             metodo=request.method,
                             caminho=path[:512],
                             view_name='admin:index',
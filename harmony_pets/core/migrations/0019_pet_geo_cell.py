@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+# Cópia congelada de core.geo.geohash: a migração não pode depender do código atual do app
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISAO = 8
+
+
+def geohash(latitude, longitude, precisao=PRECISAO):
+    lat_min, lat_max = -90.0, 90.0
+    lon_min, lon_max = -180.0, 180.0
+    latitude, longitude = float(latitude), float(longitude)
+    resultado = []
+    bit = 0
+    valor = 0
+    par = True  # bits pares codificam longitude
+    while len(resultado) < precisao:
+        if par:
+            meio = (lon_min + lon_max) / 2
+            if longitude >= meio:
+                valor = (valor << 1) | 1
+                lon_min = meio
+            else:
+                valor <<= 1
+                lon_max = meio
+        else:
+            meio = (lat_min + lat_max) / 2
+            if latitude >= meio:
+                valor = (valor << 1) | 1
+                lat_min = meio
+            else:
+                valor <<= 1
+                lat_max = meio
+        par = not par
+        bit += 1
+        if bit == 5:
+            resultado.append(_BASE32[valor])
+            bit = 0
+            valor = 0
+    return ''.join(resultado)
+
+
+def preencher_geo_cell(apps, schema_editor):
+    Pet = apps.get_model('core', 'Pet')
+    pets = Pet.objects.select_related('local_adocao').only(
+        'id', 'latitude', 'longitude', 'local_adocao__latitude', 'local_adocao__longitude'
+    )
+    alterados = []
+    for pet in pets.iterator(chunk_size=2000):
+        if pet.latitude is not None and pet.longitude is not None:
+            pet.geo_cell = geohash(pet.latitude, pet.longitude)
+        elif pet.local_adocao.latitude is not None and pet.local_adocao.longitude is not None:
+            pet.geo_cell = geohash(pet.local_adocao.latitude, pet.local_adocao.longitude)
+        else:
+            continue
+        alterados.append(pet)
+        if len(alterados) >= 2000:
+            Pet.objects.bulk_update(alterados, ['geo_cell'])
+            alterados = []
+    if alterados:
+        Pet.objects.bulk_update(alterados, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_pet_ativo_pet_data_exclusao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(preencher_geo_cell, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_pet_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(help_text='SHA-256 do endereço normalizado', max_length=64, unique=True)),
+                ('endereco', models.TextField(help_text='Endereço normalizado')),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('origem', models.CharField(choices=[('google', 'Google Geocoding'), ('offline', 'Tabela local de centroides'), ('nenhuma', 'Não encontrado')], max_length=10)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cache de Geocodificação',
+                'verbose_name_plural': 'Cache de Geocodificação',
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# DDL congelada do índice de busca como era nesta migração: não importa core.busca, cujo
+# código pode mudar depois. A manutenção posterior (gatilhos recriados após migrações que
+# reconstroem core_pet) continua no handler de post_migrate de core.busca.
+CAMPOS = ('nome', 'raca', 'cor', 'descricao', 'cuidados_especiais')
+PESOS_PG = {'nome': 'A', 'raca': 'A', 'cor': 'B', 'descricao': 'C', 'cuidados_especiais': 'C'}
+
+VETOR_PG = '(' + ' || '.join(
+    f"setweight(to_tsvector('portuguese'::regconfig, COALESCE({campo}, '')), '{peso}')"
+    for campo, peso in PESOS_PG.items()
+) + ')'
+
+_COLUNAS = ', '.join(CAMPOS)
+_NOVOS = ', '.join(f'new.{campo}' for campo in CAMPOS)
+_ANTIGOS = ', '.join(f'old.{campo}' for campo in CAMPOS)
+_REMOVER = f"INSERT INTO core_pet_fts(core_pet_fts, rowid, {_COLUNAS}) VALUES ('delete', old.id, {_ANTIGOS});"
+_INSERIR = f"INSERT INTO core_pet_fts(rowid, {_COLUNAS}) VALUES (new.id, {_NOVOS});"
+
+SQL_SQLITE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS core_pet_fts USING fts5({_COLUNAS}, content='core_pet', "
+    f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS core_pet_fts_ai AFTER INSERT ON core_pet BEGIN {_INSERIR} END",
+    f"CREATE TRIGGER IF NOT EXISTS core_pet_fts_ad AFTER DELETE ON core_pet BEGIN {_REMOVER} END",
+    f"CREATE TRIGGER IF NOT EXISTS core_pet_fts_au AFTER UPDATE OF {_COLUNAS} ON core_pet BEGIN {_REMOVER} {_INSERIR} END",
+    "INSERT INTO core_pet_fts(core_pet_fts) VALUES ('rebuild')",
+]
+
+
+def criar_indice(apps, schema_editor):
+    conexao = schema_editor.connection
+    with conexao.cursor() as cursor:
+        if conexao.vendor == 'postgresql':
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS core_pet_busca_gin ON core_pet USING gin ({VETOR_PG})")
+        elif conexao.vendor == 'sqlite':
+            for sql in SQL_SQLITE:
+                cursor.execute(sql)
+
+
+def remover(apps, schema_editor):
+    conexao = schema_editor.connection
+    with conexao.cursor() as cursor:
+        if conexao.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS core_pet_busca_gin")
+        elif conexao.vendor == 'sqlite':
+            for sufixo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS core_pet_fts_{sufixo}")
+            cursor.execute("DROP TABLE IF EXISTS core_pet_fts")
+
+
+class Migration(migrations.Migration):
+    """Índice de busca textual de Pet: tsvector + GIN no Postgres, FTS5 com gatilhos no SQLite."""
+
+    dependencies = [
+        ('core', '0021_geocodecache'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover),
+    ]
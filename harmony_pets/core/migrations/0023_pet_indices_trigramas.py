@@ -0,0 +1,41 @@
+from django.db import migrations
+
+CAMPOS = ('raca', 'nome')
+# unaccent() é STABLE e não entra em índice; o invólucro fixa o dicionário e é IMMUTABLE
+FUNCAO_UNACCENT = (
+    "CREATE OR REPLACE FUNCTION core_unaccent(text) RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+    "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+)
+
+
+def criar_indices(apps, schema_editor):
+    # Só no Postgres (pg_trgm); nos demais bancos core.trigramas usa um índice em memória
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    schema_editor.execute(FUNCAO_UNACCENT)
+    for campo in CAMPOS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS core_pet_{campo}_trgm ON core_pet '
+            f'USING gin (core_unaccent(lower({campo})) gin_trgm_ops)'
+        )
+
+
+def remover_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for campo in CAMPOS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS core_pet_{campo}_trgm')
+    schema_editor.execute('DROP FUNCTION IF EXISTS core_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_pet_busca_textual'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, remover_indices),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.operacoes_migracao import AdicionarIndiceConcorrente
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    atomic = False
+
+    dependencies = [
+        ('core', '0023_pet_indices_trigramas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AdicionarIndiceConcorrente(
+            model_name='auditlog',
+            index=models.Index(fields=['-criado_em'], name='auditlog_criado_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='auditlog',
+            index=models.Index(fields=['status_code', '-criado_em'], name='auditlog_status_criado_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='auditlog',
+            index=models.Index(fields=['usuario', '-criado_em'], name='auditlog_usuario_criado_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('ativo', True), ('status', 'disponivel')), fields=['-data_cadastro', '-id'], name='pet_disponiveis_recentes_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='pet',
+            index=models.Index(fields=['local_adocao', 'ativo', '-data_cadastro', '-id'], name='pet_local_ativo_data_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='pet',
+            index=models.Index(fields=['local_adocao', 'ativo', 'status'], name='pet_local_ativo_status_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='solicitacaoadocao',
+            index=models.Index(fields=['pet', 'status', '-data_solicitacao'], name='solicitacao_pet_status_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='solicitacaoadocao',
+            index=models.Index(fields=['pet', '-data_solicitacao', '-id'], name='solicitacao_pet_data_idx'),
+        ),
+        AdicionarIndiceConcorrente(
+            model_name='solicitacaoadocao',
+            index=models.Index(fields=['interessado', '-data_solicitacao', '-id'], name='solicitacao_interessado_idx'),
+        ),
+    ]
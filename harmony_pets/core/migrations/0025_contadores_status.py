@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def popular_contadores(apps, schema_editor):
+    # Ponto de partida dos contadores a partir dos dados existentes
+    Pet = apps.get_model('core', 'Pet')
+    SolicitacaoAdocao = apps.get_model('core', 'SolicitacaoAdocao')
+    ContadorStatus = apps.get_model('core', 'ContadorStatus')
+    contagens = Counter()
+    for local_id, status, quantidade in Pet.objects.filter(ativo=True).order_by().values_list('local_adocao_id', 'status').annotate(n=Count('id')):
+        contagens[('pet', local_id, None, status)] += quantidade
+    for local_id, pet_id, status, quantidade in SolicitacaoAdocao.objects.order_by().values_list('pet__local_adocao_id', 'pet_id', 'status').annotate(n=Count('id')):
+        contagens[('solicitacao', local_id, None, status)] += quantidade
+        contagens[('solicitacao', None, pet_id, status)] += quantidade
+    ContadorStatus.objects.bulk_create(
+        ContadorStatus(tipo=tipo, local_adocao_id=local_id, pet_id=pet_id, status=status, quantidade=quantidade)
+        for (tipo, local_id, pet_id, status), quantidade in contagens.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_indices_consultas_frequentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('pet', 'Pets'), ('solicitacao', 'Solicitações')], max_length=15)),
+                ('status', models.CharField(max_length=30)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('local_adocao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contadores', to='core.localadocao')),
+                ('pet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contadores', to='core.pet')),
+            ],
+            options={
+                'verbose_name': 'Contador de Status',
+                'verbose_name_plural': 'Contadores de Status',
+                'constraints': [models.CheckConstraint(condition=models.Q(('local_adocao__isnull', True), ('pet__isnull', True), _connector='XOR'), name='contador_local_ou_pet'), models.UniqueConstraint(condition=models.Q(('pet__isnull', True)), fields=('local_adocao', 'tipo', 'status'), name='contador_local_unico'), models.UniqueConstraint(condition=models.Q(('local_adocao__isnull', True)), fields=('pet', 'tipo', 'status'), name='contador_pet_unico')],
+            },
+        ),
+        migrations.RunPython(popular_contadores, migrations.RunPython.noop),
+    ]
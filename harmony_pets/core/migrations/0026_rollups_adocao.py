@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_contadores_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaProcessamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('processado_ate', models.DateTimeField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de Processamento',
+                'verbose_name_plural': 'Marcas de Processamento',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('especie', models.CharField(choices=[('cao', 'Cão'), ('gato', 'Gato'), ('coelho', 'Coelho'), ('passaro', 'Pássaro'), ('hamster', 'Hamster'), ('outro', 'Outro')], max_length=20)),
+                ('adocoes', models.PositiveIntegerField(default=0)),
+                ('solicitacoes', models.PositiveIntegerField(default=0)),
+                ('rejeicoes', models.PositiveIntegerField(default=0)),
+                ('cancelamentos', models.PositiveIntegerField(default=0)),
+                ('dia', models.DateField()),
+                ('local_adocao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.localadocao')),
+            ],
+            options={
+                'verbose_name': 'Consolidado Diário',
+                'verbose_name_plural': 'Consolidados Diários',
+                'indexes': [models.Index(fields=['local_adocao', 'dia'], name='rollup_diario_local_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'local_adocao', 'especie'), name='rollup_diario_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('especie', models.CharField(choices=[('cao', 'Cão'), ('gato', 'Gato'), ('coelho', 'Coelho'), ('passaro', 'Pássaro'), ('hamster', 'Hamster'), ('outro', 'Outro')], max_length=20)),
+                ('adocoes', models.PositiveIntegerField(default=0)),
+                ('solicitacoes', models.PositiveIntegerField(default=0)),
+                ('rejeicoes', models.PositiveIntegerField(default=0)),
+                ('cancelamentos', models.PositiveIntegerField(default=0)),
+                ('semana', models.DateField(help_text='Segunda-feira da semana')),
+                ('local_adocao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.localadocao')),
+            ],
+            options={
+                'verbose_name': 'Consolidado Semanal',
+                'verbose_name_plural': 'Consolidados Semanais',
+                'indexes': [models.Index(fields=['local_adocao', 'semana'], name='rollup_semanal_local_idx')],
+                'constraints': [models.UniqueConstraint(fields=('semana', 'local_adocao', 'especie'), name='rollup_semanal_unico')],
+            },
+        ),
+    ]
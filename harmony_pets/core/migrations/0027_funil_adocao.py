@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def registrar_historico(apps, schema_editor):
+    # Solicitações existentes: a criação e, se já saíram de "pendente", a ida direta ao
+    # status atual na data mais provável (etapas intermediárias não foram registradas)
+    SolicitacaoAdocao = apps.get_model('core', 'SolicitacaoAdocao')
+    TransicaoSolicitacao = apps.get_model('core', 'TransicaoSolicitacao')
+    transicoes = []
+    solicitacoes = SolicitacaoAdocao.objects.annotate(
+        data_status=Coalesce('data_cancelamento', 'data_resposta', 'data_solicitacao'),
+    ).values_list('id', 'pet__local_adocao_id', 'status', 'data_solicitacao', 'data_status')
+    for solicitacao_id, local_id, status, criada_em, data_status in solicitacoes.iterator(chunk_size=2000):
+        transicoes.append(TransicaoSolicitacao(solicitacao_id=solicitacao_id, local_adocao_id=local_id,
+                                               de='', para='pendente', criado_em=criada_em))
+        if status != 'pendente':
+            transicoes.append(TransicaoSolicitacao(solicitacao_id=solicitacao_id, local_adocao_id=local_id,
+                                                   de='pendente', para=status, criado_em=max(data_status, criada_em)))
+    TransicaoSolicitacao.objects.bulk_create(transicoes, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_rollups_adocao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marcaprocessamento',
+            name='ultimo_id',
+            field=models.BigIntegerField(blank=True, help_text='Para fontes somente de inclusão: último id lido', null=True),
+        ),
+        migrations.CreateModel(
+            name='FunilMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês de criação das solicitações')),
+                ('etapa', models.CharField(max_length=30)),
+                ('solicitacoes', models.PositiveIntegerField(default=0)),
+                ('histograma', models.JSONField(blank=True, default=list)),
+                ('local_adocao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.localadocao')),
+            ],
+            options={
+                'verbose_name': 'Funil Mensal',
+                'verbose_name_plural': 'Funis Mensais',
+                'constraints': [models.UniqueConstraint(fields=('local_adocao', 'mes', 'etapa'), name='funil_mensal_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransicaoSolicitacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('de', models.CharField(blank=True, help_text='Status anterior (vazio na criação)', max_length=30)),
+                ('para', models.CharField(max_length=30)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('local_adocao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.localadocao')),
+                ('solicitacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transicoes', to='core.solicitacaoadocao')),
+            ],
+            options={
+                'verbose_name': 'Transição de Solicitação',
+                'verbose_name_plural': 'Transições de Solicitações',
+                'indexes': [models.Index(fields=['solicitacao', 'criado_em'], name='transicao_solicitacao_idx'), models.Index(fields=['criado_em'], name='transicao_criado_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_historico, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_funil_adocao'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='criado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,110 @@
+from datetime import datetime, time, timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+# Cópia congelada de core.retencao_auditoria.recriar_tabela: a migração não depende do
+# código atual do app. As partições dos meses seguintes ficam com o prune_auditlog.
+TABELA = 'core_auditlog'
+LEGADO = 'core_auditlog_legado'
+SEQUENCIA = 'core_auditlog_id_seq'
+PADRAO = 'core_auditlog_padrao'
+PREFIXO = 'core_auditlog_p'
+MESES_A_FRENTE = 3
+
+
+def _proximo_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _inicio(mes):
+    return timezone.make_aware(datetime.combine(mes, time.min))
+
+
+def _criar_particoes(cursor, desde):
+    """Partições mensais de `desde` até MESES_A_FRENTE meses depois do mês atual."""
+    mes = (desde or timezone.localdate()).replace(day=1)
+    ultimo = timezone.localdate().replace(day=1)
+    for _ in range(MESES_A_FRENTE):
+        ultimo = _proximo_mes(ultimo)
+    while mes <= ultimo:
+        nome = f'{PREFIXO}{mes:%Y%m}'
+        cursor.execute(
+            f"CREATE TABLE {nome} PARTITION OF {TABELA} FOR VALUES FROM (%s) TO (%s)",
+            [_inicio(mes), _inicio(_proximo_mes(mes))],
+        )
+        mes = _proximo_mes(mes)
+
+
+def _definicoes(cursor):
+    """Índices (exceto a PK), chaves estrangeiras e demais restrições da tabela atual."""
+    cursor.execute(
+        "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary AND NOT EXISTS "
+        "(SELECT 1 FROM pg_constraint r WHERE r.conindid = i.indexrelid)", [TABELA]
+    )
+    # Índice de tabela particionada sai como "ON ONLY"; recriado na tabela simples seria inválido
+    indices = [(nome, definicao.replace(' ON ONLY ', ' ON ')) for nome, definicao in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'f', 'u', 'c')", [TABELA]
+    )
+    return indices, cursor.fetchall()
+
+
+def recriar_tabela(conexao, particionar):
+    """Reconstrói core_auditlog particionada por mês (ou de volta como tabela simples)."""
+    with conexao.cursor() as cursor:
+        indices, restricoes = _definicoes(cursor)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1, MIN(criado_em) FROM {TABELA}")
+        proximo_id, mais_antigo = cursor.fetchone()
+
+        # Libera para a tabela nova os nomes de índices, restrições e da sequência
+        cursor.execute(f"ALTER TABLE {TABELA} RENAME TO {LEGADO}")
+        for nome, _, _ in restricoes:
+            cursor.execute(f"ALTER TABLE {LEGADO} DROP CONSTRAINT {nome}")
+        for nome, _ in indices:
+            cursor.execute(f"DROP INDEX {nome}")
+        cursor.execute(f"ALTER TABLE {LEGADO} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        cursor.execute(f"ALTER TABLE {LEGADO} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"DROP SEQUENCE IF EXISTS {SEQUENCIA}")
+
+        particao = ' PARTITION BY RANGE (criado_em)' if particionar else ''
+        cursor.execute(f"CREATE TABLE {TABELA} (LIKE {LEGADO} INCLUDING DEFAULTS){particao}")
+        cursor.execute(f"CREATE SEQUENCE {SEQUENCIA} START WITH {int(proximo_id)} OWNED BY {TABELA}.id")
+        cursor.execute(f"ALTER TABLE {TABELA} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCIA}')")
+        chave = '(id, criado_em)' if particionar else '(id)'
+        cursor.execute(f"ALTER TABLE {TABELA} ADD CONSTRAINT {TABELA}_pkey PRIMARY KEY {chave}")
+        if particionar:
+            cursor.execute(f"CREATE TABLE {PADRAO} PARTITION OF {TABELA} DEFAULT")
+            _criar_particoes(cursor, timezone.localtime(mais_antigo).date() if mais_antigo else None)
+
+        cursor.execute(f"INSERT INTO {TABELA} SELECT * FROM {LEGADO}")
+        cursor.execute(f"DROP TABLE {LEGADO}")
+        for _, definicao in indices:
+            cursor.execute(definicao)
+        for nome, tipo, definicao in restricoes:
+            if tipo != 'p':
+                cursor.execute(f"ALTER TABLE {TABELA} ADD CONSTRAINT {nome} {definicao}")
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        recriar_tabela(schema_editor.connection, particionar=True)
+
+
+def desparticionar(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        recriar_tabela(schema_editor.connection, particionar=False)
+
+
+class Migration(migrations.Migration):
+    """AuditLog particionado por mês de criado_em no Postgres; nos demais bancos segue tabela simples."""
+
+    dependencies = [
+        ('core', '0028_auditlog_criado_em_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_auditlog_particionado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaPendenteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Dia Pendente de Consolidação',
+                'verbose_name_plural': 'Dias Pendentes de Consolidação',
+            },
+        ),
+    ]
@@ -31,7 +31,9 @@ import base64
 from django.utils import timezone
 from datetime import timedelta
 from django.core.exceptions import ValidationError
-from django.db.models import JSONField
+from django.db.models import F, FloatField, JSONField, Q, Value
+from django.db.models.functions import Coalesce
+from . import geo
 
 # --- Validadores básicos de CPF/CNPJ ---
 def _only_digits(value: str) -> str:
@@ -146,6 +148,17 @@ class LocalAdocao(models.Model):
         if self.cnpj and not validate_cnpj(self.cnpj):
             raise ValidationError({"cnpj": "CNPJ inválido."})
         super().save(*args, **kwargs)
+        self.atualizar_celula_dos_pets()
+
+    def atualizar_celula_dos_pets(self):
+        """Pets sem localização própria herdam a célula espacial do local."""
+        if self.latitude is not None and self.longitude is not None:
+            geo_cell = geo.geohash(self.latitude, self.longitude)
+        else:
+            geo_cell = ''
+        Pet.objects.filter(local_adocao=self).filter(
+            Q(latitude__isnull=True) | Q(longitude__isnull=True)
+        ).exclude(geo_cell=geo_cell).update(geo_cell=geo_cell, updated_at=timezone.now())
 
     def clean_latitude(self):
         latitude = self.cleaned_data.get('latitude')
@@ -159,10 +172,79 @@ class LocalAdocao(models.Model):
             raise ValidationError('A longitude deve estar entre -180 e 180 graus.')
         return longitude
 
+class PetQuerySet(models.QuerySet):
+    def disponiveis(self):
+        return self.filter(status='disponivel', ativo=True)
+
+    def proximos_de(self, latitude, longitude, raio_km):
+        """Pré-filtra pelas células geohash que cobrem o raio (usa o índice de geo_cell).
+
+        É apenas um filtro de candidatos: a distância exata deve ser conferida depois.
+        """
+        celulas = geo.celulas_no_raio(latitude, longitude, raio_km)
+        if celulas is None:
+            return self.exclude(geo_cell='')
+        return self.nas_celulas(celulas)
+
+    def nas_celulas(self, prefixos):
+        """Pets cujo geo_cell começa com algum dos prefixos (intervalos no índice de geo_cell)."""
+        filtro = Q()
+        for prefixo in prefixos:
+            intervalo = Q(geo_cell__gte=prefixo)
+            limite = geo.proximo_prefixo(prefixo)
+            if limite:
+                intervalo &= Q(geo_cell__lt=limite)
+            filtro |= intervalo
+        return self.filter(filtro)
+
+    def buscar(self, texto):
+        """Busca textual indexada em nome, raça, cor, descrição e cuidados; anota `relevancia`."""
+        from .busca import buscar
+        return buscar(self, texto)
+
+    def com_coordenadas(self):
+        """Anota lat_efetiva/lon_efetiva: a localização do pet ou, na falta dela, a do local."""
+        return self.annotate(
+            lat_efetiva=Coalesce('latitude', 'local_adocao__latitude', output_field=FloatField()),
+            lon_efetiva=Coalesce('longitude', 'local_adocao__longitude', output_field=FloatField()),
+        )
+
+    def no_retangulo(self, sul, norte, oeste, leste):
+        """Pets cuja localização efetiva está no retângulo (viewport do mapa).
+
+        Se oeste > leste o retângulo cruza o antimeridiano e a longitude vale nos dois lados.
+        """
+        longitude = Q(lon_efetiva__range=(oeste, leste))
+        if oeste > leste:
+            longitude = Q(lon_efetiva__gte=oeste) | Q(lon_efetiva__lte=leste)
+        return self.com_coordenadas().filter(longitude, lat_efetiva__range=(sul, norte))
+
+    def with_distance(self, latitude, longitude, raio_km=None):
+        """Anota `distancia` (km) calculada no banco a partir de (latitude, longitude).
+
+        Com `raio_km`, restringe antes pelas células do índice espacial e pelo
+        retângulo envolvente, e só então compara a distância exata; o resultado
+        continua sendo um queryset (ordenável e paginável com LIMIT/OFFSET).
+        """
+        latitude, longitude = float(latitude), float(longitude)
+        qs = self.com_coordenadas().annotate(
+            distancia=geo.Haversine(Value(latitude), Value(longitude), F('lat_efetiva'), F('lon_efetiva'))
+        )
+        if raio_km is None:
+            return qs
+        lat_min, lat_max, lon_min, lon_max = geo.bounding_box(latitude, longitude, raio_km)
+        qs = qs.proximos_de(latitude, longitude, raio_km).filter(lat_efetiva__range=(lat_min, lat_max))
+        if lon_min is not None:
+            qs = qs.filter(lon_efetiva__range=(lon_min, lon_max))
+        return qs.filter(distancia__lte=raio_km)
+
+
 class Pet(models.Model):
     # Localização individual do pet (opcional)
     latitude = models.FloatField(null=True, blank=True, help_text="Latitude do pet (opcional)")
     longitude = models.FloatField(null=True, blank=True, help_text="Longitude do pet (opcional)")
+    # Célula geohash da localização efetiva (pet ou local de adoção), indexada para proximidade
+    geo_cell = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
     ESPECIES_CHOICES = [
         ('cao', 'Cão'),
         ('gato', 'Gato'),
@@ -218,6 +300,8 @@ class Pet(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='disponivel')
     data_cadastro = models.DateTimeField(auto_now_add=True)
     data_adocao = models.DateTimeField(null=True, blank=True)
+    # Última alteração (sincronização incremental do mapa via `since`)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     # Soft delete - Pet continua no banco mas fica oculto
     ativo = models.BooleanField(default=True, help_text="Se False, o pet está oculto mas mantém os dados e vínculos")
@@ -227,14 +311,46 @@ class Pet(models.Model):
     foto = models.ImageField(upload_to='pets/', blank=True, null=True, help_text="Foto do pet (upload)")
     foto_url = models.URLField(blank=True, help_text="URL da foto do pet (opcional)")
     emoji = models.CharField(max_length=10, default='🐕', help_text="Emoji representativo do pet")
+
+    objects = PetQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Pet"
         verbose_name_plural = "Pets"
         ordering = ['-data_cadastro']
+        indexes = [
+            # Listagem pública: só disponíveis e ativos, mais recentes primeiro (índice parcial)
+            models.Index(fields=['-data_cadastro', '-id'], condition=Q(status='disponivel', ativo=True), name='pet_disponiveis_recentes_idx'),
+            # Painel do local: pets ativos por data e contagens por status
+            models.Index(fields=['local_adocao', 'ativo', '-data_cadastro', '-id'], name='pet_local_ativo_data_idx'),
+            models.Index(fields=['local_adocao', 'ativo', 'status'], name='pet_local_ativo_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nome} - {self.get_especie_display()}"
+
+    @property
+    def coordenadas(self):
+        """Localização efetiva: a do próprio pet ou, na falta dela, a do local de adoção."""
+        if self.latitude is not None and self.longitude is not None:
+            return (self.latitude, self.longitude)
+        if self.local_adocao_id:
+            local = self.local_adocao
+            if local.latitude is not None and local.longitude is not None:
+                return (local.latitude, local.longitude)
+        return None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # auto_now só é gravado se estiver em update_fields
+            update_fields = kwargs['update_fields'] = set(update_fields) | {'updated_at'}
+        if update_fields is None or {'latitude', 'longitude', 'local_adocao'} & update_fields:
+            coordenadas = self.coordenadas
+            self.geo_cell = geo.geohash(*coordenadas) if coordenadas else ''
+            if update_fields is not None:
+                update_fields.add('geo_cell')
+        super().save(*args, **kwargs)
     
     def get_idade_display(self):
         if self.idade < 12:
@@ -293,10 +409,165 @@ class SolicitacaoAdocao(models.Model):
         verbose_name_plural = "Solicitações de Adoção"
         ordering = ['-data_solicitacao']
         unique_together = ['pet', 'interessado']  # Evita múltiplas solicitações para o mesmo pet
+        indexes = [
+            # Solicitações dos pets de um local (por status) e histórico de um pet, mais recentes primeiro
+            models.Index(fields=['pet', 'status', '-data_solicitacao'], name='solicitacao_pet_status_idx'),
+            models.Index(fields=['pet', '-data_solicitacao', '-id'], name='solicitacao_pet_data_idx'),
+            models.Index(fields=['interessado', '-data_solicitacao', '-id'], name='solicitacao_interessado_idx'),
+        ]
     
     def __str__(self):
         return f"{self.interessado.usuario.username} - {self.pet.nome}"
 
+
+class ContadorStatus(models.Model):
+    """Quantidade de pets ativos ou de solicitações por status, de um local ou de um pet.
+
+    Desnormalizado: mantido por core.contadores na mesma transação de cada mudança de
+    status e corrigido pelo comando `reconciliar_contadores`.
+    """
+    TIPOS_CHOICES = [
+        ('pet', 'Pets'),
+        ('solicitacao', 'Solicitações'),
+    ]
+
+    local_adocao = models.ForeignKey(LocalAdocao, null=True, blank=True, on_delete=models.CASCADE, related_name='contadores')
+    pet = models.ForeignKey(Pet, null=True, blank=True, on_delete=models.CASCADE, related_name='contadores')
+    tipo = models.CharField(max_length=15, choices=TIPOS_CHOICES)
+    status = models.CharField(max_length=30)
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contador de Status"
+        verbose_name_plural = "Contadores de Status"
+        constraints = [
+            # Cada linha pertence a um local ou a um pet, nunca aos dois
+            models.CheckConstraint(condition=Q(local_adocao__isnull=True) ^ Q(pet__isnull=True), name='contador_local_ou_pet'),
+            models.UniqueConstraint(fields=['local_adocao', 'tipo', 'status'], condition=Q(pet__isnull=True), name='contador_local_unico'),
+            models.UniqueConstraint(fields=['pet', 'tipo', 'status'], condition=Q(local_adocao__isnull=True), name='contador_pet_unico'),
+        ]
+
+    def __str__(self):
+        dono = f"local {self.local_adocao_id}" if self.local_adocao_id else f"pet {self.pet_id}"
+        return f"{dono} {self.tipo}/{self.status}: {self.quantidade}"
+
+class TransicaoSolicitacao(models.Model):
+    """Registro somente de inclusão das mudanças de status de uma solicitação (ver core.funil)."""
+    solicitacao = models.ForeignKey(SolicitacaoAdocao, on_delete=models.CASCADE, related_name='transicoes')
+    local_adocao = models.ForeignKey(LocalAdocao, on_delete=models.CASCADE, related_name='+')
+    de = models.CharField(max_length=30, blank=True, help_text="Status anterior (vazio na criação)")
+    para = models.CharField(max_length=30)
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Transição de Solicitação"
+        verbose_name_plural = "Transições de Solicitações"
+        indexes = [
+            models.Index(fields=['solicitacao', 'criado_em'], name='transicao_solicitacao_idx'),
+            models.Index(fields=['criado_em'], name='transicao_criado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.solicitacao_id}: {self.de or '-'} -> {self.para} ({self.criado_em:%Y-%m-%d %H:%M})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Transições são somente de inclusão.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Transições são somente de inclusão.")
+
+
+class FunilMensal(models.Model):
+    """Quantas solicitações de um local, criadas no mês, chegaram a cada etapa, e em quanto tempo.
+
+    O tempo até a etapa fica num histograma de faixas logarítmicas (core.funil), que
+    pode ser somado entre meses para estimar p50/p90 de qualquer período.
+    """
+    local_adocao = models.ForeignKey(LocalAdocao, on_delete=models.CASCADE, related_name='+')
+    mes = models.DateField(help_text="Primeiro dia do mês de criação das solicitações")
+    etapa = models.CharField(max_length=30)
+    solicitacoes = models.PositiveIntegerField(default=0)
+    histograma = JSONField(default=list, blank=True)
+
+    class Meta:
+        verbose_name = "Funil Mensal"
+        verbose_name_plural = "Funis Mensais"
+        constraints = [
+            models.UniqueConstraint(fields=['local_adocao', 'mes', 'etapa'], name='funil_mensal_unico'),
+        ]
+
+
+class RollupBase(models.Model):
+    """Eventos de adoção de um período, por local e por espécie (ver core.rollups)."""
+    local_adocao = models.ForeignKey(LocalAdocao, on_delete=models.CASCADE, related_name='+')
+    especie = models.CharField(max_length=20, choices=Pet.ESPECIES_CHOICES)
+    adocoes = models.PositiveIntegerField(default=0)
+    solicitacoes = models.PositiveIntegerField(default=0)
+    rejeicoes = models.PositiveIntegerField(default=0)
+    cancelamentos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class RollupDiario(RollupBase):
+    dia = models.DateField()
+
+    class Meta:
+        verbose_name = "Consolidado Diário"
+        verbose_name_plural = "Consolidados Diários"
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'local_adocao', 'especie'], name='rollup_diario_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['local_adocao', 'dia'], name='rollup_diario_local_idx'),
+        ]
+
+
+class RollupSemanal(RollupBase):
+    semana = models.DateField(help_text="Segunda-feira da semana")
+
+    class Meta:
+        verbose_name = "Consolidado Semanal"
+        verbose_name_plural = "Consolidados Semanais"
+        constraints = [
+            models.UniqueConstraint(fields=['semana', 'local_adocao', 'especie'], name='rollup_semanal_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['local_adocao', 'semana'], name='rollup_semanal_local_idx'),
+        ]
+
+
+class DiaPendenteRollup(models.Model):
+    """Dia já consolidado cujos eventos mudaram depois; refeito na próxima consolidação (core.rollups)."""
+    dia = models.DateField(unique=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Dia Pendente de Consolidação"
+        verbose_name_plural = "Dias Pendentes de Consolidação"
+
+    def __str__(self):
+        return f"{self.dia}"
+
+
+class MarcaProcessamento(models.Model):
+    """Até onde um processamento incremental já leu os dados (marca d'água)."""
+    nome = models.CharField(max_length=50, unique=True)
+    processado_ate = models.DateTimeField(null=True, blank=True)
+    ultimo_id = models.BigIntegerField(null=True, blank=True, help_text="Para fontes somente de inclusão: último id lido")
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Marca de Processamento"
+        verbose_name_plural = "Marcas de Processamento"
+
+    def __str__(self):
+        return f"{self.nome}: {self.processado_ate}"
+
+
 class TwoFactorAuth(models.Model):
     """Modelo para autenticação de 2 fatores"""
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='two_factor_auth')
@@ -410,13 +681,46 @@ class AuditLog(models.Model):
     body = JSONField(default=dict, blank=True)
     mensagem = models.TextField(blank=True)
     duracao_ms = models.IntegerField(default=0)
-    criado_em = models.DateTimeField(auto_now_add=True)
+    # Preenchido por quem registra: a gravação em lote (core.auditoria) acontece depois
+    criado_em = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = "Log de Auditoria"
         verbose_name_plural = "Logs de Auditoria"
         ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['-criado_em'], name='auditlog_criado_idx'),
+            models.Index(fields=['status_code', '-criado_em'], name='auditlog_status_criado_idx'),
+            models.Index(fields=['usuario', '-criado_em'], name='auditlog_usuario_criado_idx'),
+        ]
 
     def __str__(self):
         u = self.usuario.username if self.usuario else 'anon'
         return f"[{self.criado_em:%Y-%m-%d %H:%M:%S}] {u} {self.metodo} {self.caminho} -> {self.status_code}"
+
+
+class GeocodeCache(models.Model):
+    """Cache persistente de geocodificação por endereço normalizado (inclui respostas negativas)."""
+    ORIGENS_CHOICES = [
+        ('google', 'Google Geocoding'),
+        ('offline', 'Tabela local de centroides'),
+        ('nenhuma', 'Não encontrado'),
+    ]
+
+    chave = models.CharField(max_length=64, unique=True, help_text="SHA-256 do endereço normalizado")
+    endereco = models.TextField(help_text="Endereço normalizado")
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    origem = models.CharField(max_length=10, choices=ORIGENS_CHOICES)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cache de Geocodificação"
+        verbose_name_plural = "Cache de Geocodificação"
+
+    def __str__(self):
+        return f"{self.endereco[:60]} -> {self.get_origem_display()}"
+
+    @property
+    def encontrado(self):
+        return self.latitude is not None and self.longitude is not None
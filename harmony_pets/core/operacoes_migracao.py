@@ -0,0 +1,27 @@
+# Operações de migração próprias do app core
+from django.db import migrations
+
+
+class AdicionarIndiceConcorrente(migrations.AddIndex):
+    """AddIndex que no Postgres usa CREATE INDEX CONCURRENTLY (sem bloquear escritas).
+
+    Nos demais bancos se comporta como AddIndex. CONCURRENTLY não roda dentro de
+    transação: a migração que a usa precisa declarar `atomic = False`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+    def describe(self):
+        return super().describe() + ' (concorrente no Postgres)'
@@ -0,0 +1,151 @@
+# Paginação por cursor (keyset): o custo de qualquer página é o mesmo da primeira
+import json
+from datetime import datetime
+
+from django.core import signing
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+SALT = 'core.paginacao'
+
+
+def _codificar(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    return valor
+
+
+def _decodificar(valor):
+    if isinstance(valor, dict) and 'dt' in valor:
+        return parse_datetime(valor['dt'])
+    return valor
+
+
+def _campos(ordenacao):
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in ordenacao]
+
+
+def _depois_de(campos, valores):
+    """Condição "vem depois de `valores`" na ordem dos campos (comparação de tuplas)."""
+    condicao, iguais = Q(), Q()
+    for (campo, decrescente), valor in zip(campos, valores):
+        condicao |= iguais & Q(**{f"{campo}__{'lt' if decrescente else 'gt'}": valor})
+        iguais &= Q(**{campo: valor})
+    return condicao
+
+
+def estimar_total(queryset, limite=1000):
+    """(total, exato): estimativa do planejador no Postgres; nos demais, COUNT limitado a `limite`."""
+    queryset = queryset.order_by()
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plano = cursor.fetchone()[0]
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        return int(plano[0]['Plan']['Plan Rows']), False
+    quantidade = queryset[:limite + 1].count()
+    return min(quantidade, limite), quantidade <= limite
+
+
+class PaginaCursor:
+    """Uma página da listagem com os links (query string) para a anterior e a próxima."""
+
+    def __init__(self, itens, params, parametro, cursor_anterior, cursor_proxima, total=None, total_exato=True):
+        self.object_list = itens
+        self.cursor_anterior = cursor_anterior
+        self.cursor_proxima = cursor_proxima
+        self.total_estimado = total
+        self.total_exato = total_exato
+        self._params = params
+        self._parametro = parametro
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def has_next(self):
+        return self.cursor_proxima is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _link(self, cursor):
+        params = self._params.copy()
+        params.pop('page', None)
+        params.pop(self._parametro, None)
+        if cursor is not None:
+            params[self._parametro] = cursor
+        return '?' + params.urlencode()
+
+    @property
+    def link_primeira(self):
+        return self._link(None)
+
+    @property
+    def link_anterior(self):
+        return self._link(self.cursor_anterior)
+
+    @property
+    def link_proxima(self):
+        return self._link(self.cursor_proxima)
+
+
+def paginar_por_cursor(request, queryset, ordenacao, por_pagina=12, com_total=False, parametro='cursor'):
+    """Pagina `queryset` por keyset nos campos de `ordenacao` (o último deve ser único, ex. 'id').
+
+    O cursor é opaco e assinado: guarda a ordenação, os valores dela no primeiro ou
+    no último item visto e a direção. A página é buscada com `WHERE (campos) > cursor
+    LIMIT n+1`, sem OFFSET nem COUNT; `com_total` acrescenta uma estimativa do total.
+    Um cursor inválido ou de outra ordenação (ex.: a listagem passou a ordenar por
+    relevância com a busca) volta à primeira página.
+    """
+    campos = _campos(ordenacao)
+    try:
+        cursor = signing.loads(request.GET.get(parametro) or '', salt=SALT)
+        valores, para_tras = [_decodificar(valor) for valor in cursor['v']], cursor['d'] == 'a'
+        if cursor['o'] != list(ordenacao) or len(valores) != len(campos):
+            valores, para_tras = None, False
+    except (signing.BadSignature, KeyError, TypeError):
+        valores, para_tras = None, False
+
+    if para_tras:
+        # Volta invertendo a ordem e desinvertendo o resultado
+        campos_consulta = [(campo, not decrescente) for campo, decrescente in campos]
+    else:
+        campos_consulta = campos
+    consulta = queryset.order_by(*(f"{'-' if decrescente else ''}{campo}" for campo, decrescente in campos_consulta))
+    if valores is not None:
+        consulta = consulta.filter(_depois_de(campos_consulta, valores))
+    itens = list(consulta[:por_pagina + 1])
+    ha_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+    if para_tras:
+        itens.reverse()
+        tem_anterior, tem_proxima = ha_mais, True
+    else:
+        tem_anterior, tem_proxima = valores is not None, ha_mais
+
+    def gerar(item, direcao):
+        return signing.dumps(
+            {'o': list(ordenacao), 'v': [_codificar(getattr(item, campo)) for campo, _ in campos], 'd': direcao},
+            salt=SALT, compress=True,
+        )
+
+    total, exato = estimar_total(queryset) if com_total else (None, True)
+    return PaginaCursor(
+        itens, request.GET, parametro,
+        cursor_anterior=gerar(itens[0], 'a') if itens and tem_anterior else None,
+        cursor_proxima=gerar(itens[-1], 'p') if itens and tem_proxima else None,
+        total=total, total_exato=exato,
+    )
@@ -0,0 +1,335 @@
+# Instantâneo colunar, em memória, dos pets disponíveis para adoção
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import Pet
+from .utils import np, calcular_distancias
+
+ESPECIES = tuple(valor for valor, _ in Pet.ESPECIES_CHOICES)
+PORTES = tuple(valor for valor, _ in Pet.PORTES_CHOICES)
+SEXOS = tuple(valor for valor, _ in Pet.SEXOS_CHOICES)
+# Cada traço ocupa um bit da coluna `tracos`, nesta ordem
+TRACOS = ('castrado', 'vacinado', 'vermifugado', 'docil', 'brincalhao', 'calmo')
+SEM_CODIGO = 255
+
+# Arquivo (no diretório PET_SNAPSHOT_DIR) com o nome da versão vigente
+PONTEIRO = 'CURRENT'
+
+# Uma linha por pet; as colunas são acessadas como views do array estruturado
+DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('local_id', '<i8'),
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('coord_propria', '?'),
+    ('especie', 'u1'),
+    ('porte', 'u1'),
+    ('sexo', 'u1'),
+    ('tracos', 'u1'),
+    ('data_cadastro', '<f8'),
+]) if np is not None else None
+
+
+def _codigo(valores, valor):
+    try:
+        return valores.index(valor)
+    except ValueError:
+        return SEM_CODIGO
+
+
+def _bits_tracos(origem):
+    bits = 0
+    for pos, traco in enumerate(TRACOS):
+        if origem(traco):
+            bits |= 1 << pos
+    return bits
+
+
+def _linha(pet_id, local_id, lat, lon, coord_propria, especie, porte, sexo, tracos, data_cadastro):
+    return (
+        pet_id, local_id or 0,
+        np.nan if lat is None else lat, np.nan if lon is None else lon, coord_propria,
+        _codigo(ESPECIES, especie), _codigo(PORTES, porte), _codigo(SEXOS, sexo), tracos,
+        data_cadastro.timestamp() if data_cadastro else 0.0,
+    )
+
+
+def ler_do_banco():
+    """Array estruturado com exatamente uma linha por pet disponível."""
+    campos = ['id', 'local_adocao_id', 'lat_efetiva', 'lon_efetiva', 'latitude', 'longitude',
+              'especie', 'porte', 'sexo', *TRACOS, 'data_cadastro']
+    linhas = list(Pet.objects.disponiveis().com_coordenadas().order_by('id').values_list(*campos))
+    dados = np.zeros(len(linhas), dtype=DTYPE)
+    for i, linha in enumerate(linhas):
+        valores = dict(zip(campos, linha))
+        dados[i] = _linha(
+            valores['id'], valores['local_adocao_id'], valores['lat_efetiva'], valores['lon_efetiva'],
+            valores['latitude'] is not None and valores['longitude'] is not None,
+            valores['especie'], valores['porte'], valores['sexo'],
+            _bits_tracos(valores.get), valores['data_cadastro'],
+        )
+    return dados
+
+
+class PetSnapshot:
+    """Cópia colunar dos pets disponíveis, mantida em memória por processo.
+
+    Responde filtros (espécie/porte/sexo/traços), buscas por raio e top-k por
+    data de cadastro sem consultar o banco. É construída sob demanda, atualizada
+    incrementalmente pelos sinais de Pet/LocalAdocao (core.signals) e reconstruída
+    por completo quando passa de PET_SNAPSHOT_TTL segundos, limitando a defasagem.
+
+    Com PET_SNAPSHOT_MMAP, os processos (workers WSGI) mapeiam somente leitura a
+    versão gravada por `publicar()` em PET_SNAPSHOT_DIR: o sistema operacional
+    compartilha as mesmas páginas entre todos, e as colunas são views sem cópia.
+    A versão mapeada não recebe as atualizações incrementais; publicada há mais de
+    PET_SNAPSHOT_TTL segundos, o processo volta à cópia própria até a próxima publicação.
+    """
+
+    CAPACIDADE_INICIAL = 1024
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._dados = None
+        self._n = 0
+        self._posicoes = {}  # id do pet -> linha
+        self._construido_em = None
+        self._versao = None
+        self._marca_ponteiro = None
+
+    # ---- ciclo de vida ----
+
+    @staticmethod
+    def habilitado():
+        return np is not None and getattr(settings, 'PET_SNAPSHOT_ENABLED', False)
+
+    @property
+    def construido(self):
+        return self._dados is not None
+
+    def invalidar(self):
+        with self._lock:
+            self._dados = None
+            self._n = 0
+            self._posicoes = {}
+            self._construido_em = None
+            self._versao = None
+            self._marca_ponteiro = None
+
+    def reconstruir(self):
+        linhas = ler_do_banco()
+        dados = np.zeros(max(self.CAPACIDADE_INICIAL, len(linhas) * 2), dtype=DTYPE)
+        dados[:len(linhas)] = linhas
+        posicoes = {pet_id: i for i, pet_id in enumerate(linhas['id'].tolist())}
+        with self._lock:
+            self._dados = dados
+            self._n = len(linhas)
+            self._posicoes = posicoes
+            self._construido_em = time.monotonic()
+            self._versao = None
+
+    def _garantir(self):
+        if getattr(settings, 'PET_SNAPSHOT_MMAP', False) and self._mapear():
+            return
+        ttl = getattr(settings, 'PET_SNAPSHOT_TTL', 300)
+        if self._dados is None or self._mapeado or (ttl and time.monotonic() - self._construido_em > ttl):
+            self.reconstruir()
+
+    def _mapear(self):
+        """Mapeia (somente leitura) a versão publicada vigente, trocando de versão se ela mudou.
+
+        Retorna False quando não há versão publicada ou a vigente passou de
+        PET_SNAPSHOT_TTL; nesse caso o processo usa a cópia própria construída a
+        partir do banco (e mantida pelos sinais).
+        """
+        diretorio = Path(settings.PET_SNAPSHOT_DIR)
+        try:
+            estado = os.stat(diretorio / PONTEIRO)
+        except FileNotFoundError:
+            return self._mapeado
+        ttl = getattr(settings, 'PET_SNAPSHOT_TTL', 300)
+        if ttl and time.time_ns() - estado.st_mtime_ns > ttl * 1_000_000_000:
+            # Publicação parada (cron ou publicação ao salvar desligados): não serve versão velha
+            return False
+        # os.replace cria um novo inode a cada publicação: basta um stat por consulta
+        marca = (estado.st_ino, estado.st_mtime_ns)
+        if self._mapeado and marca == self._marca_ponteiro:
+            return True
+        try:
+            versao = (diretorio / PONTEIRO).read_text().strip()
+            if versao != self._versao:
+                dados = np.load(diretorio / versao, mmap_mode='r')
+                if dados.dtype != DTYPE:
+                    raise ValueError(f'Formato inesperado em {versao}')
+                self._dados = dados
+                self._n = len(dados)
+                self._posicoes = {}
+                self._versao = versao
+        except (OSError, ValueError):
+            # Versão removida entre a leitura do ponteiro e o mapeamento: mantém a atual
+            return self._mapeado
+        self._marca_ponteiro = marca
+        return True
+
+    @property
+    def _mapeado(self):
+        return self._versao is not None
+
+    @property
+    def versao(self):
+        """Nome do arquivo mapeado, ou None quando a cópia é própria do processo."""
+        return self._versao
+
+    # ---- atualização incremental (só na cópia própria; a mapeada muda por publicação) ----
+
+    def atualizar_pet(self, pet):
+        """Insere, atualiza ou remove a linha do pet conforme o status atual."""
+        if not self.construido or self._mapeado:
+            return
+        if pet.status != 'disponivel' or not pet.ativo:
+            self.remover(pet.pk)
+            return
+        coordenadas = pet.coordenadas or (None, None)
+        linha = _linha(
+            pet.pk, pet.local_adocao_id, coordenadas[0], coordenadas[1],
+            pet.latitude is not None and pet.longitude is not None,
+            pet.especie, pet.porte, pet.sexo,
+            _bits_tracos(lambda traco: getattr(pet, traco)), pet.data_cadastro,
+        )
+        with self._lock:
+            if self._dados is None:
+                return
+            pos = self._posicoes.get(pet.pk)
+            if pos is None:
+                if self._n == len(self._dados):
+                    maior = np.zeros(len(self._dados) * 2, dtype=DTYPE)
+                    maior[:self._n] = self._dados[:self._n]
+                    self._dados = maior
+                pos = self._n
+                self._n += 1
+                self._posicoes[pet.pk] = pos
+            self._dados[pos] = linha
+
+    def remover(self, pet_id):
+        with self._lock:
+            if self._mapeado:
+                return
+            pos = self._posicoes.pop(pet_id, None)
+            if pos is None:
+                return
+            ultimo = self._n - 1
+            if pos != ultimo:
+                # Remoção O(1): a última linha ocupa o lugar da removida
+                self._dados[pos] = self._dados[ultimo]
+                self._posicoes[int(self._dados[pos]['id'])] = pos
+            self._n = ultimo
+
+    def atualizar_local(self, local):
+        """Propaga a nova localização do local aos pets que não têm coordenadas próprias."""
+        with self._lock:
+            if self._dados is None or self._mapeado:
+                return
+            dados = self._dados[:self._n]
+            herdam = (dados['local_id'] == local.pk) & ~dados['coord_propria']
+            dados['latitude'][herdam] = np.nan if local.latitude is None else local.latitude
+            dados['longitude'][herdam] = np.nan if local.longitude is None else local.longitude
+
+    # ---- consultas ----
+
+    def _mascara(self, dados, especie=None, porte=None, sexo=None, tracos=()):
+        mascara = np.ones(len(dados), dtype=bool)
+        for coluna, valores, valor in (('especie', ESPECIES, especie), ('porte', PORTES, porte), ('sexo', SEXOS, sexo)):
+            if valor:
+                mascara &= dados[coluna] == _codigo(valores, valor)
+        if tracos:
+            bits = _bits_tracos(lambda traco: traco in tracos)
+            mascara &= (dados['tracos'] & bits) == bits
+        return mascara
+
+    def __len__(self):
+        with self._lock:
+            self._garantir()
+            return self._n
+
+    def filtrar(self, **filtros):
+        """IDs dos pets que atendem aos filtros, do cadastro mais recente ao mais antigo."""
+        with self._lock:
+            self._garantir()
+            dados = self._dados[:self._n]
+            selecionados = dados[self._mascara(dados, **filtros)]
+            ordem = np.argsort(-selecionados['data_cadastro'], kind='stable')
+            return selecionados['id'][ordem].tolist()
+
+    def top_k(self, k, **filtros):
+        """Os `k` pets cadastrados mais recentemente (com filtros opcionais)."""
+        with self._lock:
+            self._garantir()
+            dados = self._dados[:self._n]
+            selecionados = dados[self._mascara(dados, **filtros)]
+            if k < len(selecionados):
+                parcial = np.argpartition(-selecionados['data_cadastro'], k)[:k]
+                selecionados = selecionados[parcial]
+            ordem = np.argsort(-selecionados['data_cadastro'], kind='stable')
+            return selecionados['id'][ordem].tolist()
+
+    def no_raio(self, latitude, longitude, raio_km, **filtros):
+        """Lista de (id, distância em km) dos pets dentro do raio, do mais próximo ao mais distante."""
+        with self._lock:
+            self._garantir()
+            dados = self._dados[:self._n]
+            selecionados = dados[self._mascara(dados, **filtros) & ~np.isnan(dados['latitude'])]
+            distancias = calcular_distancias(latitude, longitude, selecionados['latitude'], selecionados['longitude'])
+            dentro = distancias <= raio_km
+            ids = selecionados['id'][dentro]
+            distancias = distancias[dentro]
+            ordem = np.lexsort((ids, distancias))
+            return list(zip(ids[ordem].tolist(), distancias[ordem].tolist()))
+
+
+snapshot = PetSnapshot()
+
+
+def carregar_pets(ids):
+    """Busca os pets pela chave primária preservando a ordem de `ids`.
+
+    Ignora os IDs removidos e os que deixaram de estar disponíveis depois que o
+    instantâneo foi lido (adotados ou ocultados entre uma atualização e outra).
+    """
+    pets = Pet.objects.disponiveis().select_related('local_adocao').in_bulk(ids)
+    return [pets[pet_id] for pet_id in ids if pet_id in pets]
+
+
+def publicar(diretorio=None, manter=3):
+    """Grava os pets disponíveis numa nova versão em disco e a torna a vigente.
+
+    O arquivo .npy é escrito por completo sob nome temporário e renomeado; só então
+    o ponteiro CURRENT é trocado (também por os.replace). Os processos que mapeiam o
+    instantâneo passam à nova versão na consulta seguinte, sem nunca ver um arquivo
+    pela metade. Mantém as `manter` versões mais recentes.
+    """
+    diretorio = Path(diretorio or settings.PET_SNAPSHOT_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    dados = ler_do_banco()
+    versao = f'pets-{time.time_ns():020d}.npy'
+    _gravar_atomico(diretorio / versao, lambda arquivo: np.save(arquivo, dados))
+    _gravar_atomico(diretorio / PONTEIRO, lambda arquivo: arquivo.write(versao.encode()))
+    for antiga in sorted(diretorio.glob('pets-*.npy'))[:-manter]:
+        try:
+            antiga.unlink()
+        except OSError:
+            # Windows não remove arquivos ainda mapeados; fica para a próxima publicação
+            pass
+    return diretorio / versao, len(dados)
+
+
+def _gravar_atomico(destino, escrever):
+    temporario = destino.with_name(destino.name + '.tmp')
+    with open(temporario, 'wb') as arquivo:
+        escrever(arquivo)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, destino)
@@ -0,0 +1,203 @@
+# Retenção do AuditLog: partições mensais por criado_em no Postgres e poda em lotes curtos
+import logging
+import time as relogio
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+TABELA = 'core_auditlog'
+# Recebe o que cair fora das partições mensais (relógio adiantado, job de criação atrasado)
+PADRAO = 'core_auditlog_padrao'
+PREFIXO = 'core_auditlog_p'
+
+
+def _mes(dia):
+    return dia.replace(day=1)
+
+
+def _proximo_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _inicio(mes):
+    return timezone.make_aware(datetime.combine(mes, time.min))
+
+
+def nome_particao(mes):
+    return f'{PREFIXO}{mes:%Y%m}'
+
+
+# ------------------ Partições (só Postgres) ------------------
+
+def particionada(conexao=None):
+    """True se core_auditlog é uma tabela particionada (Postgres depois da migração 0029)."""
+    conexao = conexao or connection
+    if conexao.vendor != 'postgresql':
+        return False
+    with conexao.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABELA])
+        linha = cursor.fetchone()
+    return bool(linha) and linha[0] == 'p'
+
+
+def particoes(conexao=None):
+    """{mês (date): nome} das partições mensais existentes."""
+    conexao = conexao or connection
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)", [TABELA]
+        )
+        nomes = [linha[0] for linha in cursor.fetchall()]
+    meses = {}
+    for nome in nomes:
+        sufixo = nome[len(PREFIXO):]
+        if nome.startswith(PREFIXO) and len(sufixo) == 6 and sufixo.isdigit():
+            meses[date(int(sufixo[:4]), int(sufixo[4:]), 1)] = nome
+    return meses
+
+
+def _criar_particao(cursor, mes):
+    """Cria a partição do mês levando para ela as linhas do mês que estejam na partição padrão.
+
+    A tabela nasce solta, recebe as linhas e só então é anexada: ATTACH PARTITION
+    trava a tabela mãe em SHARE UPDATE EXCLUSIVE, que não bloqueia as inserções.
+    """
+    nome, inicio, fim = nome_particao(mes), _inicio(mes), _inicio(_proximo_mes(mes))
+    cursor.execute(f"CREATE TABLE {nome} (LIKE {TABELA} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH movidos AS (DELETE FROM {PADRAO} WHERE criado_em >= %s AND criado_em < %s RETURNING *) "
+        f"INSERT INTO {nome} SELECT * FROM movidos", [inicio, fim]
+    )
+    cursor.execute(f"ALTER TABLE {TABELA} ATTACH PARTITION {nome} FOR VALUES FROM (%s) TO (%s)", [inicio, fim])
+
+
+def garantir_particoes(conexao=None, desde=None, meses_a_frente=None):
+    """Cria as partições mensais que faltam de `desde` (padrão: mês atual) até N meses à frente.
+
+    Idempotente; não faz nada se a tabela não for particionada. Retorna os nomes criados.
+    """
+    conexao = conexao or connection
+    if not particionada(conexao):
+        return []
+    if meses_a_frente is None:
+        meses_a_frente = getattr(settings, 'AUDITLOG_PARTICOES_A_FRENTE', 3)
+    existentes = particoes(conexao)
+    mes = _mes(desde or timezone.localdate())
+    ultimo = _mes(timezone.localdate())
+    for _ in range(meses_a_frente):
+        ultimo = _proximo_mes(ultimo)
+    criadas = []
+    with conexao.cursor() as cursor:
+        while mes <= ultimo:
+            if mes not in existentes:
+                with transaction.atomic(using=conexao.alias):
+                    _criar_particao(cursor, mes)
+                criadas.append(nome_particao(mes))
+            mes = _proximo_mes(mes)
+    return criadas
+
+
+# ------------------ Poda ------------------
+
+def politica(dias=None, dias_erros=None):
+    """Dias de retenção: (respostas até 3xx, respostas 4xx/5xx); 0 ou None = guardar para sempre."""
+    if dias is None:
+        dias = getattr(settings, 'AUDITLOG_RETENCAO_DIAS', 180)
+    if dias_erros is None:
+        dias_erros = getattr(settings, 'AUDITLOG_RETENCAO_ERROS_DIAS', 365)
+    return dias or None, dias_erros or None
+
+
+def _expirados(dias, dias_erros, agora):
+    """Filtro dos registros vencidos pela política, ou None se nada vence."""
+    filtros = []
+    if dias:
+        filtros.append(Q(status_code__lt=400, criado_em__lt=agora - timedelta(days=dias)))
+    if dias_erros:
+        filtros.append(Q(status_code__gte=400, criado_em__lt=agora - timedelta(days=dias_erros)))
+    if not filtros:
+        return None
+    filtro = filtros[0]
+    for outro in filtros[1:]:
+        filtro |= outro
+    return filtro
+
+
+def _descartar_particoes(conexao, limite, simular):
+    """Remove as partições cujo mês inteiro é anterior a `limite`; retorna (removidas, adiadas).
+
+    DETACH PARTITION precisa de um lock exclusivo breve na tabela mãe: com lock_timeout
+    curto, se houver disputa a partição fica para a próxima execução em vez de enfileirar
+    as gravações atrás do lock.
+    """
+    removidas, adiadas = [], []
+    espera = getattr(settings, 'AUDITLOG_PODA_LOCK_TIMEOUT', '2s')
+    for mes, nome in sorted(particoes(conexao).items()):
+        if _inicio(_proximo_mes(mes)) > limite:
+            continue
+        if simular:
+            removidas.append(nome)
+            continue
+        try:
+            with transaction.atomic(using=conexao.alias), conexao.cursor() as cursor:
+                cursor.execute("SELECT set_config('lock_timeout', %s, true)", [espera])
+                cursor.execute(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}")
+                cursor.execute(f"DROP TABLE {nome}")
+        except DatabaseError:
+            logger.warning('Partição %s do AuditLog não removida (lock ocupado); fica para a próxima execução', nome)
+            adiadas.append(nome)
+        else:
+            removidas.append(nome)
+    return removidas, adiadas
+
+
+def podar(dias=None, dias_erros=None, lote=None, pausa=None, simular=False, agora=None):
+    """Apaga os registros do AuditLog vencidos pela política de retenção.
+
+    No Postgres particionado, meses inteiros vencidos para todas as classes de registro
+    saem com DETACH + DROP da partição (sem varrer linhas). O restante é apagado em
+    lotes de `lote` ids, cada um na sua transação curta, com `pausa` segundos entre
+    eles para não disputar E/S e locks com as gravações. Com `simular` só conta.
+    """
+    conexao = connection
+    dias, dias_erros = politica(dias, dias_erros)
+    lote = lote or getattr(settings, 'AUDITLOG_PODA_LOTE', 1000)
+    pausa = getattr(settings, 'AUDITLOG_PODA_PAUSA', 0.05) if pausa is None else pausa
+    agora = agora or timezone.now()
+    resumo = {'particoes_criadas': [], 'particoes_removidas': [], 'particoes_adiadas': [], 'registros': 0, 'lotes': 0}
+
+    filtro = _expirados(dias, dias_erros, agora)
+    if particionada(conexao):
+        if not simular:
+            resumo['particoes_criadas'] = garantir_particoes(conexao)
+        if dias and dias_erros:
+            limite = agora - timedelta(days=max(dias, dias_erros))
+            resumo['particoes_removidas'], resumo['particoes_adiadas'] = _descartar_particoes(conexao, limite, simular)
+    if filtro is None:
+        return resumo
+
+    vencidos = AuditLog.objects.filter(filtro).order_by()
+    if simular:
+        resumo['registros'] = vencidos.count()
+        return resumo
+    while True:
+        ids = list(vencidos.values_list('id', flat=True)[:lote])
+        if not ids:
+            break
+        with transaction.atomic():
+            apagados, _ = AuditLog.objects.filter(filtro, id__in=ids).delete()
+        resumo['registros'] += apagados
+        resumo['lotes'] += 1
+        if len(ids) < lote:
+            break
+        if pausa:
+            relogio.sleep(pausa)
+    return resumo
@@ -0,0 +1,200 @@
+# Séries diárias e semanais de adoções e solicitações, consolidadas por local e espécie
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DiaPendenteRollup, MarcaProcessamento, Pet, RollupDiario, RollupSemanal, SolicitacaoAdocao
+
+MARCA = 'rollups_adocao'
+METRICAS = ('adocoes', 'solicitacoes', 'rejeicoes', 'cancelamentos')
+REJEITADAS = ('rejeitada', 'entrevista_rejeitada')
+GRANULARIDADES = {'dia': (RollupDiario, 'dia', 1), 'semana': (RollupSemanal, 'semana', 7)}
+
+# métrica -> (modelo, campo com a data do evento, filtro, caminho do local, caminho da espécie)
+FONTES = {
+    'adocoes': (Pet, 'data_adocao', Q(status='adotado'), 'local_adocao_id', 'especie'),
+    'solicitacoes': (SolicitacaoAdocao, 'data_solicitacao', Q(), 'pet__local_adocao_id', 'pet__especie'),
+    'rejeicoes': (SolicitacaoAdocao, 'data_resposta', Q(status__in=REJEITADAS),
+                  'pet__local_adocao_id', 'pet__especie'),
+    'cancelamentos': (SolicitacaoAdocao, 'data_cancelamento', Q(status='cancelada'),
+                      'pet__local_adocao_id', 'pet__especie'),
+}
+
+
+def inicio_da_semana(dia):
+    return dia - timedelta(days=dia.weekday())
+
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _intervalos(dias):
+    """[(início, fim)] dos dias, juntando os consecutivos: [início do primeiro, início do dia após o último)."""
+    intervalos = []
+    for dia in sorted(dias):
+        if intervalos and intervalos[-1][1] == dia:
+            intervalos[-1][1] = dia + timedelta(days=1)
+        else:
+            intervalos.append([dia, dia + timedelta(days=1)])
+    return [(_inicio_do_dia(inicio), _inicio_do_dia(fim)) for inicio, fim in intervalos]
+
+
+def _contar(desde, ate, dias=()):
+    """{(dia, local_id, especie): {métrica: n}} dos eventos em [desde, ate) e nos `dias` avulsos.
+
+    Uma consulta por métrica; os dias avulsos entram como intervalos da própria coluna de data.
+    """
+    linhas = defaultdict(lambda: dict.fromkeys(METRICAS, 0))
+    for metrica, (modelo, campo, filtro, local, especie) in FONTES.items():
+        periodo = Q(**{f'{campo}__lt': ate})
+        if desde is not None:
+            periodo &= Q(**{f'{campo}__gte': desde})
+        for inicio, fim in _intervalos(dias):
+            periodo |= Q(**{f'{campo}__gte': inicio, f'{campo}__lt': fim})
+        agrupado = (
+            modelo.objects.filter(filtro, periodo).order_by().annotate(dia_evento=TruncDate(campo))
+            .values_list('dia_evento', local, especie).annotate(n=Count('id'))
+        )
+        for dia, local_id, especie_pet, quantidade in agrupado:
+            linhas[(dia, local_id, especie_pet)][metrica] += quantidade
+    return linhas
+
+
+# ------------------ Dias alterados depois de consolidados ------------------
+
+def _dia(momento):
+    return timezone.localdate(momento) if momento else None
+
+
+def estado_pet(pet):
+    """(local, espécie, dia da adoção) com que o pet entra nas séries."""
+    return (pet.local_adocao_id, pet.especie, _dia(pet.data_adocao) if pet.status == 'adotado' else None)
+
+
+def estado_solicitacao(solicitacao):
+    """(pet, dia da solicitação, da rejeição, do cancelamento) com que a solicitação entra nas séries."""
+    return (
+        solicitacao.pet_id,
+        _dia(solicitacao.data_solicitacao),
+        _dia(solicitacao.data_resposta) if solicitacao.status in REJEITADAS else None,
+        _dia(solicitacao.data_cancelamento) if solicitacao.status == 'cancelada' else None,
+    )
+
+
+def marcar_dias(dias):
+    """Registra dias já consolidados cujos eventos mudaram; a próxima `atualizar` os refaz.
+
+    Hoje (e depois) fica de fora: a marca d'água nunca passa de agora e o dia dela é
+    sempre reprocessado.
+    """
+    hoje = timezone.localdate()
+    dias = {dia for dia in dias if dia is not None and dia < hoje}
+    if dias:
+        DiaPendenteRollup.objects.bulk_create([DiaPendenteRollup(dia=dia) for dia in dias], ignore_conflicts=True)
+
+
+def marcar_solicitacoes_do_pet(pet_id):
+    """Pet mudou de local ou espécie: os dias das solicitações dele mudam de linha."""
+    dias = set()
+    for datas in SolicitacaoAdocao.objects.filter(pet_id=pet_id).values_list(
+        'data_solicitacao', 'data_resposta', 'data_cancelamento'
+    ):
+        dias.update(_dia(momento) for momento in datas)
+    marcar_dias(dias)
+
+
+# ------------------ Consolidação ------------------
+
+def atualizar(ate=None, desde=None, completo=False):
+    """Consolida os eventos da marca d'água até `ate` (padrão: agora); pode ser repetida à vontade.
+
+    Só lê dados a partir do dia da marca, que é reprocessado inteiro (a execução
+    anterior pode tê-lo visto pela metade), mais os dias anteriores marcados como
+    alterados (DiaPendenteRollup), e regrava as semanas que esses dias tocam.
+    `desde` (date) força o reprocessamento a partir de um dia; `completo` (ou a falta
+    de marca) consolida todo o histórico. Retorna um resumo do que foi regravado.
+    """
+    ate = ate or timezone.now()
+    with transaction.atomic():
+        marca, _ = MarcaProcessamento.objects.select_for_update().get_or_create(nome=MARCA)
+        if completo:
+            desde = None
+        elif desde is None and marca.processado_ate is not None:
+            desde = timezone.localdate(min(marca.processado_ate, ate))
+        inicio = _inicio_do_dia(desde) if desde is not None else None
+        # Só as marcas lidas aqui são apagadas: as gravadas durante a execução ficam para a próxima
+        pendentes = dict(DiaPendenteRollup.objects.values_list('id', 'dia'))
+        avulsos = {dia for dia in pendentes.values() if desde is not None and dia < desde}
+
+        diarios = RollupDiario.objects.all()
+        if desde is not None:
+            diarios = diarios.filter(Q(dia__gte=desde) | Q(dia__in=avulsos))
+        diarios.delete()
+        novos = RollupDiario.objects.bulk_create(
+            RollupDiario(dia=dia, local_adocao_id=local_id, especie=especie, **contagens)
+            for (dia, local_id, especie), contagens in _contar(inicio, ate, avulsos).items()
+            if local_id is not None
+        )
+
+        semanais = RollupSemanal.objects.all()
+        origem = RollupDiario.objects.all()
+        if desde is not None:
+            semana_inicial = inicio_da_semana(desde)
+            semanas_avulsas = {inicio_da_semana(dia) for dia in avulsos}
+            semanais = semanais.filter(Q(semana__gte=semana_inicial) | Q(semana__in=semanas_avulsas))
+            filtro = Q(dia__gte=semana_inicial)
+            for semana in semanas_avulsas:
+                filtro |= Q(dia__gte=semana, dia__lt=semana + timedelta(days=7))
+            origem = origem.filter(filtro)
+        semanais.delete()
+        somas = defaultdict(lambda: dict.fromkeys(METRICAS, 0))
+        for dia, local_id, especie, *valores in origem.values_list('dia', 'local_adocao_id', 'especie', *METRICAS):
+            contagens = somas[(inicio_da_semana(dia), local_id, especie)]
+            for metrica, valor in zip(METRICAS, valores):
+                contagens[metrica] += valor
+        RollupSemanal.objects.bulk_create(
+            RollupSemanal(semana=semana, local_adocao_id=local_id, especie=especie, **contagens)
+            for (semana, local_id, especie), contagens in somas.items()
+        )
+
+        DiaPendenteRollup.objects.filter(id__in=pendentes).delete()
+        marca.processado_ate = ate
+        marca.save()
+    return {'desde': desde, 'ate': ate, 'dias': len(novos), 'semanas': len(somas), 'dias_alterados': len(avulsos)}
+
+
+def processado_ate():
+    return MarcaProcessamento.objects.filter(nome=MARCA).values_list('processado_ate', flat=True).first()
+
+
+def serie(granularidade='dia', inicio=None, fim=None, local=None, especie=None):
+    """Série com um ponto por dia (ou semana) de `inicio` a `fim`, somando locais e espécies.
+
+    Retorna {'periodos': [date], métrica: [n, ...]}; períodos sem eventos valem zero.
+    """
+    modelo, campo, passo = GRANULARIDADES[granularidade]
+    if granularidade == 'semana':
+        inicio, fim = inicio_da_semana(inicio), inicio_da_semana(fim)
+    consulta = modelo.objects.filter(**{f'{campo}__gte': inicio, f'{campo}__lte': fim})
+    if local is not None:
+        consulta = consulta.filter(local_adocao=local)
+    if especie:
+        consulta = consulta.filter(especie=especie)
+    totais = {
+        linha[campo]: linha
+        for linha in consulta.order_by().values(campo).annotate(**{metrica: Sum(metrica) for metrica in METRICAS})
+    }
+    periodos = []
+    periodo = inicio
+    while periodo <= fim:
+        periodos.append(periodo)
+        periodo += timedelta(days=passo)
+    resultado = {'periodos': periodos}
+    for metrica in METRICAS:
+        resultado[metrica] = [totais.get(p, {}).get(metrica) or 0 for p in periodos]
+    return resultado
@@ -0,0 +1,270 @@
+import itertools
+import threading
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import contadores, facetas, funil, rollups
+from .autocompletar import autocompletar
+from .models import LocalAdocao, Pet, SolicitacaoAdocao
+from .mapa_clusters import piramide
+from .pet_snapshot import publicar, snapshot
+from .trigramas import indice_trigramas
+
+_sequencia = itertools.count(1)
+_agendamento = threading.local()
+
+
+def agendar_publicacao():
+    """Republica o instantâneo em disco após o commit, uma única vez por transação."""
+    if not (snapshot.habilitado() and getattr(settings, 'PET_SNAPSHOT_PUBLICAR_AO_SALVAR', False)):
+        return
+    numero = next(_sequencia)
+    _agendamento.ultimo = numero
+
+    def executar():
+        # Várias alterações na mesma transação: só o último callback publica
+        if getattr(_agendamento, 'ultimo', None) == numero:
+            publicar()
+
+    transaction.on_commit(executar)
+
+
+# As estruturas em memória e o cache de facetas só mudam depois do commit: antes dele
+# outra requisição veria (e outra thread poderia recarregar) um estado que pode ser desfeito
+
+def _pet_alterado(pet):
+    snapshot.atualizar_pet(pet)
+    piramide.atualizar_pet(pet)
+    indice_trigramas.atualizar_pet(pet)
+    autocompletar.atualizar_pet(pet)
+    facetas.invalidar()
+
+
+def _pet_removido(pet_id):
+    snapshot.remover(pet_id)
+    piramide.remover(pet_id)
+    indice_trigramas.remover(pet_id)
+    autocompletar.remover(pet_id)
+    facetas.invalidar()
+
+
+def _local_alterado(local):
+    snapshot.atualizar_local(local)
+    piramide.atualizar_local(local)
+    facetas.invalidar()
+
+
+@receiver(post_save, sender=Pet, dispatch_uid='core_pet_snapshot_save')
+def atualizar_snapshot_pet(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: _pet_alterado(instance))
+        agendar_publicacao()
+
+
+@receiver(post_delete, sender=Pet, dispatch_uid='core_pet_snapshot_delete')
+def remover_snapshot_pet(sender, instance, **kwargs):
+    pet_id = instance.pk  # o delete() zera o pk da instância antes do commit
+    transaction.on_commit(lambda: _pet_removido(pet_id))
+    agendar_publicacao()
+
+
+def local_alterado(local):
+    """Propaga, após o commit, a localização do local às estruturas em memória e aos caches.
+
+    Chamada pelo post_save e por quem grava locais sem save() (bulk_update).
+    """
+    transaction.on_commit(lambda: _local_alterado(local))
+    agendar_publicacao()
+
+
+@receiver(post_save, sender=LocalAdocao, dispatch_uid='core_local_snapshot_save')
+def atualizar_snapshot_local(sender, instance, raw=False, **kwargs):
+    if not raw:
+        local_alterado(instance)
+
+
+# ---- contadores de status (core.contadores) ----
+# O estado carregado fica na instância; no post_save a diferença vira incrementos F()
+
+_DESCONHECIDO = object()
+
+
+def _estado_pet(pet):
+    return (pet.local_adocao_id, pet.status) if pet.ativo else None
+
+
+def _estado_solicitacao(solicitacao):
+    pet = solicitacao._state.fields_cache.get('pet')
+    if pet is None or pet.pk != solicitacao.pet_id:
+        pet = Pet.objects.only('local_adocao_id').get(pk=solicitacao.pet_id)
+    return (pet.local_adocao_id, solicitacao.pet_id, solicitacao.status)
+
+
+def _campos_carregados(instance, campos):
+    return all(campo in instance.__dict__ for campo in campos)
+
+
+@receiver(post_init, sender=Pet, dispatch_uid='core_pet_contador_init')
+def guardar_estado_pet(sender, instance, **kwargs):
+    # from_db() só marca _state.adding depois do __init__: sem pk é instância nova
+    if instance.pk is None:
+        instance._estado_contador = None
+    elif _campos_carregados(instance, ('local_adocao_id', 'status', 'ativo')):
+        instance._estado_contador = _estado_pet(instance)
+    else:
+        instance._estado_contador = _DESCONHECIDO
+
+
+@receiver(post_init, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_contador_init')
+def guardar_estado_solicitacao(sender, instance, **kwargs):
+    # Só (pet, status): o local é resolvido na hora da transição
+    if instance.pk is None:
+        instance._estado_contador = None
+    elif _campos_carregados(instance, ('pet_id', 'status')):
+        instance._estado_contador = (instance.pet_id, instance.status)
+    else:
+        instance._estado_contador = _DESCONHECIDO
+
+
+@receiver(pre_save, sender=Pet, dispatch_uid='core_pet_contador_pre_save')
+def completar_estado_pet(sender, instance, raw=False, **kwargs):
+    # Instância com campos adiados (only/defer): lê o estado atual antes de gravar
+    if not raw and getattr(instance, '_estado_contador', None) is _DESCONHECIDO:
+        atual = Pet.objects.filter(pk=instance.pk).values('local_adocao_id', 'status', 'ativo').first()
+        instance._estado_contador = (atual['local_adocao_id'], atual['status']) if atual and atual['ativo'] else None
+
+
+@receiver(pre_save, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_contador_pre_save')
+def completar_estado_solicitacao(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(instance, '_estado_contador', None) is _DESCONHECIDO:
+        instance._estado_contador = SolicitacaoAdocao.objects.filter(pk=instance.pk).values_list('pet_id', 'status').first()
+
+
+@receiver(post_save, sender=Pet, dispatch_uid='core_pet_contador_save')
+def contar_pet(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    antes = None if created else getattr(instance, '_estado_contador', None)
+    depois = _estado_pet(instance)
+    contadores.transicao_pet(antes, depois)
+    if not created and antes and antes[0] != instance.local_adocao_id:
+        contadores.mover_solicitacoes_do_pet(instance.pk, antes[0], instance.local_adocao_id)
+    instance._estado_contador = depois
+
+
+@receiver(post_save, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_contador_save')
+def contar_solicitacao(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    carregado = None if created else getattr(instance, '_estado_contador', None)
+    if carregado == (instance.pet_id, instance.status):
+        return
+    depois = _estado_solicitacao(instance)
+    antes = None
+    if carregado:
+        pet_id, status = carregado
+        if pet_id == instance.pet_id:
+            local_id = depois[0]
+        else:
+            local_id = Pet.objects.filter(pk=pet_id).values_list('local_adocao_id', flat=True).first()
+        antes = (local_id, pet_id, status)
+    contadores.transicao_solicitacao(antes, depois)
+    if antes is None or antes[2] != depois[2]:
+        # Registro de transições do funil de adoção (core.funil)
+        funil.registrar([(instance.pk, depois[0], antes[2] if antes else '', depois[2])])
+    instance._estado_contador = (instance.pet_id, instance.status)
+
+
+@receiver(post_delete, sender=Pet, dispatch_uid='core_pet_contador_delete')
+def descontar_pet(sender, instance, **kwargs):
+    contadores.transicao_pet(_estado_pet(instance), None)
+
+
+@receiver(post_delete, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_contador_delete')
+def descontar_solicitacao(sender, instance, **kwargs):
+    local_id = Pet.objects.filter(pk=instance.pet_id).values_list('local_adocao_id', flat=True).first()
+    contadores.transicao_solicitacao((local_id, instance.pet_id, instance.status), None)
+
+
+# ---- séries consolidadas (core.rollups) ----
+# Alteração que mexe em eventos de dias já consolidados marca esses dias para a próxima execução
+
+_CAMPOS_ROLLUP_PET = ('local_adocao_id', 'especie', 'status', 'data_adocao')
+_CAMPOS_ROLLUP_SOLICITACAO = ('pet_id', 'status', 'data_solicitacao', 'data_resposta', 'data_cancelamento')
+
+
+def _dias_do_estado(estado):
+    """Dias de evento de um estado de rollups.estado_pet/estado_solicitacao (as datas dele)."""
+    return {parte for parte in estado or () if isinstance(parte, date)}
+
+
+@receiver(post_init, sender=Pet, dispatch_uid='core_pet_rollup_init')
+def guardar_rollup_pet(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._estado_rollup = None
+    elif _campos_carregados(instance, _CAMPOS_ROLLUP_PET):
+        instance._estado_rollup = rollups.estado_pet(instance)
+    else:
+        instance._estado_rollup = _DESCONHECIDO
+
+
+@receiver(post_init, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_rollup_init')
+def guardar_rollup_solicitacao(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._estado_rollup = None
+    elif _campos_carregados(instance, _CAMPOS_ROLLUP_SOLICITACAO):
+        instance._estado_rollup = rollups.estado_solicitacao(instance)
+    else:
+        instance._estado_rollup = _DESCONHECIDO
+
+
+@receiver(pre_save, sender=Pet, dispatch_uid='core_pet_rollup_pre_save')
+def completar_rollup_pet(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(instance, '_estado_rollup', None) is _DESCONHECIDO:
+        atual = Pet.objects.filter(pk=instance.pk).only(*_CAMPOS_ROLLUP_PET).first()
+        instance._estado_rollup = rollups.estado_pet(atual) if atual else None
+
+
+@receiver(pre_save, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_rollup_pre_save')
+def completar_rollup_solicitacao(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(instance, '_estado_rollup', None) is _DESCONHECIDO:
+        atual = SolicitacaoAdocao.objects.filter(pk=instance.pk).only(*_CAMPOS_ROLLUP_SOLICITACAO).first()
+        instance._estado_rollup = rollups.estado_solicitacao(atual) if atual else None
+
+
+@receiver(post_save, sender=Pet, dispatch_uid='core_pet_rollup_save')
+def marcar_rollup_pet(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    antes = None if created else getattr(instance, '_estado_rollup', None)
+    depois = rollups.estado_pet(instance)
+    if antes != depois:
+        rollups.marcar_dias(_dias_do_estado(antes) | _dias_do_estado(depois))
+        if antes and antes[:2] != depois[:2]:
+            rollups.marcar_solicitacoes_do_pet(instance.pk)
+    instance._estado_rollup = depois
+
+
+@receiver(post_save, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_rollup_save')
+def marcar_rollup_solicitacao(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    antes = None if created else getattr(instance, '_estado_rollup', None)
+    depois = rollups.estado_solicitacao(instance)
+    if antes != depois:
+        rollups.marcar_dias(_dias_do_estado(antes) | _dias_do_estado(depois))
+    instance._estado_rollup = depois
+
+
+@receiver(post_delete, sender=Pet, dispatch_uid='core_pet_rollup_delete')
+def marcar_rollup_pet_removido(sender, instance, **kwargs):
+    rollups.marcar_dias(_dias_do_estado(rollups.estado_pet(instance)))
+
+
+@receiver(post_delete, sender=SolicitacaoAdocao, dispatch_uid='core_solicitacao_rollup_delete')
+def marcar_rollup_solicitacao_removida(sender, instance, **kwargs):
+    rollups.marcar_dias(_dias_do_estado(rollups.estado_solicitacao(instance)))
@@ -0,0 +1,26 @@
+# Base comum dos testes
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.models import AceitacaoTermos, LocalAdocao, Pet
+
+
+# Campos obrigatórios de um Pet de teste, exceto nome e local de adoção
+PET_PADRAO = dict(especie='cao', idade=12, sexo='macho', porte='medio', descricao='Teste')
+
+
+def aceitar_termos(user):
+    """Registra o aceite dos termos, sem o qual o middleware redireciona o usuário."""
+    AceitacaoTermos.objects.create(usuario=user, termos_aceitos=True, lgpd_aceito=True,
+                                   ip_aceitacao='127.0.0.1', user_agent='test', versao_termos='1.0')
+
+
+class PetsTestCase(TestCase):
+    """TestCase com fábricas do local de adoção de teste e dos seus pets."""
+
+    def _local(self, **kwargs):
+        user = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        return LocalAdocao.objects.create(usuario=user, cnpj='12345678000199', **kwargs)
+
+    def _pet(self, nome, **kwargs):
+        return Pet.objects.create(nome=nome, **{**PET_PADRAO, 'local_adocao': self.local, **kwargs})
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.kpis import CHAVE_CACHE, calcular_kpis, obter_snapshot
+from core.models import LocalAdocao, Pet
+from core.tests.base import aceitar_termos
+
+
+class KpisBase(TestCase):
+    def setUp(self):
+        cache.delete(CHAVE_CACHE)
+        self.addCleanup(cache.delete, CHAVE_CACHE)
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'Adminpass123', is_staff=True)
+        aceitar_termos(self.admin)
+        self.local = LocalAdocao.objects.create(usuario=self.admin, cnpj='12345678000199')
+        for status in ('disponivel', 'disponivel', 'adotado'):
+            Pet.objects.create(nome='Rex', especie='cao', idade=12, sexo='macho', porte='medio',
+                               descricao='Teste', local_adocao=self.local, status=status)
+
+
+class CalcularKpisTests(KpisBase):
+    def test_uma_consulta_por_modelo(self):
+        with self.assertNumQueries(6):
+            kpis = calcular_kpis()
+        self.assertEqual((kpis['pets_total'], kpis['pets_disponiveis'], kpis['pets_adotados']), (3, 2, 1))
+        self.assertEqual((kpis['users_total'], kpis['locais_total'], kpis['twofa_taxa']), (1, 1, 0))
+
+    def test_snapshot_em_cache_e_atualizacao_com_intervalo_minimo(self):
+        primeiro = obter_snapshot()
+        Pet.objects.filter(status='adotado').update(status='disponivel')
+        # Cache fora do banco: ler o instantâneo não consulta nada
+        with self.assertNumQueries(0):
+            self.assertEqual(obter_snapshot(), primeiro)
+            self.assertEqual(obter_snapshot(forcar=True), primeiro)  # recém-calculado
+        primeiro['calculado_em'] -= timedelta(seconds=30)
+        cache.set(CHAVE_CACHE, primeiro)
+        atualizado = obter_snapshot(forcar=True)
+        self.assertEqual(atualizado['kpis']['pets_disponiveis'], 3)
+        self.assertGreater(atualizado['calculado_em'], primeiro['calculado_em'])
+
+
+class AdminDashboardKpisTests(KpisBase):
+    def test_dashboard_renderiza_do_snapshot(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('core:admin_dashboard'))
+        with CaptureQueriesContext(connection) as consultas:
+            resp = self.client.get(reverse('core:admin_dashboard'))
+        self.assertFalse([q['sql'] for q in consultas if 'COUNT(' in q['sql']])
+        self.assertContains(resp, 'Indicadores calculados há')
+        self.assertEqual(resp.context['kpis']['pets_total'], 3)
+
+    @override_settings(ADMIN_KPIS_INTERVALO_MINIMO=0)
+    def test_botao_atualizar(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('core:admin_dashboard'))
+        Pet.objects.create(nome='Novo', especie='gato', idade=3, sexo='femea', porte='pequeno',
+                           descricao='Teste', local_adocao=self.local)
+        resp = self.client.post(reverse('core:admin_dashboard'))
+        self.assertRedirects(resp, reverse('core:admin_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(obter_snapshot()['kpis']['pets_total'], 4)
@@ -0,0 +1,83 @@
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from core.autocompletar import Autocompletar, Trie, autocompletar, sugerir
+from core.tests.base import PetsTestCase
+
+
+class TrieTests(SimpleTestCase):
+    def setUp(self):
+        self.trie = Trie()
+        for valor, quantidade in (('Labrador', 3), ('Lhasa Apso', 1), ('Golden Retriever', 2), ('labrador', 1)):
+            self.trie.alterar(valor, quantidade)
+
+    def test_prefixo_por_frequencia_e_sem_acento(self):
+        self.assertEqual(self.trie.sugerir('l'), [('Labrador', 4), ('Lhasa Apso', 1)])
+        self.assertEqual(self.trie.sugerir('LÁB'), [('Labrador', 4)])
+
+    def test_prefixo_de_palavra_interna(self):
+        self.assertEqual(self.trie.sugerir('retr'), [('Golden Retriever', 2)])
+
+    def test_reducao_reordena_e_remove(self):
+        self.trie.alterar('Labrador', -3)
+        self.assertEqual(self.trie.sugerir('l'), [('labrador', 1), ('Lhasa Apso', 1)])
+        self.trie.alterar('labrador', -1)
+        self.assertEqual(self.trie.sugerir('la'), [])
+        self.assertNotIn('a', self.trie.raiz.filhos['l'].filhos)
+
+    def test_prefixo_inexistente(self):
+        self.assertEqual(self.trie.sugerir('zz'), [])
+
+
+class AutocompletarBase(PetsTestCase):
+    def setUp(self):
+        autocompletar.invalidar()
+        self.addCleanup(autocompletar.invalidar)
+        self.local = self._local()
+        self.thor = self._pet('Thor', raca='Labrador')
+        self.toby = self._pet('Toby', raca='Labrador')
+        self.tom = self._pet('Tom', raca='Pinscher', status='adotado')
+
+
+@override_settings(AUTOCOMPLETAR_ENABLED=True)
+class AutocompletarIncrementalTests(AutocompletarBase):
+    def test_trie_acompanha_alteracoes(self):
+        self.assertEqual(sugerir('t', campos=('nome',)), [
+            {'campo': 'nome', 'valor': 'Thor', 'quantidade': 1},
+            {'campo': 'nome', 'valor': 'Toby', 'quantidade': 1},
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tom.status = 'disponivel'
+            self.tom.save()
+            self.thor.raca = 'Pinscher'
+            self.thor.save()
+            self.toby.delete()
+        novo = Autocompletar()
+        for prefixo in ('t', 'l', 'p'):
+            for campo in ('raca', 'nome'):
+                self.assertEqual(autocompletar.sugerir(prefixo, campo), novo.sugerir(prefixo, campo))
+        self.assertEqual(sugerir('pin'), [{'campo': 'raca', 'valor': 'Pinscher', 'quantidade': 2}])
+
+
+class AutocompletarNoBancoTests(AutocompletarBase):
+    def test_sem_trie_agrupa_no_banco(self):
+        self._pet('Rex', raca='Golden Retriever')
+        with self.assertNumQueries(1):
+            self.assertEqual(sugerir('lab', campos=('raca',)), [{'campo': 'raca', 'valor': 'Labrador', 'quantidade': 2}])
+        self.assertEqual(sugerir('retr'), [{'campo': 'raca', 'valor': 'Golden Retriever', 'quantidade': 1}])
+        self.assertEqual(sugerir('pin'), [])  # Tom foi adotado
+        self.assertFalse(autocompletar.construido)
+
+
+class AutocompletarApiTests(AutocompletarBase):
+    def test_conclusoes_por_prefixo_com_cache_http(self):
+        resp = self.client.get(reverse('core:autocompletar_pets'), {'termo': 'lab'})
+        self.assertEqual(resp.json()['sugestoes'], [{'campo': 'raca', 'valor': 'Labrador', 'quantidade': 2}])
+        self.assertIn('max-age=60', resp['Cache-Control'])
+
+    @override_settings(BUSCA_TRIGRAMAS_ENABLED=True)
+    def test_sem_prefixo_recorre_a_busca_aproximada(self):
+        dados = self.client.get(reverse('core:autocompletar_pets'), {'termo': 'labrodor', 'campo': 'raca'}).json()
+        self.assertEqual([s['valor'] for s in dados['sugestoes']], ['Labrador'])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(reverse('core:autocompletar_pets'), {'termo': 'a', 'limite': 'x'}).status_code, 400)
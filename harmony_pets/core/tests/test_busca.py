@@ -0,0 +1,62 @@
+from django.db import connection
+from django.urls import reverse
+from core.busca import TABELA_FTS, _consulta_fts5, garantir_indice, remover_indice
+from core.models import Pet
+from core.tests.base import PetsTestCase
+
+
+class BuscaTextualBase(PetsTestCase):
+    def setUp(self):
+        self.local = self._local()
+        self.thor = self._pet('Thor', raca='Labrador', descricao='Muito brincalhão')
+        self.luna = self._pet('Luna', especie='gato', raca='Siamês', cor='Creme', descricao='Gosta de labradores da vizinhança')
+        self.bidu = self._pet('Bidu', descricao='Tranquilo', cuidados_especiais='Medicação para diabetes')
+
+    def _nomes(self, texto):
+        return [pet.nome for pet in Pet.objects.buscar(texto).order_by('-relevancia', 'id')]
+
+
+class BuscarTests(BuscaTextualBase):
+    def test_campo_mais_relevante_primeiro(self):
+        self.assertEqual(self._nomes('labrador'), ['Thor', 'Luna'])
+
+    def test_acentos_e_cuidados_especiais(self):
+        self.assertEqual(self._nomes('siames'), ['Luna'])
+        self.assertEqual(self._nomes('diabetes'), ['Bidu'])
+
+    def test_todos_os_termos_sao_exigidos(self):
+        self.assertEqual(self._nomes('labrador brincalhão'), ['Thor'])
+
+    def test_indice_acompanha_alteracoes_e_exclusoes(self):
+        self.bidu.raca = 'Beagle'
+        self.bidu.save()
+        self.assertEqual(self._nomes('beagle'), ['Bidu'])
+        self.thor.delete()
+        self.assertEqual(self._nomes('labrador'), ['Luna'])
+
+    def test_texto_sem_termos_nao_filtra(self):
+        self.assertEqual(Pet.objects.buscar(' "* ').count(), 3)
+
+    def test_consulta_fts5_escapa_operadores(self):
+        self.assertEqual(_consulta_fts5('gatos OR "x'), '"gato"* "or"* "x"*')
+
+    def test_indice_recriado_apos_remocao(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Específico do FTS5')
+        remover_indice()
+        garantir_indice()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {TABELA_FTS}")
+            self.assertEqual(cursor.fetchone()[0], 3)
+        self.assertEqual(self._nomes('labrador'), ['Thor', 'Luna'])
+
+
+class PetsListBuscaTests(BuscaTextualBase):
+    def test_lista_filtrada_e_ordenada_por_relevancia(self):
+        resp = self.client.get(reverse('core:pets_list'), {'search': 'labrador'})
+        self.assertEqual([pet.nome for pet in resp.context['page_obj']], ['Thor', 'Luna'])
+        self.assertEqual(resp.context['search_atual'], 'labrador')
+
+    def test_busca_combinada_com_filtros(self):
+        resp = self.client.get(reverse('core:pets_list'), {'search': 'labrador', 'especie': 'gato'})
+        self.assertEqual([pet.nome for pet in resp.context['page_obj']], ['Luna'])
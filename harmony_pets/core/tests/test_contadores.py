@@ -0,0 +1,120 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core import contadores
+from core.models import AceitacaoTermos, ContadorStatus, InteressadoAdocao, LocalAdocao, Pet, SolicitacaoAdocao
+
+
+class ContadoresBase(TestCase):
+    def setUp(self):
+        self.org = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        AceitacaoTermos.objects.create(usuario=self.org, termos_aceitos=True, lgpd_aceito=True,
+                                       ip_aceitacao='127.0.0.1', user_agent='test', versao_termos='1.0')
+        self.local = LocalAdocao.objects.create(usuario=self.org, cnpj='12345678000199')
+        base = dict(especie='cao', idade=12, sexo='macho', porte='medio', descricao='Teste', local_adocao=self.local)
+        self.pets = [Pet.objects.create(nome=f'Pet {i}', **base) for i in range(3)]
+        self.interessados = []
+        for i in range(3):
+            user = User.objects.create_user(f'int{i}', f'int{i}@example.com', 'pass12345')
+            self.interessados.append(InteressadoAdocao.objects.create(usuario=user, cpf=f'1234567890{i}'))
+
+    def _solicitar(self, pet, interessado, **campos):
+        return SolicitacaoAdocao.objects.create(pet=pet, interessado=interessado, motivo='m',
+                                                experiencia_pets='e', situacao_moradia='s', **campos)
+
+
+class TransicoesTests(ContadoresBase):
+    def test_pets_por_status_do_local(self):
+        self.assertEqual(contadores.do_local(self.local, contadores.PETS), {'disponivel': 3})
+        pet = Pet.objects.get(pk=self.pets[0].pk)
+        pet.status = 'adotado'
+        pet.save()
+        self.pets[1].ativo = False
+        self.pets[1].save()
+        self.assertEqual(contadores.do_local(self.local, contadores.PETS), {'disponivel': 1, 'adotado': 1})
+        self.assertEqual(contadores.reconciliar(corrigir=False), [])
+
+    def test_instancia_com_campos_adiados(self):
+        pet = Pet.objects.only('id', 'nome').get(pk=self.pets[0].pk)
+        pet.status = 'reservado'
+        pet.save()
+        self.assertEqual(contadores.do_local(self.local, contadores.PETS), {'disponivel': 2, 'reservado': 1})
+
+    def test_solicitacoes_por_local_e_por_pet(self):
+        alvo = self._solicitar(self.pets[0], self.interessados[0])
+        self._solicitar(self.pets[0], self.interessados[1])
+        self._solicitar(self.pets[1], self.interessados[2], status='em_entrevista')
+        alvo.status = 'agendado'
+        alvo.save()
+        rejeitadas = contadores.atualizar_solicitacoes(
+            SolicitacaoAdocao.objects.filter(pet=self.pets[0], status='pendente'), 'rejeitada')
+        self.assertEqual(rejeitadas, 1)
+        self.assertEqual(contadores.do_local(self.local, contadores.SOLICITACOES),
+                         {'agendado': 1, 'rejeitada': 1, 'em_entrevista': 1})
+        self.assertEqual(contadores.do_pet(self.pets[0]), {'agendado': 1, 'rejeitada': 1})
+        self.assertEqual(contadores.reconciliar(corrigir=False), [])
+
+    def test_pet_movido_de_local_e_apagado(self):
+        self._solicitar(self.pets[0], self.interessados[0])
+        outro = LocalAdocao.objects.create(usuario=User.objects.create_user('org2', 'org2@example.com', 'x'), cnpj='98765432000199')
+        pet = self.pets[0]
+        pet.local_adocao = outro
+        pet.save()
+        self.assertEqual(contadores.do_local(outro, contadores.SOLICITACOES), {'pendente': 1})
+        self.assertEqual(contadores.do_local(self.local, contadores.SOLICITACOES), {})
+        pet_id = pet.pk
+        pet.delete()
+        self.assertEqual(contadores.do_local(outro, contadores.PETS), {})
+        self.assertEqual(contadores.do_local(outro, contadores.SOLICITACOES), {})
+        self.assertFalse(ContadorStatus.objects.filter(pet_id=pet_id).exists())
+        self.assertEqual(contadores.reconciliar(corrigir=False), [])
+
+
+class ReconciliacaoTests(ContadoresBase):
+    def test_corrige_desvio(self):
+        self._solicitar(self.pets[0], self.interessados[0])
+        # Alterações que não passam pelos sinais
+        Pet.objects.filter(pk=self.pets[2].pk).update(status='adotado')
+        ContadorStatus.objects.filter(pet=self.pets[0]).delete()
+        saida = StringIO()
+        call_command('reconciliar_contadores', '--verificar', stdout=saida)
+        self.assertIn('3 contadores divergentes', saida.getvalue())
+        self.assertEqual(contadores.do_local(self.local, contadores.PETS), {'disponivel': 3})
+        call_command('reconciliar_contadores', stdout=StringIO())
+        self.assertEqual(contadores.do_local(self.local, contadores.PETS), {'disponivel': 2, 'adotado': 1})
+        self.assertEqual(contadores.do_pet(self.pets[0]), {'pendente': 1})
+        self.assertEqual(contadores.reconciliar(), [])
+
+
+class PaineisTests(ContadoresBase):
+    def setUp(self):
+        super().setUp()
+        self._solicitar(self.pets[0], self.interessados[0])
+        self._solicitar(self.pets[0], self.interessados[1], status='cancelada')
+        self.client.force_login(self.org)
+
+    def _sem_count(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([q['sql'] for q in consultas if 'COUNT(' in q['sql']])
+        return resp
+
+    def test_gerenciar_pets(self):
+        resp = self._sem_count(reverse('core:gerenciar_pets'))
+        self.assertEqual(resp.context['stats'], {'total': 3, 'disponiveis': 3, 'adotados': 0, 'reservados': 0})
+
+    def test_solicitacoes_adocao(self):
+        resp = self._sem_count(reverse('core:solicitacoes_adocao'))
+        self.assertEqual(resp.context['stats']['total'], 2)
+        self.assertEqual(resp.context['stats']['pendentes'], 1)
+
+    def test_historico_pet(self):
+        resp = self._sem_count(reverse('core:historico_pet', args=[self.pets[0].id]))
+        self.assertEqual(resp.context['stats']['canceladas'], 1)
+        self.assertEqual(resp.context['stats']['total'], 2)
@@ -0,0 +1,98 @@
+import csv
+import gzip
+import io
+import json
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+
+from core import exportacao
+from core.models import AuditLog, LocalAdocao, Pet, SolicitacaoAdocao, InteressadoAdocao
+
+
+class ExportacaoAuditLogTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='x', is_staff=True, is_superuser=True)
+        for i in range(7):
+            usuario = User.objects.create(username=f'user{i}')
+            AuditLog.objects.create(
+                usuario=usuario, metodo='POST', caminho=f'/p/{i}/', view_name='v', status_code=200,
+                params={'pagina': i}, body={'nome': 'José'},
+            )
+        AuditLog.objects.create(metodo='GET', caminho='/anon/', status_code=404)
+        self.request = RequestFactory().post('/admin/core/auditlog/')
+        self.request.user = self.admin
+        self.model_admin = site._registry[AuditLog]
+
+    def _ler(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content)
+
+    def test_csv_em_fluxo_mantem_colunas(self):
+        response = self.model_admin.exportar_csv(self.request, AuditLog.objects.all())
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="auditlog.csv"')
+        linhas = list(csv.reader(io.StringIO(self._ler(response).decode('utf-8'))))
+        self.assertEqual(linhas[0][:4], ['criado_em', 'usuario', 'metodo', 'caminho'])
+        self.assertEqual(len(linhas), 9)
+        por_caminho = {linha[3]: linha for linha in linhas[1:]}
+        self.assertEqual(por_caminho['/p/3/'][1], 'user3')
+        self.assertEqual(json.loads(por_caminho['/p/3/'][9]), {'nome': 'José'})
+        self.assertEqual(por_caminho['/anon/'][1], '')
+
+    def test_ndjson_compactado(self):
+        response = self.model_admin.exportar_ndjson_gz(self.request, AuditLog.objects.all())
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="auditlog.ndjson.gz"')
+        registros = [json.loads(linha) for linha in gzip.decompress(self._ler(response)).decode('utf-8').splitlines()]
+        self.assertEqual(len(registros), 8)
+        self.assertIn({'pagina': 2}, [registro['params'] for registro in registros])
+
+    def test_le_em_blocos_sem_consulta_por_usuario(self):
+        pedacos = exportacao.conteudo(AuditLog.objects.all(), exportacao.AUDITLOG, 'ndjson', chunk_size=4)
+        # Blocos de 4 registros com o usuário no mesmo SELECT: 8 registros, 1 consulta no SQLite
+        with self.assertNumQueries(1):
+            corpo = b''.join(pedacos)
+        self.assertEqual(len(corpo.splitlines()), 8)
+        pedacos = list(exportacao.conteudo(AuditLog.objects.all(), exportacao.AUDITLOG, 'ndjson', chunk_size=4))
+        self.assertEqual(len(pedacos), 8)
+
+    def test_formato_desconhecido(self):
+        with self.assertRaises(ValueError):
+            exportacao.resposta(AuditLog.objects.all(), exportacao.AUDITLOG, 'xml')
+
+
+class ExportacaoAdocaoTests(TestCase):
+    def setUp(self):
+        dono = User.objects.create_user(username='ong', password='x')
+        local = LocalAdocao.objects.create(usuario=dono, cnpj='12345678000199', nome_fantasia='Abrigo Feliz')
+        self.pet = Pet.objects.create(
+            nome='Rex', especie='cachorro', idade=12, sexo='macho', porte='medio', descricao='Dócil', local_adocao=local,
+        )
+        interessado = InteressadoAdocao.objects.create(usuario=User.objects.create_user(username='ana', password='x'), cpf='12345678901')
+        self.interessado = interessado
+        SolicitacaoAdocao.objects.create(
+            pet=self.pet, interessado=interessado, motivo='m', experiencia_pets='e', situacao_moradia='s',
+        )
+
+    def test_pets_csv(self):
+        corpo = b''.join(exportacao.conteudo(Pet.objects.all(), exportacao.PETS, 'csv')).decode('utf-8')
+        linhas = list(csv.DictReader(io.StringIO(corpo)))
+        self.assertEqual(linhas[0]['nome'], 'Rex')
+        self.assertEqual(linhas[0]['local_adocao'], 'Abrigo Feliz')
+
+    def test_solicitacoes_csv_compactado(self):
+        with self.assertNumQueries(1):
+            corpo = b''.join(exportacao.conteudo(SolicitacaoAdocao.objects.all(), exportacao.SOLICITACOES, 'csv', compactar=True))
+        linhas = list(csv.DictReader(io.StringIO(gzip.decompress(corpo).decode('utf-8'))))
+        self.assertEqual(linhas[0]['pet'], 'Rex')
+        self.assertEqual(linhas[0]['interessado'], 'ana')
+        self.assertEqual(linhas[0]['status'], 'pendente')
+
+    def test_solicitacao_de_conta_excluida(self):
+        # InteressadoAdocao.usuario é SET_NULL: a solicitação sobrevive à exclusão da conta
+        solicitacao = SolicitacaoAdocao.objects.select_related('pet__local_adocao', 'interessado').get()
+        solicitacao.interessado.usuario = None
+        valores = dict((cabecalho, extrator(solicitacao)) for cabecalho, extrator in exportacao.SOLICITACOES['colunas'])
+        self.assertEqual((valores['pet'], valores['interessado']), ('Rex', ''))
@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.facetas import contar, contar_com_cache, filtros_da_requisicao
+from core.models import Pet
+from core.tests.base import PetsTestCase
+
+
+class FacetasBase(PetsTestCase):
+    def setUp(self):
+        self.local = self._local()
+        self.rex = self._pet('Rex', castrado=True)
+        self.mia = self._pet('Mia', especie='gato', porte='pequeno', sexo='femea', castrado=True, calmo=True)
+        self.bob = self._pet('Bob', porte='grande')
+        self._pet('Tom', status='adotado', castrado=True)
+
+
+class ContarFacetasTests(FacetasBase):
+    def test_uma_consulta_e_filtros_das_outras_dimensoes(self):
+        filtros = {'especie': 'cao', 'castrado': True}
+        with CaptureQueriesContext(connection) as consultas:
+            contagens = contar(Pet.objects.disponiveis(), filtros)
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(contagens['total'], 1)
+        # A própria dimensão não se filtra: gato continua contando os castrados
+        self.assertEqual(contagens['especie'], {'cao': 1, 'gato': 1, 'coelho': 0, 'hamster': 0, 'passaro': 0, 'outro': 0})
+        self.assertEqual(contagens['porte']['medio'], 1)
+        self.assertEqual(contagens['porte']['grande'], 0)
+        self.assertEqual(contagens['caracteristicas']['castrado'], 1)
+        self.assertEqual(contagens['caracteristicas']['calmo'], 0)
+
+    def test_filtros_invalidos_sao_ignorados(self):
+        self.assertEqual(filtros_da_requisicao({'especie': 'dragao', 'porte': 'medio', 'calmo': '1', 'docil': '0'}),
+                         {'porte': 'medio', 'calmo': True})
+
+    def test_cache_invalidado_por_alteracao_de_pet(self):
+        contar_com_cache(Pet.objects.disponiveis(), {})
+        with self.assertNumQueries(0):
+            contagens = contar_com_cache(Pet.objects.disponiveis(), {})
+        self.assertEqual(contagens['especie']['gato'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mia.status = 'adotado'
+            self.mia.save()
+        self.assertEqual(contar_com_cache(Pet.objects.disponiveis(), {})['especie']['gato'], 0)
+
+
+class PetsListFacetasTests(FacetasBase):
+    def test_contagens_e_filtro_por_caracteristica(self):
+        resp = self.client.get(reverse('core:pets_list'), {'castrado': '1'})
+        self.assertEqual({pet.nome for pet in resp.context['page_obj']}, {'Rex', 'Mia'})
+        facetas = resp.context['facetas']
+        self.assertEqual(facetas['total'], 2)
+        gato = next(opcao for opcao in facetas['especie']['opcoes'] if opcao['valor'] == 'gato')
+        self.assertEqual(gato['quantidade'], 1)
+        self.assertIn('castrado=1', gato['url'])
+        self.assertContains(resp, 'Gato (1)')
+
+    def test_link_de_faceta_recomeca_da_primeira_pagina(self):
+        for i in range(15):
+            self._pet(f'Gato {i}', especie='gato')
+            self._pet(f'Cão {i}')
+        resp = self.client.get(reverse('core:pets_list'))
+        resp = self.client.get(reverse('core:pets_list') + resp.context['page_obj'].link_proxima)
+        gato = next(opcao for opcao in resp.context['facetas']['especie']['opcoes'] if opcao['valor'] == 'gato')
+        self.assertEqual(gato['quantidade'], 16)
+        self.assertNotIn('cursor=', gato['url'])
+        nomes, link = [], gato['url']
+        while link:
+            pagina = self.client.get(reverse('core:pets_list') + link).context['page_obj']
+            nomes += [pet.nome for pet in pagina]
+            link = pagina.link_proxima if pagina.has_next() else None
+        self.assertEqual(len(nomes), 16)
+
+    def test_no_maximo_uma_consulta_a_mais(self):
+        self.client.get(reverse('core:pets_list'), {'porte': 'medio'})
+        with CaptureQueriesContext(connection) as com_cache:
+            self.client.get(reverse('core:pets_list'), {'porte': 'medio'})
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.get(nome='Bob').save()
+        with CaptureQueriesContext(connection) as sem_cache:
+            self.client.get(reverse('core:pets_list'), {'porte': 'medio'})
+        self.assertEqual(len(sem_cache), len(com_cache) + 1)
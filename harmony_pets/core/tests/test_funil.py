@@ -0,0 +1,132 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core import contadores, funil
+from core.models import (FunilMensal, InteressadoAdocao, LocalAdocao, Pet, SolicitacaoAdocao,
+                         TransicaoSolicitacao)
+from core.tests.base import PET_PADRAO, aceitar_termos
+
+
+class FunilBase(TestCase):
+    def setUp(self):
+        self.org = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        aceitar_termos(self.org)
+        self.local = LocalAdocao.objects.create(usuario=self.org, cnpj='12345678000199')
+        base = dict(PET_PADRAO, local_adocao=self.local)
+        self.pets = [Pet.objects.create(nome=f'Pet {i}', **base) for i in range(4)]
+        self.interessados = []
+        for i in range(4):
+            user = User.objects.create_user(f'int{i}', f'int{i}@example.com', 'pass12345')
+            self.interessados.append(InteressadoAdocao.objects.create(usuario=user, cpf=f'1234567890{i}'))
+
+    def _solicitar(self, pet, interessado):
+        return SolicitacaoAdocao.objects.create(pet=pet, interessado=interessado, motivo='m',
+                                                experiencia_pets='e', situacao_moradia='s')
+
+    def _mudar(self, solicitacao, status, depois_de):
+        solicitacao.status = status
+        solicitacao.save()
+        # Posiciona a transição recém-gravada no tempo desejado (o registro não aceita save())
+        ultima = solicitacao.transicoes.latest('id')
+        TransicaoSolicitacao.objects.filter(pk=ultima.pk).update(criado_em=solicitacao.data_solicitacao + depois_de)
+
+
+class RegistroTests(FunilBase):
+    def test_transicoes_registradas(self):
+        solicitacao = self._solicitar(self.pets[0], self.interessados[0])
+        self._solicitar(self.pets[0], self.interessados[1])
+        solicitacao.status = 'em_entrevista'
+        solicitacao.save()
+        solicitacao.save()  # sem mudança de status, sem transição
+        contadores.atualizar_solicitacoes(SolicitacaoAdocao.objects.filter(pet=self.pets[0]), 'rejeitada')
+        self.assertEqual(
+            list(solicitacao.transicoes.order_by('id').values_list('de', 'para')),
+            [('', 'pendente'), ('pendente', 'em_entrevista'), ('em_entrevista', 'rejeitada')],
+        )
+        self.assertEqual(TransicaoSolicitacao.objects.filter(local_adocao=self.local).count(), 5)
+
+    def test_somente_inclusao(self):
+        transicao = self._solicitar(self.pets[0], self.interessados[0]).transicoes.get()
+        transicao.para = 'concluida'
+        with self.assertRaises(ValueError):
+            transicao.save()
+        with self.assertRaises(ValueError):
+            transicao.delete()
+
+    def test_view_registra_transicao(self):
+        solicitacao = self._solicitar(self.pets[0], self.interessados[0])
+        self.client.force_login(self.org)
+        self.client.post(reverse('core:agendar_entrevista', args=[solicitacao.id]),
+                         {'data_entrevista': '2030-01-10T10:00', 'local_entrevista': 'Sede'})
+        self.assertEqual(solicitacao.transicoes.latest('id').para, 'em_entrevista')
+
+
+class AgregadoTests(FunilBase):
+    def setUp(self):
+        super().setUp()
+        horas = timedelta(hours=1)
+        self.solicitacoes = [self._solicitar(pet, interessado) for pet, interessado in zip(self.pets, self.interessados)]
+        a, b, c, d = self.solicitacoes
+        self._mudar(a, 'em_entrevista', 2 * horas)
+        self._mudar(a, 'entrevista_aprovada', 24 * horas)
+        self._mudar(a, 'agendado', 48 * horas)
+        self._mudar(a, 'concluida', 72 * horas)
+        self._mudar(b, 'em_entrevista', 4 * horas)
+        self._mudar(b, 'entrevista_rejeitada', 30 * horas)
+        # Sem passar pela entrevista registrada: conta nas etapas anteriores, sem tempo
+        self._mudar(c, 'agendado', 10 * horas)
+        self._mudar(d, 'cancelada', 1 * horas)
+        # Tudo no passado, como se a atividade tivesse sido dias atrás
+        SolicitacaoAdocao.objects.update(data_solicitacao=F('data_solicitacao') - timedelta(days=10))
+        TransicaoSolicitacao.objects.update(criado_em=F('criado_em') - timedelta(days=10))
+
+    def test_conversao_e_percentis(self):
+        self.assertEqual(funil.atualizar(), 1)
+        resultado = funil.funil(local=self.local)
+        etapas = {item['etapa']: item for item in resultado['etapas']}
+        self.assertEqual(resultado['total'], 4)
+        self.assertEqual([item['solicitacoes'] for item in resultado['etapas']], [4, 3, 2, 2, 1])
+        self.assertEqual(etapas['em_entrevista']['conversao'], 75.0)
+        self.assertEqual(etapas['entrevista_aprovada']['conversao_etapa'], 66.7)
+        self.assertEqual(etapas['concluida']['conversao'], 25.0)
+        # Entrevista em 2h e 4h: p50 entre 2h e 4h, p90 até ~4h30
+        self.assertTrue(2 * 3600 <= etapas['em_entrevista']['p50_segundos'] <= 4 * 3600 + 1000)
+        self.assertTrue(etapas['em_entrevista']['p50_segundos'] <= etapas['em_entrevista']['p90_segundos'] <= 8 * 3600)
+        self.assertIsNone(etapas['pendente']['p50_segundos'])
+        desfechos = {item['etapa']: item['solicitacoes'] for item in resultado['desfechos']}
+        self.assertEqual(desfechos, {'rejeitada': 0, 'entrevista_rejeitada': 1, 'cancelada': 1})
+
+    def test_incremental(self):
+        funil.atualizar()
+        # Nada novo: só a margem de segurança reprocessa o mês corrente
+        with override_settings(FUNIL_MARGEM_SEGUNDOS=0):
+            self.assertEqual(funil.atualizar(), 0)
+            a = self.solicitacoes[1]
+            a.status = 'cancelada'
+            a.save()
+            self.assertEqual(funil.atualizar(), 1)
+        self.assertEqual(FunilMensal.objects.get(etapa='cancelada').solicitacoes, 2)
+
+
+class FunilApiTests(FunilBase):
+    def test_local_e_acesso(self):
+        self._solicitar(self.pets[0], self.interessados[0])
+        self.client.force_login(self.org)
+        # A API não recalcula: sem o comando o funil ainda está vazio
+        dados = self.client.get(reverse('core:funil_adocao')).json()
+        self.assertTrue(dados['ok'])
+        self.assertEqual((dados['total'], dados['atualizado_em']), (0, None))
+        call_command('atualizar_funil', stdout=StringIO())
+        dados = self.client.get(reverse('core:funil_adocao')).json()
+        self.assertEqual(dados['total'], 1)
+        self.assertEqual(dados['atualizado_em'], funil.processado_ate().isoformat())
+        self.assertEqual(self.client.get(reverse('core:funil_adocao'), {'inicio': '2026-13'}).status_code, 400)
+        usuario = self.interessados[0].usuario
+        aceitar_termos(usuario)
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get(reverse('core:funil_adocao')).status_code, 403)
@@ -0,0 +1,173 @@
+import math
+import random
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from core.models import LocalAdocao, InteressadoAdocao, Pet
+from django.db import connection
+from django.db.models import F, Value
+from django.test.utils import CaptureQueriesContext
+from core.geo import Haversine, geohash, celulas_no_raio, celulas_no_retangulo, proximo_prefixo
+from core.utils import calcular_distancia
+from core.tests.base import PetsTestCase, aceitar_termos
+
+
+class GeohashTests(TestCase):
+    def test_geohash_valor_conhecido(self):
+        self.assertEqual(geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+    def test_proximo_prefixo(self):
+        self.assertEqual(proximo_prefixo('6gyf'), '6gyg')
+        self.assertEqual(proximo_prefixo('6gz'), '6h')
+        self.assertIsNone(proximo_prefixo('zz'))
+
+    def test_celulas_cobrem_todo_o_raio(self):
+        rnd = random.Random(42)
+        origem = (-23.55, -46.63)
+        raio = 5
+        celulas = celulas_no_raio(origem[0], origem[1], raio)
+        self.assertLessEqual(len(celulas), 9)
+        for _ in range(500):
+            # ponto aleatório dentro do raio
+            ang = rnd.uniform(0, 2 * math.pi)
+            dist = rnd.uniform(0, raio * 0.999)
+            lat = origem[0] + (dist / 111.32) * math.sin(ang)
+            lon = origem[1] + (dist / (111.32 * math.cos(math.radians(origem[0])))) * math.cos(ang)
+            if calcular_distancia(origem[0], origem[1], lat, lon) > raio:
+                continue
+            cell = geohash(lat, lon)
+            self.assertTrue(any(cell.startswith(c) for c in celulas))
+
+    def test_celulas_cobrem_todo_o_retangulo(self):
+        rnd = random.Random(7)
+        # Viewport comum, um que cruza o antimeridiano e o globo inteiro
+        for sul, norte, oeste, leste, precisao in ((-23.6, -23.5, -46.7, -46.6, 5), (-10, 10, 170, -170, 4), (-90, 90, -180, 180, 8)):
+            nivel, celulas = celulas_no_retangulo(sul, norte, oeste, leste, precisao)
+            self.assertLessEqual(nivel, precisao)
+            self.assertLessEqual(len(celulas), 64)
+            extensao = leste - oeste if oeste <= leste else leste - oeste + 360
+            for _ in range(500):
+                lat = rnd.uniform(sul, norte)
+                lon = (oeste + rnd.uniform(0, extensao) + 180) % 360 - 180
+                self.assertIn(geohash(lat, lon, nivel), celulas)
+        self.assertEqual(celulas_no_retangulo(-90, 90, -180, 180, 8)[0], 1)
+
+
+class PetGeoCellTests(PetsTestCase):
+    def setUp(self):
+        self.local = self._local(latitude=-23.55, longitude=-46.63)
+
+    def test_geo_cell_usa_local_quando_pet_sem_coordenadas(self):
+        pet = self._pet('Rex')
+        self.assertEqual(pet.geo_cell, geohash(-23.55, -46.63))
+
+    def test_geo_cell_atualizado_quando_local_muda(self):
+        pet = self._pet('Rex')
+        proprio = self._pet('Mia', latitude=-22.9, longitude=-43.2)
+        self.local.latitude, self.local.longitude = -19.92, -43.94
+        self.local.save()
+        pet.refresh_from_db()
+        proprio.refresh_from_db()
+        self.assertEqual(pet.geo_cell, geohash(-19.92, -43.94))
+        self.assertEqual(proprio.geo_cell, geohash(-22.9, -43.2))
+
+    def test_proximos_de_filtra_por_celulas(self):
+        perto = self._pet('Perto', latitude=-23.56, longitude=-46.64)
+        self._pet('Longe', latitude=-22.9, longitude=-43.2)
+        ids = set(Pet.objects.proximos_de(-23.55, -46.63, 5).values_list('id', flat=True))
+        self.assertEqual(ids, {perto.id})
+
+
+class HaversineTrigonometrico(Haversine):
+    # Força a expansão trigonométrica (usada no Postgres) também no SQLite
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, **extra_context)
+
+
+class WithDistanceTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        self.local = LocalAdocao.objects.create(usuario=user, cnpj='12345678000199', latitude=-23.55, longitude=-46.63)
+        base = dict(especie='cao', idade=12, sexo='macho', porte='medio', descricao='Teste', local_adocao=self.local)
+        self.no_local = Pet.objects.create(nome='NoLocal', **base)
+        self.perto = Pet.objects.create(nome='Perto', latitude=-23.58, longitude=-46.66, **base)
+        self.longe = Pet.objects.create(nome='Longe', latitude=-22.9, longitude=-43.2, **base)
+
+    def test_distancia_anotada_igual_a_python(self):
+        for pet in Pet.objects.with_distance(-23.55, -46.63):
+            lat, lon = pet.coordenadas
+            self.assertAlmostEqual(pet.distancia, calcular_distancia(-23.55, -46.63, lat, lon), places=6)
+
+    def test_formula_trigonometrica_confere_com_funcao_registrada(self):
+        qs = Pet.objects.com_coordenadas().annotate(
+            d_trig=HaversineTrigonometrico(Value(-23.55), Value(-46.63), F('lat_efetiva'), F('lon_efetiva')),
+            d_func=Haversine(Value(-23.55), Value(-46.63), F('lat_efetiva'), F('lon_efetiva')),
+        )
+        for pet in qs:
+            self.assertAlmostEqual(pet.d_trig, pet.d_func, places=6)
+
+    def test_raio_filtra_e_ordena_no_banco(self):
+        nomes = list(Pet.objects.with_distance(-23.55, -46.63, 10).order_by('distancia').values_list('nome', flat=True))
+        self.assertEqual(nomes, ['NoLocal', 'Perto'])
+
+    def test_mapa_api_com_coordenadas(self):
+        resp = self.client.get(reverse('core:pets_mapa_api'), {'lat': -23.55, 'lon': -46.63, 'raio': 10})
+        dados = resp.json()
+        self.assertEqual([p['nome'] for p in dados], ['NoLocal', 'Perto'])
+        self.assertEqual(dados[0]['latitude'], -23.55)
+        self.assertIn('distancia', dados[1])
+
+
+class PetsProximosViewTests(TestCase):
+    def setUp(self):
+        org = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        self.local = LocalAdocao.objects.create(usuario=org, cnpj='12345678000199', nome_fantasia='Lar', latitude=-23.55, longitude=-46.63)
+        self.user = User.objects.create_user('int', 'int@example.com', 'pass12345')
+        aceitar_termos(self.user)
+        InteressadoAdocao.objects.create(usuario=self.user, cpf='12345678901', latitude=-23.551, longitude=-46.631)
+        base = dict(especie='cao', idade=12, sexo='macho', porte='medio', descricao='Teste', local_adocao=self.local)
+        Pet.objects.create(nome='Vizinho', **base)
+        Pet.objects.create(nome='Distante', latitude=-22.9, longitude=-43.2, **base)
+
+    def test_lista_apenas_pets_no_raio(self):
+        self.client.force_login(self.user)
+        resp = self.client.get(reverse('core:pets_proximos'))
+        self.assertEqual(resp.status_code, 200)
+        nomes = [item['pet'].nome for item in resp.context['pets_proximos']]
+        self.assertEqual(nomes, ['Vizinho'])
+        self.assertEqual(resp.context['total_encontrados'], 1)
+
+    def test_pets_list_modo_proximos_ordena_por_distancia(self):
+        base = dict(idade=12, sexo='macho', porte='medio', descricao='Teste', local_adocao=self.local)
+        Pet.objects.create(nome='Gato Perto', especie='gato', latitude=-23.6, longitude=-46.7, **base)
+        Pet.objects.create(nome='Cao Perto', especie='cao', latitude=-23.6, longitude=-46.7, **base)
+        self.client.force_login(self.user)
+        resp = self.client.get(reverse('core:pets_list'), {'proximos': 'true'})
+        self.assertEqual(resp.status_code, 200)
+        # Distante (Rio de Janeiro) fica fora do raio de max_distance_km
+        nomes = [pet.nome for pet in resp.context['page_obj']]
+        self.assertEqual(nomes, ['Vizinho', 'Cao Perto', 'Gato Perto'])
+        self.assertTrue(resp.context['tem_localizacao'])
+        self.assertEqual(len(resp.context['pets_com_distancia']), 3)
+
+        resp = self.client.get(reverse('core:pets_list'), {'proximos': 'true', 'especie': 'gato'})
+        self.assertEqual([pet.nome for pet in resp.context['page_obj']], ['Gato Perto'])
+
+    def test_pets_list_modo_proximos_pagina_no_banco(self):
+        base = dict(especie='cao', idade=12, sexo='macho', porte='medio', descricao='Teste', local_adocao=self.local)
+        for i in range(30):
+            Pet.objects.create(nome=f'Pet {i}', latitude=-23.55, longitude=-46.63, **base)
+        self.client.force_login(self.user)
+        primeira = self.client.get(reverse('core:pets_list'), {'proximos': 'true'}).context['page_obj']
+        self.assertIn('proximos=true', primeira.link_proxima)
+        with CaptureQueriesContext(connection) as consultas:
+            resp = self.client.get(reverse('core:pets_list') + primeira.link_proxima)
+        page_obj = resp.context['page_obj']
+        # A página vem de uma consulta por keyset (LIMIT n+1, sem OFFSET), não de uma lista com todo o catálogo
+        paginas = [q['sql'] for q in consultas.captured_queries if 'LIMIT 13' in q['sql'] and 'HAVERSINE_KM' in q['sql']]
+        self.assertEqual(len(paginas), 1)
+        self.assertNotIn('OFFSET', paginas[0])
+        self.assertEqual(len(page_obj), 12)
+        self.assertFalse({pet.id for pet in primeira} & {pet.id for pet in page_obj})
+        self.assertIn('proximos=true', resp.content.decode().split('Próxima')[0].rsplit('href=', 1)[-1])
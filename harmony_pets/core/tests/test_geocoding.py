@@ -0,0 +1,154 @@
+import json
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import requests
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from core.geo import geohash
+from core.geocoding import LimitadorTaxa, centroide_offline, consultar_stub, geocodificar, geocodificar_lote, normalizar_endereco
+from core.models import GeocodeCache, InteressadoAdocao, LocalAdocao, Pet
+
+
+def _resposta(status, lat=None, lng=None):
+    resposta = Mock()
+    resultados = [{'geometry': {'location': {'lat': lat, 'lng': lng}}}] if status == 'OK' else []
+    resposta.json.return_value = {'status': status, 'results': resultados}
+    return resposta
+
+
+@patch.dict('os.environ', {'GOOGLE_MAPS_API_KEY': 'chave-teste'})
+@patch('core.geocoding.obter_sessao')
+class GeocodeCacheTests(TestCase):
+    def test_segunda_chamada_usa_cache(self, mock_sessao):
+        mock_sessao.return_value.get.return_value = _resposta('OK', -23.56, -46.65)
+        self.assertEqual(geocodificar('Av. Paulista, 1000'), (-23.56, -46.65))
+        self.assertEqual(geocodificar('av paulista,1000'), (-23.56, -46.65))
+        self.assertEqual(mock_sessao.return_value.get.call_count, 1)
+        self.assertEqual(GeocodeCache.objects.get().origem, 'google')
+
+    def test_cache_negativo_e_expiracao(self, mock_sessao):
+        mock_sessao.return_value.get.return_value = _resposta('ZERO_RESULTS')
+        self.assertIsNone(geocodificar('Lugar Nenhum 999'))
+        self.assertIsNone(geocodificar('Lugar Nenhum 999'))
+        self.assertEqual(mock_sessao.return_value.get.call_count, 1)
+        GeocodeCache.objects.update(atualizado_em=timezone.now() - timedelta(days=2))
+        geocodificar('Lugar Nenhum 999')
+        self.assertEqual(mock_sessao.return_value.get.call_count, 2)
+
+    def test_falha_de_rede_usa_tabela_local_sem_cache_definitivo(self, mock_sessao):
+        mock_sessao.return_value.get.side_effect = requests.Timeout('lento')
+        self.assertEqual(geocodificar('Rua XV de Novembro, 50 - Curitiba/PR'), (-25.4284, -49.2733))
+        self.assertEqual(GeocodeCache.objects.get().origem, 'offline')
+
+    @override_settings(GEOCODE_OFFLINE_FALLBACK=False)
+    def test_falha_de_rede_nao_e_cacheada(self, mock_sessao):
+        mock_sessao.return_value.get.side_effect = requests.ConnectionError('sem rede')
+        self.assertIsNone(geocodificar('Rua A, 1'))
+        self.assertFalse(GeocodeCache.objects.exists())
+
+    def test_timeout_configurado(self, mock_sessao):
+        mock_sessao.return_value.get.return_value = _resposta('OK', 1.0, 2.0)
+        geocodificar('Rua B, 2')
+        self.assertIsNotNone(mock_sessao.return_value.get.call_args.kwargs['timeout'])
+
+
+class CentroideOfflineTests(TestCase):
+    def test_normalizacao_unifica_variacoes(self):
+        self.assertEqual(normalizar_endereco('  Av. Paulista,  1000 , SÃO PAULO '), 'av paulista, 1000, sao paulo')
+
+    def test_cep(self):
+        self.assertEqual(centroide_offline('Rua Qualquer, 10, CEP 20040-002'), (-22.906847, -43.172897))
+
+    def test_cidade_com_nome_mais_longo(self):
+        self.assertEqual(centroide_offline('Centro, São José dos Campos - SP'), (-23.1791, -45.8872))
+
+    def test_desconhecido(self):
+        self.assertIsNone(centroide_offline('Vila Inexistente'))
+
+    @patch.dict('os.environ', {}, clear=True)
+    def test_sem_chave_resolve_offline_sem_rede(self):
+        self.assertEqual(geocodificar('Belo Horizonte, MG'), (-19.916681, -43.934493))
+
+
+class LimitadorTaxaTests(SimpleTestCase):
+    def test_respeita_taxa(self):
+        limitador = LimitadorTaxa(50)
+        inicio = time.monotonic()
+        for _ in range(6):
+            limitador.aguardar()
+        self.assertGreaterEqual(time.monotonic() - inicio, 5 / 50 * 0.9)
+
+
+class GeocodificarLoteTests(TestCase):
+    def test_consultas_so_para_faltas_do_cache(self):
+        consultar = Mock(side_effect=lambda endereco: ((1.0, 2.0), True))
+        estatisticas = {}
+        geocodificar_lote(['Rua A, 1', 'RUA  A , 1', 'Rua B, 2'], consultar=consultar, estatisticas=estatisticas)
+        self.assertEqual(consultar.call_count, 2)
+        resultados = geocodificar_lote(['Rua A, 1', 'Rua B, 2'], consultar=consultar, estatisticas=estatisticas)
+        self.assertEqual(consultar.call_count, 2)
+        self.assertEqual(estatisticas['cache'], 2)
+        self.assertEqual(resultados['Rua B, 2'], (1.0, 2.0))
+
+
+class GeocodificarEnderecosCommandTests(TestCase):
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.checkpoint = Path(diretorio.name) / 'checkpoint.json'
+        org = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        self.local = LocalAdocao.objects.create(usuario=org, cnpj='12345678000199', endereco='Av. Brasil, 500 - Rio de Janeiro/RJ')
+        self.pet = Pet.objects.create(nome='Rex', especie='cao', idade=12, sexo='macho', porte='medio', descricao='Teste', local_adocao=self.local)
+        self.interessados = []
+        for i in range(5):
+            user = User.objects.create_user(f'int{i}', f'int{i}@example.com', 'pass12345')
+            self.interessados.append(InteressadoAdocao.objects.create(usuario=user, cpf=f'1234567890{i}', endereco=f'Rua {i}, {i}0'))
+        sem_endereco = User.objects.create_user('semend', 'semend@example.com', 'pass12345')
+        InteressadoAdocao.objects.create(usuario=sem_endereco, cpf='98765432100', endereco='')
+
+    def _executar(self, *args):
+        # Geocodificador determinístico no lugar do Google (o --stub só simula)
+        saida = StringIO()
+        with patch('core.geocoding._consultar_google', consultar_stub):
+            call_command('geocodificar_enderecos', '--taxa', '0', '--checkpoint', str(self.checkpoint), *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_preenche_coordenadas_em_lotes(self):
+        with patch('core.management.commands.geocodificar_enderecos.local_alterado') as local_alterado:
+            saida = self._executar('--lote', '2')
+        self.assertIn('registros/s', saida)
+        for interessado in self.interessados:
+            interessado.refresh_from_db()
+            self.assertEqual((interessado.latitude, interessado.longitude), consultar_stub(interessado.endereco)[0])
+        self.local.refresh_from_db()
+        self.pet.refresh_from_db()
+        self.assertEqual((self.local.latitude, self.local.longitude), (-22.906847, -43.172897))
+        self.assertEqual(self.pet.geo_cell, geohash(-22.906847, -43.172897))
+        self.assertFalse(self.checkpoint.exists())
+        # bulk_update não dispara post_save: o comando invalida snapshot, pirâmide e facetas
+        local_alterado.assert_called_once_with(self.local)
+
+    def test_stub_apenas_simula(self):
+        saida = StringIO()
+        call_command('geocodificar_enderecos', '--stub', '--taxa', '0', '--lote', '2', '--limite', '3',
+                     '--checkpoint', str(self.checkpoint), stdout=saida)
+        self.assertIn('Simulação (nada gravado): 3/3', saida.getvalue())
+        self.assertFalse(InteressadoAdocao.objects.filter(latitude__isnull=False).exists())
+        self.assertFalse(self.checkpoint.exists())
+        self.assertFalse(GeocodeCache.objects.exists())
+
+    def test_retoma_do_checkpoint(self):
+        self._executar('--modelos', 'interessados', '--lote', '2', '--limite', '3')
+        self.assertEqual(json.loads(self.checkpoint.read_text()), {'interessados': self.interessados[2].pk})
+        self.assertEqual(InteressadoAdocao.objects.filter(latitude__isnull=False).count(), 3)
+        saida = self._executar('--modelos', 'interessados')
+        self.assertIn('Retomando', saida)
+        self.assertIn('Concluído: 2/2', saida)
+        self.assertEqual(InteressadoAdocao.objects.filter(latitude__isnull=False).count(), 5)
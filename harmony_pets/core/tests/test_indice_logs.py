@@ -0,0 +1,168 @@
+import gzip
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import indice_logs
+from core.indice_logs import ArquivoRotativoIndexado, arquivar, arquivos, buscar, indice
+from core.leitor_logs import ultimas_linhas
+from core.models import AceitacaoTermos
+
+INICIO = datetime(2026, 10, 1)
+NIVEIS = ['INFO', 'INFO', 'WARNING', 'INFO', 'ERROR']
+
+
+def _linha(i):
+    horario = INICIO + timedelta(minutes=i)
+    return f'[{horario:%Y-%m-%d %H:%M:%S}] {NIVEIS[i % 5]} core evento {i}'
+
+
+def _escrever(caminho, inicio, fim):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        for i in range(inicio, fim):
+            arquivo.write(_linha(i) + '\n')
+            if i % 50 == 4:
+                arquivo.write('Traceback (most recent call last):\n  ValueError: falhou\n')
+
+
+class BaseLogs(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        self.caminho = os.path.join(self.pasta, 'app.log')
+        bloco = mock.patch.object(indice_logs, 'BLOCO', 2048)
+        bloco.start()
+        self.addCleanup(bloco.stop)
+        # Dois dias de backups comprimidos e o app.log corrente, um evento por minuto
+        for numero, (inicio, fim) in ((2, (0, 1440)), (1, (1440, 2880))):
+            _escrever(self.caminho, inicio, fim)
+            arquivar(self.caminho, f'{self.caminho}.{numero}.gz')
+        _escrever(self.caminho, 2880, 3000)
+
+
+class IndiceLogsTests(BaseLogs):
+    def test_backup_comprimido_em_blocos_legivel_por_gzip(self):
+        self.assertEqual(arquivos(self.caminho), [self.caminho, self.caminho + '.1.gz', self.caminho + '.2.gz'])
+        with gzip.open(self.caminho + '.2.gz', 'rt', encoding='utf-8') as arquivo:
+            linhas = arquivo.read().splitlines()
+        self.assertEqual(linhas[0], _linha(0))
+        self.assertEqual(linhas[-1], _linha(1439))
+        compactado, blocos = indice(self.caminho + '.2.gz')
+        self.assertTrue(compactado)
+        self.assertGreater(len(blocos), 10)
+        self.assertEqual((blocos[0][2], blocos[-1][3]), (_linha(0)[1:20], _linha(1439)[1:20]))
+
+    def test_periodo_le_apenas_os_blocos_do_periodo(self):
+        lidos = []
+        original = indice_logs._Leitor.ler
+
+        def ler(leitor, posicao, comprimento):
+            lidos.append(posicao)
+            return original(leitor, posicao, comprimento)
+
+        with mock.patch.object(indice_logs._Leitor, 'ler', ler):
+            registros = buscar(self.caminho, inicio='2026-10-01 12:00:00', fim='2026-10-01 12:09:59')
+        self.assertEqual([registro.split('\n')[0] for registro in registros], [_linha(i) for i in range(720, 730)])
+        self.assertLessEqual(len(lidos), 2)
+
+    def test_nivel_busca_e_traceback(self):
+        registros = buscar(self.caminho, niveis=['error'], busca='valueerror', inicio='2026-10-02 00:00:00')
+        self.assertEqual(registros[0], _linha(1454) + '\nTraceback (most recent call last):\n  ValueError: falhou')
+        self.assertEqual(len(registros), len([i for i in range(1440, 3000) if i % 50 == 4]))
+        self.assertEqual(buscar(self.caminho, niveis=['CRITICAL']), [])
+
+    def test_limite_fica_com_os_mais_recentes(self):
+        self.assertEqual(buscar(self.caminho, niveis=['WARNING'], limite=2), [_linha(2992), _linha(2997)])
+
+    def test_app_log_corrente_indexado_em_memoria_acompanha_o_crescimento(self):
+        self.assertEqual(buscar(self.caminho, inicio='2026-10-03 01:59:00'), [_linha(2999)])
+        with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(_linha(3000) + '\n')
+        self.assertEqual(buscar(self.caminho, inicio='2026-10-03 01:59:00'), [_linha(2999), _linha(3000)])
+
+    def test_backup_corrompido_e_pulado_e_informado(self):
+        with open(self.caminho + '.1.gz', 'r+b') as arquivo:
+            arquivo.seek(40)
+            arquivo.write(b'\x00' * 200)
+        falhas = []
+        with self.assertLogs('core.indice_logs', 'WARNING'):
+            registros = buscar(self.caminho, inicio='2026-10-01 12:00:00', fim='2026-10-02 23:59:59', limite=5000, falhas=falhas)
+        self.assertEqual([arquivo for arquivo, _ in falhas], [self.caminho + '.1.gz'])
+        self.assertIn(_linha(2879), registros[-1])  # blocos legíveis do app.log.1.gz
+        self.assertIn(_linha(720), registros[0])  # o app.log.2.gz continua sendo lido
+
+        falhas = []
+        with self.assertLogs('core.indice_logs', 'WARNING'):
+            linhas = ultimas_linhas(self.caminho, 5000, falhas=falhas)
+        self.assertEqual(len(falhas), 1)
+        self.assertIn(_linha(0), linhas)
+
+    def test_tail_continua_pelos_backups_comprimidos(self):
+        linhas = ultimas_linhas(self.caminho, 130)
+        self.assertEqual(linhas[-1], _linha(2999))
+        self.assertEqual(len(linhas), 130)
+        self.assertIn(_linha(2875), linhas)  # já no app.log.1.gz
+
+
+class ArquivoRotativoIndexadoTests(SimpleTestCase):
+    def test_rotacao_comprime_e_move_indices(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'app.log')
+            handler = ArquivoRotativoIndexado(caminho, maxBytes=2000, backupCount=3, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('[{asctime}] {levelname} {name} {message}', '%Y-%m-%d %H:%M:%S', style='{'))
+            logger = logging.getLogger('core.tests.rotacao')
+            logger.propagate = False
+            logger.addHandler(handler)
+            try:
+                for i in range(80):
+                    logger.warning('mensagem %s %s', i, 'x' * 40)
+            finally:
+                logger.removeHandler(handler)
+                handler.close()
+            nomes = sorted(os.listdir(pasta))
+            self.assertEqual(nomes, ['app.log', 'app.log.1.gz', 'app.log.1.gz.idx', 'app.log.2.gz',
+                                     'app.log.2.gz.idx', 'app.log.3.gz', 'app.log.3.gz.idx'])
+            registros = buscar(caminho, niveis=['WARNING'], limite=1000)
+            self.assertEqual(registros[-1].rsplit('mensagem ', 1)[1].split()[0], '79')
+            numeros = [int(registro.rsplit('mensagem ', 1)[1].split()[0]) for registro in registros]
+            self.assertEqual(numeros, list(range(numeros[0], 80)))
+
+
+class AdminLogsBuscaIndexadaTests(TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        caminho = os.path.join(self.pasta, 'app.log')
+        _escrever(caminho, 0, 300)
+        arquivar(caminho, caminho + '.1.gz')
+        _escrever(caminho, 300, 360)
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'Adminpass123', is_staff=True)
+        AceitacaoTermos.objects.create(usuario=self.admin, termos_aceitos=True, lgpd_aceito=True,
+                                       ip_aceitacao='127.0.0.1', user_agent='test', versao_termos='1.0')
+        self.client.force_login(self.admin)
+
+    def test_periodo_busca_nos_backups(self):
+        with override_settings(LOG_DIR=self.pasta):
+            resp = self.client.get(reverse('core:admin_logs'), {'inicio': '2026-10-01T01:00', 'fim': '2026-10-01T01:04'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['escopo'], 'todos')
+        self.assertEqual([registro.split('\n')[0] for registro in resp.context['lines']], [_linha(i) for i in range(60, 65)])
+
+    def test_backup_truncado_nao_derruba_a_pagina(self):
+        caminho = os.path.join(self.pasta, 'app.log.1.gz')
+        with open(caminho, 'r+b') as arquivo:
+            arquivo.truncate(os.path.getsize(caminho) // 2)
+        os.remove(caminho + '.idx')  # sem índice o .gz é lido inteiro e o gzip acusa o fim inesperado
+        with override_settings(LOG_DIR=self.pasta), self.assertLogs('core.indice_logs', 'WARNING'):
+            resp = self.client.get(reverse('core:admin_logs'), {'escopo': 'todos', 'n': '100'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('app.log.1.gz', resp.context['error'])
+        self.assertEqual(len(resp.context['lines']), 60)  # só o app.log
@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from core.models import AuditLog, InteressadoAdocao, LocalAdocao, Pet, SolicitacaoAdocao
+from core.tests.base import aceitar_termos
+
+PETS_POR_LOCAL = 300
+LOCAIS = 10
+
+
+def _plano(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return '\n'.join(str(linha[-1]) for linha in cursor.fetchall())
+        cursor.execute('EXPLAIN ' + sql)
+        return '\n'.join(linha[0] for linha in cursor.fetchall())
+
+
+class IndicesConsultasFrequentesTests(TestCase):
+    """Confere pelo EXPLAIN que as consultas das views principais usam os índices da 0024."""
+
+    @classmethod
+    def setUpTestData(cls):
+        agora = timezone.now()
+        status = ['disponivel', 'disponivel', 'adotado', 'reservado']
+        cls.locais = []
+        for i in range(LOCAIS):
+            user = User.objects.create_user(f'org{i}', f'org{i}@example.com', 'pass12345')
+            aceitar_termos(user)
+            cls.locais.append(LocalAdocao.objects.create(usuario=user, cnpj=f'1234567800{i:02d}99'))
+        Pet.objects.bulk_create(
+            Pet(nome=f'Pet {i}', especie='cao', idade=12, sexo='macho', porte='medio', descricao='Teste',
+                local_adocao=cls.locais[i % LOCAIS], status=status[i % len(status)], ativo=i % 50 != 0)
+            for i in range(PETS_POR_LOCAL * LOCAIS)
+        )
+        Pet.objects.update(data_cadastro=agora)
+        interessados = []
+        for i in range(20):
+            user = User.objects.create_user(f'int{i}', f'int{i}@example.com', 'pass12345')
+            aceitar_termos(user)
+            interessados.append(InteressadoAdocao.objects.create(usuario=user, cpf=f'123456789{i:02d}'))
+        cls.interessado = interessados[0]
+        pets = list(Pet.objects.order_by('id')[:1000])
+        SolicitacaoAdocao.objects.bulk_create(
+            SolicitacaoAdocao(pet=pet, interessado=interessados[j], motivo='m', experiencia_pets='e',
+                              situacao_moradia='s', status='pendente' if j % 3 else 'concluida')
+            for pet in pets for j in range(3)
+        )
+        cls.pet = pets[0]
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pass12345', is_staff=True)
+        aceitar_termos(cls.staff)
+        AuditLog.objects.bulk_create(
+            AuditLog(metodo='GET', caminho=f'/p/{i}', status_code=500 if i % 40 == 0 else 200,
+                     usuario=cls.staff if i % 10 == 0 else None)
+            for i in range(5000)
+        )
+        AuditLog.objects.update(criado_em=agora - timedelta(days=1))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _consulta_da_view(self, user, url, tabela, trecho=''):
+        if user is not None:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        candidatas = [q['sql'] for q in consultas.captured_queries
+                      if f'FROM "{tabela}"' in q['sql'] and 'ORDER BY' in q['sql'] and trecho in q['sql']]
+        self.assertTrue(candidatas, f'nenhuma consulta a {tabela} em {url}')
+        return candidatas[0]
+
+    def assertUsaIndice(self, sql, tabela, *indices):
+        plano = _plano(sql)
+        if connection.vendor == 'sqlite':
+            self.assertTrue(any(f'INDEX {indice}' in plano for indice in indices), plano)
+        else:
+            self.assertNotIn(f'Seq Scan on {tabela}', plano)
+
+    def test_listagem_publica_de_pets(self):
+        sql = self._consulta_da_view(None, reverse('core:pets_list'), 'core_pet', 'LIMIT 13')
+        self.assertUsaIndice(sql, 'core_pet', 'pet_disponiveis_recentes_idx')
+
+    def test_gerenciar_pets(self):
+        sql = self._consulta_da_view(self.locais[0].usuario, reverse('core:gerenciar_pets'), 'core_pet', 'LIMIT 13')
+        self.assertUsaIndice(sql, 'core_pet', 'pet_local_ativo_data_idx')
+
+    def test_solicitacoes_do_local(self):
+        sql = self._consulta_da_view(self.locais[0].usuario, reverse('core:solicitacoes_adocao') + '?status=pendente',
+                                     'core_solicitacaoadocao', 'LIMIT 11')
+        self.assertUsaIndice(sql, 'core_solicitacaoadocao', 'solicitacao_pet_status_idx')
+
+    def test_historico_do_pet(self):
+        url = reverse('core:historico_pet', args=[self.pet.id])
+        sql = self._consulta_da_view(self.pet.local_adocao.usuario, url, 'core_solicitacaoadocao', 'LIMIT 11')
+        self.assertUsaIndice(sql, 'core_solicitacaoadocao', 'solicitacao_pet_data_idx')
+
+    def test_minhas_solicitacoes(self):
+        sql = self._consulta_da_view(self.interessado.usuario, reverse('core:minhas_solicitacoes_adocao'),
+                                     'core_solicitacaoadocao', 'LIMIT 11')
+        self.assertUsaIndice(sql, 'core_solicitacaoadocao', 'solicitacao_interessado_idx')
+
+    def test_auditoria_recente_e_erros(self):
+        # Mesmas consultas do admin_dashboard
+        for consulta in (AuditLog.objects.order_by('-criado_em')[:10],
+                         AuditLog.objects.filter(status_code__gte=400).order_by('-criado_em')[:10]):
+            self.assertUsaIndice(str(consulta.query), 'core_auditlog', 'auditlog_criado_idx', 'auditlog_status_criado_idx')
+
+    def test_auditoria_por_usuario(self):
+        consulta = AuditLog.objects.filter(usuario=self.staff).order_by('-criado_em')[:20]
+        self.assertUsaIndice(str(consulta.query), 'core_auditlog', 'auditlog_usuario_criado_idx')
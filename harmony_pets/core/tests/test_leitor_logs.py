@@ -0,0 +1,100 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.leitor_logs import arquivos_da_rotacao, linhas_reversas, ultimas_linhas
+from core.models import AceitacaoTermos
+
+NIVEIS = ['INFO', 'WARNING', 'ERROR']
+
+
+def _linha(i):
+    return f'[2026-10-18 10:00:00] {NIVEIS[i % 3]} core mensagem {i} ação'
+
+
+def _escrever(caminho, inicio, fim):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        arquivo.writelines(_linha(i) + '\n' for i in range(inicio, fim))
+
+
+class LeitorLogsTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.caminho = os.path.join(pasta.name, 'app.log')
+        # Rotação: app.log.2 tem as mais antigas, app.log as mais novas
+        _escrever(self.caminho + '.2', 0, 100)
+        _escrever(self.caminho + '.1', 100, 200)
+        _escrever(self.caminho, 200, 300)
+
+    def test_linhas_reversas_com_blocos_pequenos(self):
+        with open(self.caminho, encoding='utf-8') as arquivo:
+            esperado = arquivo.read().splitlines()
+        for bloco in (1, 7, 64, 10 ** 6):
+            self.assertEqual(list(linhas_reversas(self.caminho, bloco))[::-1], esperado)
+
+    def test_ultimas_linhas_em_ordem_cronologica(self):
+        self.assertEqual(ultimas_linhas(self.caminho, 3), [_linha(297), _linha(298), _linha(299)])
+
+    def test_segue_pelos_backups(self):
+        self.assertEqual(arquivos_da_rotacao(self.caminho), [self.caminho, self.caminho + '.1', self.caminho + '.2'])
+        linhas = ultimas_linhas(self.caminho, 150)
+        self.assertEqual(linhas, [_linha(i) for i in range(150, 300)])
+        self.assertEqual(len(ultimas_linhas(self.caminho, 5000)), 300)
+
+    def test_filtros_aplicados_dentro_da_janela(self):
+        erros = ultimas_linhas(self.caminho, 30, nivel='error')
+        self.assertEqual(erros, [_linha(i) for i in range(270, 300) if i % 3 == 2])
+        self.assertEqual(ultimas_linhas(self.caminho, 150, busca='MENSAGEM 15'), [_linha(i) for i in range(150, 160)])
+        self.assertEqual(ultimas_linhas(self.caminho, 300, busca='mensagem 15 '), [_linha(15)])
+
+    def test_le_apenas_o_fim_do_arquivo(self):
+        lidos = []
+
+        class Contador:
+            def __init__(self, arquivo):
+                self.arquivo = arquivo
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.arquivo.close()
+
+            def seek(self, *args):
+                return self.arquivo.seek(*args)
+
+            def read(self, tamanho):
+                dados = self.arquivo.read(tamanho)
+                lidos.append(len(dados))
+                return dados
+
+        with mock.patch('core.leitor_logs.BLOCO', 512), \
+                mock.patch('core.leitor_logs.open', lambda caminho, modo: Contador(open(caminho, modo)), create=True):
+            self.assertEqual(len(ultimas_linhas(self.caminho, 5)), 5)
+        self.assertEqual(len(lidos), 2)  # último byte + um bloco
+        self.assertLessEqual(sum(lidos), 513)
+
+
+class AdminLogsViewTests(TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        _escrever(os.path.join(self.pasta, 'app.log'), 0, 60)
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'Adminpass123', is_staff=True)
+        AceitacaoTermos.objects.create(usuario=self.admin, termos_aceitos=True, lgpd_aceito=True,
+                                       ip_aceitacao='127.0.0.1', user_agent='test', versao_termos='1.0')
+        self.client.force_login(self.admin)
+
+    def test_exibe_fim_do_arquivo_filtrado(self):
+        with override_settings(LOG_DIR=self.pasta):
+            resp = self.client.get(reverse('core:admin_logs'), {'level': 'warning', 'n': '50'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['lines'], [_linha(i) for i in range(10, 60) if i % 3 == 1])
+        self.assertContains(resp, 'mensagem 58 ação')
+        self.assertNotContains(resp, 'mensagem 4 ação')
@@ -0,0 +1,178 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from core.config_maps import GOOGLE_MAPS_CONFIG
+from core.geo import celulas_no_retangulo, geohash
+from core.mapa_clusters import clusters_do_banco, piramide, precisao_para_zoom
+from core.models import Pet
+from core.tests.base import PetsTestCase
+
+
+def _por_celula(clusters):
+    return {cluster['celula']: cluster for cluster in clusters}
+
+
+class MapaClustersBase(PetsTestCase):
+    def setUp(self):
+        piramide.invalidar()
+        self.addCleanup(piramide.invalidar)
+        self.local = self._local(latitude=-23.55, longitude=-46.63)
+        self.rex = self._pet('Rex')
+        self.mia = self._pet('Mia', especie='gato', latitude=-23.56, longitude=-46.64)
+        self.bob = self._pet('Bob', latitude=-22.9, longitude=-43.2)
+
+
+@override_settings(MAPA_PIRAMIDE_ENABLED=True)
+class PiramideMapaTests(MapaClustersBase):
+    def test_piramide_igual_a_agregacao_do_banco(self):
+        for precisao in range(1, 9):
+            self.assertEqual(_por_celula(piramide.clusters(precisao)), _por_celula(clusters_do_banco(precisao)))
+
+    def test_filtro_por_prefixos_igual_ao_do_banco(self):
+        for precisao in range(1, 9):
+            for maximo in (1, 64):
+                _, prefixos = celulas_no_retangulo(-23.6, -23.5, -46.7, -46.6, precisao, maximo)
+                clusters = _por_celula(piramide.clusters(precisao, prefixos))
+                self.assertEqual(clusters, _por_celula(clusters_do_banco(precisao, prefixos)))
+                self.assertEqual(sum(c['quantidade'] for c in clusters.values()), 2)
+
+    def test_agregados_da_celula(self):
+        sp = _por_celula(piramide.clusters(3))[geohash(-23.55, -46.63, 3)]
+        self.assertEqual(sp['quantidade'], 2)
+        self.assertEqual(sp['especies'], {'cao': 1, 'gato': 1})
+        self.assertAlmostEqual(sp['latitude'], -23.555)
+
+    def test_atualizacao_incremental(self):
+        piramide.clusters(1)  # constrói
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mia.status = 'adotado'
+            self.mia.save()
+            self.local.latitude, self.local.longitude = -22.9, -43.2
+            self.local.save()
+            self.bob.especie = 'gato'
+            self.bob.save()
+        rio = geohash(-22.9, -43.2, 4)
+        self.assertEqual(_por_celula(piramide.clusters(4)), {
+            rio: {'celula': rio, 'quantidade': 2, 'latitude': -22.9, 'longitude': -43.2, 'especies': {'cao': 1, 'gato': 1}},
+        })
+        for precisao in range(1, 9):
+            self.assertEqual(_por_celula(piramide.clusters(precisao)), _por_celula(clusters_do_banco(precisao)))
+
+
+class PetsMapaZoomApiTests(MapaClustersBase):
+    def test_zoom_baixo_retorna_clusters(self):
+        resp = self.client.get(reverse('core:pets_mapa_api'), {'zoom': 8})
+        dados = resp.json()
+        self.assertEqual(dados['tipo'], 'clusters')
+        self.assertEqual(dados['precisao'], precisao_para_zoom(8))
+        self.assertEqual(sum(c['quantidade'] for c in dados['clusters']), 3)
+
+    def test_limite_sobe_na_piramide(self):
+        with patch.dict(GOOGLE_MAPS_CONFIG, {'max_pets_display': 2}):
+            dados = self.client.get(reverse('core:pets_mapa_api'), {'zoom': 14}).json()
+        # Rex e Mia ficam em células distintas no zoom 14; sobe até caberem em 2 clusters
+        self.assertLess(dados['precisao'], precisao_para_zoom(14))
+        self.assertEqual(len(dados['clusters']), 2)
+        self.assertEqual(sum(c['quantidade'] for c in dados['clusters']), 3)
+
+    def test_zoom_alto_retorna_pets(self):
+        dados = self.client.get(reverse('core:pets_mapa_api'), {'zoom': 17}).json()
+        self.assertEqual(dados['tipo'], 'pets')
+        self.assertEqual(dados['total'], 3)
+        self.assertEqual({p['nome'] for p in dados['pets']}, {'Rex', 'Mia', 'Bob'})
+
+    def test_zoom_invalido(self):
+        resp = self.client.get(reverse('core:pets_mapa_api'), {'zoom': 'x'})
+        self.assertEqual(resp.status_code, 400)
+
+
+@override_settings(MAPA_SINCRONIA_MARGEM_SEGUNDOS=0)
+class PetsMapaViewportApiTests(MapaClustersBase):
+    VIEWPORT_SP = {'north': -23.5, 'south': -23.6, 'east': -46.6, 'west': -46.7}
+
+    def test_viewport_retorna_apenas_pets_visiveis(self):
+        dados = self.client.get(reverse('core:pets_mapa_api'), self.VIEWPORT_SP).json()
+        self.assertEqual({p['nome'] for p in dados['pets']}, {'Rex', 'Mia'})
+        self.assertEqual(dados['total'], 2)
+        self.assertTrue(dados['completo'])
+
+    def test_viewport_respeita_limite(self):
+        with patch.dict(GOOGLE_MAPS_CONFIG, {'max_pets_display': 1}):
+            dados = self.client.get(reverse('core:pets_mapa_api'), self.VIEWPORT_SP).json()
+        self.assertEqual(len(dados['pets']), 1)
+        self.assertFalse(dados['completo'])
+
+    def test_viewport_filtra_clusters(self):
+        dados = self.client.get(reverse('core:pets_mapa_api'), dict(self.VIEWPORT_SP, zoom=5)).json()
+        self.assertEqual(sum(c['quantidade'] for c in dados['clusters']), 2)
+
+    def test_viewport_restringe_a_consulta_pelas_celulas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            dados = self.client.get(reverse('core:pets_mapa_api'), dict(self.VIEWPORT_SP, zoom=12)).json()
+        self.assertEqual(sum(c['quantidade'] for c in dados['clusters']), 2)
+        self.assertTrue(any('"geo_cell" >=' in consulta['sql'] for consulta in consultas))
+        with override_settings(MAPA_PIRAMIDE_ENABLED=True):
+            piramide.invalidar()
+            self.assertEqual(self.client.get(reverse('core:pets_mapa_api'), dict(self.VIEWPORT_SP, zoom=12)).json(), dados)
+
+    def test_since_retorna_alteracoes_e_removidos(self):
+        inicial = self.client.get(reverse('core:pets_mapa_api'), self.VIEWPORT_SP).json()
+        self.mia.status = 'adotado'
+        self.mia.save()
+        self.rex.nome = 'Rex II'
+        self.rex.save(update_fields=['nome'])
+        self.bob.save()  # fora do viewport: o cliente descarta se tiver
+        delta = self.client.get(reverse('core:pets_mapa_api'), dict(self.VIEWPORT_SP, since=inicial['sincronizado_em'])).json()
+        self.assertEqual([p['nome'] for p in delta['pets']], ['Rex II'])
+        self.assertEqual(delta['removidos'], [self.mia.id, self.bob.id])
+        vazio = self.client.get(reverse('core:pets_mapa_api'), dict(self.VIEWPORT_SP, since=delta['sincronizado_em'])).json()
+        self.assertEqual((vazio['pets'], vazio['removidos']), ([], []))
+
+    def test_pet_que_sai_do_viewport_ou_perde_coordenadas(self):
+        inicial = self.client.get(reverse('core:pets_mapa_api'), self.VIEWPORT_SP).json()
+        self.mia.latitude, self.mia.longitude = -22.9, -43.2
+        self.mia.save()
+        self.local.latitude = self.local.longitude = None
+        self.local.save()  # Rex herdava as coordenadas do local
+        delta = self.client.get(reverse('core:pets_mapa_api'), dict(self.VIEWPORT_SP, since=inicial['sincronizado_em'])).json()
+        self.assertEqual(delta['pets'], [])
+        self.assertEqual(sorted(delta['removidos']), sorted([self.mia.id, self.rex.id]))
+
+    def test_cursor_composto_com_mesmo_updated_at(self):
+        instante = self.rex.updated_at
+        Pet.objects.update(updated_at=instante)
+        params, vistos = {'since': (instante - timedelta(seconds=1)).isoformat()}, []
+        with patch.dict(GOOGLE_MAPS_CONFIG, {'max_pets_display': 1}):
+            for _ in range(4):
+                dados = self.client.get(reverse('core:pets_mapa_api'), params).json()
+                vistos += [p['id'] for p in dados['pets']]
+                if dados['completo']:
+                    break
+                params = {'since': dados['sincronizado_em'], 'since_id': dados['sincronizado_id']}
+        self.assertEqual(vistos, sorted([self.rex.id, self.mia.id, self.bob.id]))
+
+    @override_settings(MAPA_SINCRONIA_MARGEM_SEGUNDOS=60)
+    def test_ponto_de_sincronizacao_recua_a_margem(self):
+        antes = timezone.now()
+        dados = self.client.get(reverse('core:pets_mapa_api'), self.VIEWPORT_SP).json()
+        self.assertLessEqual(parse_datetime(dados['sincronizado_em']), antes - timedelta(seconds=59))
+        # Alterações recentes voltam de novo enquanto estiverem dentro da margem
+        delta = self.client.get(reverse('core:pets_mapa_api'), dict(self.VIEWPORT_SP, since=dados['sincronizado_em'])).json()
+        self.assertEqual({p['nome'] for p in delta['pets']}, {'Rex', 'Mia'})
+
+    def test_mudanca_do_local_atualiza_updated_at(self):
+        antes = self.client.get(reverse('core:pets_mapa_api'), {'since': '2000-01-01T00:00:00Z'}).json()
+        self.local.latitude, self.local.longitude = -22.91, -43.21
+        self.local.save()
+        delta = self.client.get(reverse('core:pets_mapa_api'), {'since': antes['sincronizado_em']}).json()
+        self.assertEqual([p['id'] for p in delta['pets']], [self.rex.id])
+
+    def test_parametros_invalidos(self):
+        for params in ({'north': 1}, {'since': 'ontem'}, {'since': '2026-01-01T00:00:00Z', 'since_id': 'x'}, dict(self.VIEWPORT_SP, south=0)):
+            self.assertEqual(self.client.get(reverse('core:pets_mapa_api'), params).status_code, 400)
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from core.models import InteressadoAdocao, LocalAdocao, Pet, SolicitacaoAdocao
+from core.paginacao import estimar_total, paginar_por_cursor
+from core.tests.base import PET_PADRAO, aceitar_termos
+
+
+class PaginacaoBase(TestCase):
+    def setUp(self):
+        self.org = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        aceitar_termos(self.org)
+        self.local = LocalAdocao.objects.create(usuario=self.org, cnpj='12345678000199')
+        base = dict(PET_PADRAO, local_adocao=self.local)
+        self.pets = [Pet.objects.create(nome=f'Pet {i:02d}', **base) for i in range(25)]
+        # Metade com a mesma data: o id desempata
+        agora = timezone.now()
+        for i, pet in enumerate(self.pets):
+            Pet.objects.filter(pk=pet.pk).update(data_cadastro=agora - timedelta(minutes=i // 2))
+        self.esperado = list(Pet.objects.order_by('-data_cadastro', '-id').values_list('id', flat=True))
+
+
+class PaginarPorCursorTests(PaginacaoBase):
+    def _pagina(self, query=''):
+        request = RequestFactory().get('/pets/' + query)
+        return paginar_por_cursor(request, Pet.objects.all(), ('-data_cadastro', '-id'), por_pagina=10)
+
+    def test_avanca_e_volta_sem_repetir_nem_pular(self):
+        paginas = [self._pagina()]
+        while paginas[-1].has_next():
+            paginas.append(self._pagina(paginas[-1].link_proxima))
+        self.assertEqual([len(p) for p in paginas], [10, 10, 5])
+        self.assertEqual([pet.id for p in paginas for pet in p], self.esperado)
+        self.assertFalse(paginas[0].has_previous())
+        voltou = self._pagina(paginas[2].link_anterior)
+        self.assertEqual([pet.id for pet in voltou], [pet.id for pet in paginas[1]])
+        primeira = self._pagina(voltou.link_anterior)
+        self.assertEqual([pet.id for pet in primeira], self.esperado[:10])
+        self.assertFalse(primeira.has_previous())
+
+    def test_pagina_profunda_sem_offset(self):
+        segunda = self._pagina()
+        with self.assertNumQueries(1) as consultas:
+            self._pagina(segunda.link_proxima)
+        self.assertNotIn('OFFSET', consultas.captured_queries[0]['sql'])
+
+    def test_cursor_adulterado_volta_ao_inicio(self):
+        pagina = self._pagina('?cursor=abc&status=x')
+        self.assertEqual([pet.id for pet in pagina], self.esperado[:10])
+        self.assertIn('status=x', pagina.link_proxima)
+
+    def test_cursor_de_outra_ordenacao_volta_ao_inicio(self):
+        cursor = self._pagina().link_proxima
+        request = RequestFactory().get('/pets/' + cursor)
+        ordenacao = ('-data_cadastro', 'id')
+        pagina = paginar_por_cursor(request, Pet.objects.all(), ordenacao, por_pagina=10)
+        esperado = list(Pet.objects.order_by(*ordenacao).values_list('id', flat=True)[:10])
+        self.assertEqual([pet.id for pet in pagina], esperado)
+        self.assertFalse(pagina.has_previous())
+
+    def test_total_estimado(self):
+        self.assertEqual(estimar_total(Pet.objects.all()), (25, True))
+        self.assertEqual(estimar_total(Pet.objects.all(), limite=20), (20, False))
+
+
+class ListagensComCursorTests(PaginacaoBase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user('int', 'int@example.com', 'pass12345')
+        aceitar_termos(user)
+        self.interessado = InteressadoAdocao.objects.create(usuario=user, cpf='12345678901')
+        for pet in self.pets[:12]:
+            SolicitacaoAdocao.objects.create(pet=pet, interessado=self.interessado, motivo='m',
+                                             experiencia_pets='e', situacao_moradia='s')
+
+    def test_gerenciar_pets_e_solicitacoes(self):
+        self.client.force_login(self.org)
+        pets = self.client.get(reverse('core:gerenciar_pets')).context['pets']
+        self.assertEqual(len(pets), 12)
+        resp = self.client.get(reverse('core:gerenciar_pets') + pets.link_proxima)
+        self.assertEqual(len(resp.context['pets']), 12)
+        solicitacoes = self.client.get(reverse('core:solicitacoes_adocao')).context['solicitacoes']
+        self.assertEqual((len(solicitacoes), solicitacoes.has_next()), (10, True))
+
+    def test_busca_com_cursor_da_listagem_simples_recomeca(self):
+        # A busca ordena por relevância: o cursor da ordem por data não vale para ela
+        cursor = self.client.get(reverse('core:pets_list')).context['page_obj'].link_proxima
+        primeira = self.client.get(reverse('core:pets_list'), {'search': 'Teste'}).context['page_obj']
+        resp = self.client.get(reverse('core:pets_list') + cursor + '&search=Teste')
+        self.assertEqual([pet.id for pet in resp.context['page_obj']], [pet.id for pet in primeira])
+        self.assertEqual(len(primeira), 12)
+
+    def test_historico_pet(self):
+        self.client.force_login(self.org)
+        resp = self.client.get(reverse('core:historico_pet', args=[self.pets[0].id]))
+        self.assertEqual(len(resp.context['solicitacoes']), 1)
+        self.assertEqual(resp.context['stats']['total'], 1)
+
+    def test_minhas_solicitacoes_paginadas_com_total(self):
+        self.client.force_login(self.interessado.usuario)
+        resp = self.client.get(reverse('core:minhas_solicitacoes_adocao'))
+        solicitacoes = resp.context['solicitacoes']
+        self.assertEqual((len(solicitacoes), solicitacoes.total_estimado), (10, 12))
+        resp = self.client.get(reverse('core:minhas_solicitacoes_adocao') + solicitacoes.link_proxima)
+        self.assertEqual(len(resp.context['solicitacoes']), 2)
@@ -0,0 +1,170 @@
+import os
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+from core.models import LocalAdocao, InteressadoAdocao, Pet
+from core.pet_snapshot import PONTEIRO, carregar_pets, publicar, snapshot
+from core.utils import calcular_distancia
+from core.tests.base import PET_PADRAO, PetsTestCase, aceitar_termos
+
+
+@override_settings(PET_SNAPSHOT_ENABLED=True)
+class PetSnapshotTests(PetsTestCase):
+    def setUp(self):
+        snapshot.invalidar()
+        self.addCleanup(snapshot.invalidar)
+        self.local = self._local(latitude=-23.55, longitude=-46.63)
+        self.rex = self._pet('Rex', especie='cao', vacinado=True)
+        self.mia = self._pet('Mia', especie='gato', latitude=-23.58, longitude=-46.66, castrado=True, vacinado=True)
+        self.bob = self._pet('Bob', especie='cao', latitude=-22.9, longitude=-43.2)
+
+    def test_filtros_por_especie_e_tracos(self):
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(set(snapshot.filtrar(especie='cao')), {self.rex.id, self.bob.id})
+        self.assertEqual(snapshot.filtrar(tracos=('castrado', 'vacinado')), [self.mia.id])
+
+    def test_top_k_mais_recentes(self):
+        self.assertEqual(snapshot.top_k(2), [self.bob.id, self.mia.id])
+
+    def test_no_raio_ordena_por_distancia(self):
+        resultado = snapshot.no_raio(-23.55, -46.63, 10)
+        self.assertEqual([pet_id for pet_id, _ in resultado], [self.rex.id, self.mia.id])
+        self.assertAlmostEqual(resultado[1][1], calcular_distancia(-23.55, -46.63, -23.58, -46.66), places=6)
+
+    def test_sinais_mantem_instantaneo_atualizado(self):
+        snapshot.filtrar()  # constrói
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rex.status = 'adotado'
+            self.rex.save()
+            novo = self._pet('Luna', especie='gato')
+        self.assertEqual(set(snapshot.filtrar()), {self.mia.id, self.bob.id, novo.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mia.delete()
+        self.assertEqual(set(snapshot.filtrar()), {self.bob.id, novo.id})
+
+    def test_alteracao_desfeita_nao_chega_ao_instantaneo(self):
+        snapshot.filtrar()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.rex.status = 'adotado'
+                    self.rex.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertIn(self.rex.id, snapshot.filtrar())
+
+    def test_carregar_pets_ignora_indisponiveis(self):
+        ids = snapshot.top_k(3)
+        Pet.objects.filter(pk=self.mia.pk).update(status='adotado')  # sem sinal: instantâneo defasado
+        self.assertEqual([pet.id for pet in carregar_pets(ids)], [self.bob.id, self.rex.id])
+
+    def test_mudanca_do_local_move_pets_sem_coordenadas(self):
+        snapshot.filtrar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.local.latitude, self.local.longitude = -22.9, -43.2
+            self.local.save()
+        ids = [pet_id for pet_id, _ in snapshot.no_raio(-22.9, -43.2, 1)]
+        self.assertEqual(set(ids), {self.rex.id, self.bob.id})
+
+
+@override_settings(PET_SNAPSHOT_ENABLED=True)
+class PetSnapshotViewsTests(TestCase):
+    def setUp(self):
+        snapshot.invalidar()
+        self.addCleanup(snapshot.invalidar)
+        org = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        local = LocalAdocao.objects.create(usuario=org, cnpj='12345678000199', latitude=-23.55, longitude=-46.63)
+        self.user = User.objects.create_user('int', 'int@example.com', 'pass12345')
+        aceitar_termos(self.user)
+        InteressadoAdocao.objects.create(usuario=self.user, cpf='12345678901', latitude=-23.551, longitude=-46.631)
+        base = dict(PET_PADRAO, local_adocao=local)
+        Pet.objects.create(nome='Vizinho', **base)
+        Pet.objects.create(nome='Distante', latitude=-22.9, longitude=-43.2, **base)
+
+    def test_pets_proximos_usa_instantaneo(self):
+        self.client.force_login(self.user)
+        resp = self.client.get(reverse('core:pets_proximos'))
+        self.assertEqual([item['pet'].nome for item in resp.context['pets_proximos']], ['Vizinho'])
+        self.assertEqual(resp.context['total_encontrados'], 1)
+
+    def test_mapa_api_com_raio_usa_instantaneo(self):
+        resp = self.client.get(reverse('core:pets_mapa_api'), {'lat': -23.55, 'lon': -46.63, 'raio': 10})
+        self.assertEqual([p['nome'] for p in resp.json()], ['Vizinho'])
+
+
+class PetSnapshotMapeadoTests(PetsTestCase):
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = Path(diretorio.name)
+        configuracao = override_settings(PET_SNAPSHOT_ENABLED=True, PET_SNAPSHOT_MMAP=True, PET_SNAPSHOT_DIR=self.diretorio)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        snapshot.invalidar()
+        self.addCleanup(snapshot.invalidar)
+        self.local = self._local(latitude=-23.55, longitude=-46.63)
+        self.rex = self._pet('Rex')
+        self.bob = self._pet('Bob')
+
+    def test_comando_publica_versao_mapeada_somente_leitura(self):
+        call_command('publicar_snapshot_pets', stdout=StringIO())
+        self.assertEqual(set(snapshot.filtrar()), {self.rex.id, self.bob.id})
+        self.assertEqual(snapshot.versao, (self.diretorio / PONTEIRO).read_text())
+        self.assertFalse(snapshot._dados.flags.writeable)
+
+    def test_troca_para_nova_versao_e_remove_antigas(self):
+        publicar(manter=1)
+        self.assertEqual(len(snapshot), 2)
+        versao_anterior = snapshot.versao
+        self.rex.status = 'adotado'
+        self.rex.save()  # versão mapeada não muda até a próxima publicação
+        self.assertEqual(len(snapshot), 2)
+        publicar(manter=1)
+        self.assertEqual(snapshot.filtrar(), [self.bob.id])
+        self.assertNotEqual(snapshot.versao, versao_anterior)
+        self.assertEqual([arquivo.name for arquivo in self.diretorio.glob('pets-*.npy')], [snapshot.versao])
+
+    def test_sem_versao_publicada_usa_copia_do_processo(self):
+        self.assertEqual(len(snapshot), 2)
+        self.assertIsNone(snapshot.versao)
+
+    @override_settings(PET_SNAPSHOT_TTL=60)
+    def test_versao_publicada_vencida_volta_a_copia_do_processo(self):
+        publicar()
+        self.assertEqual(len(snapshot), 2)
+        self.assertIsNotNone(snapshot.versao)
+        antigo = time.time() - 120
+        os.utime(self.diretorio / PONTEIRO, (antigo, antigo))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rex.status = 'adotado'
+            self.rex.save()
+        self.assertEqual(snapshot.filtrar(), [self.bob.id])
+        self.assertIsNone(snapshot.versao)
+        # A cópia própria segue os sinais até haver uma publicação nova
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rex.status = 'disponivel'
+            self.rex.save()
+        self.assertEqual(len(snapshot), 2)
+        publicar()
+        self.assertEqual(len(snapshot), 2)
+        self.assertIsNotNone(snapshot.versao)
+
+    @override_settings(PET_SNAPSHOT_PUBLICAR_AO_SALVAR=True)
+    def test_publica_apos_commit_uma_vez_por_transacao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.rex.status = 'adotado'
+                self.rex.save()
+                self.bob.status = 'adotado'
+                self.bob.save()
+        self.assertEqual(len(list(self.diretorio.glob('pets-*.npy'))), 1)
+        self.assertEqual(len(snapshot), 0)
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import AuditLog
+from core.retencao_auditoria import particionada, podar
+
+
+def _log(dias, status_code=200):
+    return AuditLog.objects.create(
+        metodo='GET', caminho=f'/{dias}/{status_code}/', status_code=status_code,
+        criado_em=timezone.now() - timedelta(days=dias),
+    )
+
+
+@override_settings(AUDITLOG_RETENCAO_DIAS=30, AUDITLOG_RETENCAO_ERROS_DIAS=90, AUDITLOG_PODA_PAUSA=0)
+class PodaAuditLogTests(TestCase):
+    def setUp(self):
+        self.recente = _log(5)
+        self.vencido = [_log(40 + i) for i in range(5)]
+        self.erro_guardado = _log(60, status_code=500)
+        self.erro_vencido = _log(120, status_code=404)
+
+    def test_apaga_em_lotes_conforme_politica(self):
+        resumo = podar(lote=2)
+        self.assertEqual(resumo['registros'], 6)
+        self.assertEqual(resumo['lotes'], 3)
+        restantes = set(AuditLog.objects.values_list('id', flat=True))
+        self.assertEqual(restantes, {self.recente.id, self.erro_guardado.id})
+
+    def test_simular_nao_apaga(self):
+        resumo = podar(simular=True)
+        self.assertEqual(resumo['registros'], 6)
+        self.assertEqual(AuditLog.objects.count(), 8)
+
+    def test_retencao_zero_guarda_para_sempre(self):
+        resumo = podar(dias=0)
+        self.assertEqual(resumo['registros'], 1)
+        self.assertFalse(AuditLog.objects.filter(id=self.erro_vencido.id).exists())
+        self.assertEqual(AuditLog.objects.filter(status_code=200).count(), 6)
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command('prune_auditlog', '--lote', '4', stdout=saida)
+        self.assertIn('6 registros apagados em 2 lotes', saida.getvalue())
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+        saida = StringIO()
+        call_command('prune_auditlog', '--simular', '--dias', '1', stdout=saida)
+        self.assertIn('1 registros seriam apagados', saida.getvalue())
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_comando_rejeita_lote_invalido(self):
+        with self.assertRaises(CommandError):
+            call_command('prune_auditlog', '--lote', '0', stdout=StringIO())
+
+    def test_sqlite_segue_com_tabela_simples(self):
+        self.assertFalse(particionada())
@@ -0,0 +1,186 @@
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from core import contadores, rollups
+from core.models import (AceitacaoTermos, DiaPendenteRollup, InteressadoAdocao, LocalAdocao, MarcaProcessamento, Pet,
+                         RollupDiario, RollupSemanal, SolicitacaoAdocao)
+
+
+def _momento(dia, hora=12):
+    return timezone.make_aware(datetime.combine(dia, time(hora)))
+
+
+class RollupsBase(TestCase):
+    # Quarta e quinta de uma semana e a segunda-feira seguinte
+    DIA1, DIA2, DIA3 = date(2026, 9, 2), date(2026, 9, 3), date(2026, 9, 7)
+
+    def setUp(self):
+        self.org = User.objects.create_user('org', 'org@example.com', 'pass12345')
+        self.local = LocalAdocao.objects.create(usuario=self.org, cnpj='12345678000199')
+        outro = User.objects.create_user('org2', 'org2@example.com', 'pass12345')
+        self.outro_local = LocalAdocao.objects.create(usuario=outro, cnpj='98765432000199')
+        base = dict(idade=12, sexo='macho', porte='medio', descricao='Teste')
+        self.cao = Pet.objects.create(nome='Rex', especie='cao', local_adocao=self.local, **base)
+        self.gato = Pet.objects.create(nome='Mia', especie='gato', local_adocao=self.local, **base)
+        self.cao_outro = Pet.objects.create(nome='Bob', especie='cao', local_adocao=self.outro_local, **base)
+        self.interessados = []
+        for i in range(4):
+            user = User.objects.create_user(f'int{i}', f'int{i}@example.com', 'pass12345')
+            self.interessados.append(InteressadoAdocao.objects.create(usuario=user, cpf=f'1234567890{i}'))
+
+    def _solicitar(self, pet, interessado, dia, **campos):
+        solicitacao = SolicitacaoAdocao.objects.create(pet=pet, interessado=interessado, motivo='m',
+                                                       experiencia_pets='e', situacao_moradia='s', **campos)
+        SolicitacaoAdocao.objects.filter(pk=solicitacao.pk).update(data_solicitacao=_momento(dia))
+        return solicitacao
+
+    def _linha(self, dia, local, especie):
+        return RollupDiario.objects.filter(dia=dia, local_adocao=local, especie=especie).values(*rollups.METRICAS).first()
+
+
+class AtualizarTests(RollupsBase):
+    def test_consolida_por_dia_local_e_especie(self):
+        self._solicitar(self.cao, self.interessados[0], self.DIA1)
+        self._solicitar(self.cao, self.interessados[1], self.DIA1, status='rejeitada', data_resposta=_momento(self.DIA2))
+        self._solicitar(self.gato, self.interessados[2], self.DIA2, status='cancelada', data_cancelamento=_momento(self.DIA2, 23))
+        self._solicitar(self.cao_outro, self.interessados[3], self.DIA3)
+        Pet.objects.filter(pk=self.cao.pk).update(status='adotado', data_adocao=_momento(self.DIA3, 0))
+
+        rollups.atualizar(ate=_momento(self.DIA3, 18))
+        self.assertEqual(self._linha(self.DIA1, self.local, 'cao'), {'adocoes': 0, 'solicitacoes': 2, 'rejeicoes': 0, 'cancelamentos': 0})
+        self.assertEqual(self._linha(self.DIA2, self.local, 'cao')['rejeicoes'], 1)
+        self.assertEqual(self._linha(self.DIA2, self.local, 'gato'), {'adocoes': 0, 'solicitacoes': 1, 'rejeicoes': 0, 'cancelamentos': 1})
+        self.assertEqual(self._linha(self.DIA3, self.local, 'cao')['adocoes'], 1)
+        self.assertEqual(self._linha(self.DIA3, self.outro_local, 'cao')['solicitacoes'], 1)
+        semana = RollupSemanal.objects.get(semana=date(2026, 8, 31), local_adocao=self.local, especie='cao')
+        self.assertEqual((semana.solicitacoes, semana.rejeicoes), (2, 1))
+
+        # Repetir não duplica nada
+        antes = list(RollupDiario.objects.order_by('dia', 'local_adocao', 'especie').values('dia', 'local_adocao', 'especie', *rollups.METRICAS))
+        rollups.atualizar(ate=_momento(self.DIA3, 18))
+        self.assertEqual(list(RollupDiario.objects.order_by('dia', 'local_adocao', 'especie').values('dia', 'local_adocao', 'especie', *rollups.METRICAS)), antes)
+
+    def test_incremental_a_partir_da_marca(self):
+        self._solicitar(self.cao, self.interessados[0], self.DIA1)
+        rollups.atualizar(ate=_momento(self.DIA2, 10))
+        self.assertEqual(MarcaProcessamento.objects.get(nome=rollups.MARCA).processado_ate, _momento(self.DIA2, 10))
+        # Um evento antigo alterado fora do fluxo não é relido; o dia da marca é reprocessado inteiro
+        SolicitacaoAdocao.objects.update(data_solicitacao=_momento(self.DIA1 - timedelta(days=1)))
+        self._solicitar(self.gato, self.interessados[1], self.DIA2)
+        rollups.atualizar(ate=_momento(self.DIA3, 10))
+        self.assertEqual(self._linha(self.DIA1, self.local, 'cao')['solicitacoes'], 1)
+        self.assertEqual(self._linha(self.DIA2, self.local, 'gato')['solicitacoes'], 1)
+        # --completo reprocessa o histórico
+        call_command('atualizar_rollups', '--completo', stdout=StringIO())
+        self.assertIsNone(self._linha(self.DIA1, self.local, 'cao'))
+        self.assertEqual(self._linha(self.DIA1 - timedelta(days=1), self.local, 'cao')['solicitacoes'], 1)
+
+
+class DiasAlteradosTests(RollupsBase):
+    """Eventos de dias anteriores à marca d'água que mudam depois da consolidação."""
+
+    def setUp(self):
+        super().setUp()
+        self.solicitacao = self._solicitar(self.cao, self.interessados[0], self.DIA1, status='rejeitada',
+                                           data_resposta=_momento(self.DIA1, 15))
+        self.cao.status, self.cao.data_adocao = 'adotado', _momento(self.DIA1, 16)
+        self.cao.save()
+        rollups.atualizar(ate=_momento(self.DIA3, 10))
+        DiaPendenteRollup.objects.all().delete()
+
+    def test_dia_alterado_por_save_e_reprocessado(self):
+        self.assertEqual(self._linha(self.DIA1, self.local, 'cao')['adocoes'], 1)
+        pet = Pet.objects.get(pk=self.cao.pk)
+        pet.status, pet.data_adocao = 'disponivel', None
+        pet.save()
+        self.assertEqual(list(DiaPendenteRollup.objects.values_list('dia', flat=True)), [self.DIA1])
+
+        resumo = rollups.atualizar(ate=_momento(self.DIA3, 12))
+        self.assertEqual(resumo['dias_alterados'], 1)
+        self.assertEqual(self._linha(self.DIA1, self.local, 'cao')['adocoes'], 0)
+        semana = RollupSemanal.objects.get(semana=date(2026, 8, 31), local_adocao=self.local, especie='cao')
+        self.assertEqual(semana.adocoes, 0)
+        self.assertFalse(DiaPendenteRollup.objects.exists())
+
+    def test_solicitacao_removida_ou_atualizada_em_massa(self):
+        outra = self._solicitar(self.gato, self.interessados[1], self.DIA2)
+        rollups.atualizar(ate=_momento(self.DIA3, 11), desde=self.DIA1)
+        self.assertEqual(self._linha(self.DIA2, self.local, 'gato')['solicitacoes'], 1)
+
+        contadores.atualizar_solicitacoes(SolicitacaoAdocao.objects.filter(pk=self.solicitacao.pk), 'cancelada',
+                                          data_cancelamento=_momento(self.DIA2, 9))
+        SolicitacaoAdocao.objects.get(pk=outra.pk).delete()
+        self.assertEqual(set(DiaPendenteRollup.objects.values_list('dia', flat=True)), {self.DIA1, self.DIA2})
+
+        rollups.atualizar(ate=_momento(self.DIA3, 12))
+        self.assertEqual(self._linha(self.DIA1, self.local, 'cao'),
+                         {'adocoes': 1, 'solicitacoes': 1, 'rejeicoes': 0, 'cancelamentos': 0})
+        self.assertEqual(self._linha(self.DIA2, self.local, 'cao')['cancelamentos'], 1)
+        self.assertIsNone(self._linha(self.DIA2, self.local, 'gato'))
+
+    def test_pet_que_muda_de_local_leva_as_solicitacoes(self):
+        pet = Pet.objects.get(pk=self.cao.pk)
+        pet.local_adocao = self.outro_local
+        pet.save()
+        rollups.atualizar(ate=_momento(self.DIA3, 12))
+        self.assertIsNone(self._linha(self.DIA1, self.local, 'cao'))
+        self.assertEqual(self._linha(self.DIA1, self.outro_local, 'cao'),
+                         {'adocoes': 1, 'solicitacoes': 1, 'rejeicoes': 1, 'cancelamentos': 0})
+
+
+class SeriesApiTests(RollupsBase):
+    def setUp(self):
+        super().setUp()
+        self._solicitar(self.cao, self.interessados[0], self.DIA1)
+        self._solicitar(self.cao_outro, self.interessados[1], self.DIA1)
+        self._solicitar(self.gato, self.interessados[2], self.DIA3)
+        rollups.atualizar(ate=_momento(self.DIA3, 18))
+        self.url = reverse('core:series_adocao')
+
+    def _login(self, user):
+        AceitacaoTermos.objects.get_or_create(usuario=user, defaults=dict(
+            termos_aceitos=True, lgpd_aceito=True, ip_aceitacao='127.0.0.1', user_agent='test', versao_termos='1.0'))
+        self.client.force_login(user)
+
+    def test_local_ve_apenas_os_seus_numeros(self):
+        self._login(self.org)
+        dados = self.client.get(self.url, {'inicio': '2026-09-01', 'fim': '2026-09-07', 'local': self.outro_local.pk}).json()
+        self.assertEqual(dados['series']['periodos'][0], '2026-09-01')
+        self.assertEqual(len(dados['series']['periodos']), 7)
+        self.assertEqual(dados['series']['solicitacoes'], [0, 1, 0, 0, 0, 0, 1])
+
+    def test_equipe_ve_todos_por_semana(self):
+        staff = User.objects.create_user('admin', 'admin@example.com', 'pass12345', is_staff=True)
+        self._login(staff)
+        dados = self.client.get(self.url, {'granularidade': 'semana', 'inicio': '2026-09-01', 'fim': '2026-09-07'}).json()
+        self.assertEqual(dados['series']['periodos'], ['2026-08-31', '2026-09-07'])
+        self.assertEqual(dados['series']['solicitacoes'], [2, 1])
+        dados = self.client.get(self.url, {'granularidade': 'semana', 'inicio': '2026-09-01', 'fim': '2026-09-07', 'especie': 'gato'}).json()
+        self.assertEqual(dados['series']['solicitacoes'], [0, 1])
+
+    def test_api_nao_reconsolida(self):
+        # Solicitação posterior à consolidação só aparece depois do comando
+        self._solicitar(self.cao, self.interessados[3], self.DIA3)
+        self._login(self.org)
+        dados = self.client.get(self.url, {'inicio': '2026-09-01', 'fim': '2026-09-07'}).json()
+        self.assertEqual(dados['atualizado_ate'], rollups.processado_ate().isoformat())
+        self.assertEqual(sum(dados['series']['solicitacoes']), 2)
+        rollups.atualizar()
+        dados = self.client.get(self.url, {'inicio': '2026-09-01', 'fim': '2026-09-07'}).json()
+        self.assertEqual(sum(dados['series']['solicitacoes']), 3)
+
+    def test_parametros_invalidos_e_acesso(self):
+        self._login(self.org)
+        self.assertEqual(self.client.get(self.url, {'granularidade': 'mes'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'inicio': '2026-09-07', 'fim': '2026-09-01'}).status_code, 400)
+        self._login(self.interessados[0].usuario)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_paineis_incluem_o_grafico(self):
+        self._login(self.org)
+        self.assertContains(self.client.get(reverse('core:gerenciar_pets')), 'tendenciaAdocoesChart')
@@ -0,0 +1,79 @@
+from django.test import override_settings
+from django.urls import reverse
+from core.trigramas import IndiceTrigramas, indice_trigramas, normalizar, sugestoes, trigramas
+from core.tests.base import PetsTestCase
+
+
+class TrigramasBase(PetsTestCase):
+    def setUp(self):
+        indice_trigramas.invalidar()
+        self.addCleanup(indice_trigramas.invalidar)
+        self.local = self._local()
+        self.toto = self._pet('Totó', raca='Pinscher')
+        self.fifi = self._pet('Fifi', raca='Pinscher')
+        self.luna = self._pet('Luna', raca='SRD', especie='gato')
+        self.bob = self._pet('Bob', raca='Poodle', status='adotado')
+
+
+@override_settings(BUSCA_TRIGRAMAS_ENABLED=True)
+class TrigramasTests(TrigramasBase):
+    def test_trigramas_como_pg_trgm(self):
+        self.assertEqual(trigramas('Cão'), {'  c', ' ca', 'cao', 'ao '})
+        self.assertEqual(normalizar('Vira-Lata'), 'srd')
+
+    def test_erro_de_digitacao(self):
+        primeira = sugestoes('pincher')[0]
+        self.assertEqual((primeira['campo'], primeira['valor'], primeira['quantidade']), ('raca', 'Pinscher', 2))
+        self.assertGreaterEqual(primeira['similaridade'], 0.3)
+
+    def test_sinonimo_e_apenas_disponiveis(self):
+        self.assertEqual([s['valor'] for s in sugestoes('vira lata', campos=('raca',))], ['SRD'])
+        self.assertEqual(sugestoes('poodle'), [])
+
+    def test_sem_semelhanca(self):
+        self.assertEqual(sugestoes('xyzw'), [])
+
+
+@override_settings(BUSCA_TRIGRAMAS_ENABLED=True)
+class IndiceTrigramasIncrementalTests(TrigramasBase):
+    def test_indice_acompanha_alteracoes(self):
+        sugestoes('pincher')  # constrói
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fifi.raca = 'Beagle'
+            self.fifi.save()
+            self.toto.delete()
+            self.bob.status = 'disponivel'
+            self.bob.save()
+        self.assertEqual(sugestoes('pincher'), [])
+        self.assertEqual(sugestoes('bigle')[0]['valor'], 'Beagle')
+        self.assertEqual(sugestoes('pudle')[0]['valor'], 'Poodle')
+        novo = IndiceTrigramas()
+        novo.reconstruir()
+        self.assertEqual(indice_trigramas._campos, novo._campos)
+
+
+class BuscaSemIndiceTests(TrigramasBase):
+    def test_icontains_sem_montar_indice(self):
+        with self.assertNumQueries(1):
+            encontrados = sugestoes('pinsch', campos=('raca',))
+        self.assertEqual([(s['valor'], s['quantidade']) for s in encontrados], [('Pinscher', 2)])
+        self.assertEqual(sugestoes('pincher'), [])
+        self.assertFalse(indice_trigramas.construido)
+
+
+@override_settings(BUSCA_TRIGRAMAS_ENABLED=True)
+class BuscaAproximadaViewsTests(TrigramasBase):
+    def test_lista_recorre_a_busca_aproximada(self):
+        resp = self.client.get(reverse('core:pets_list'), {'search': 'pincher'})
+        self.assertEqual({pet.nome for pet in resp.context['page_obj']}, {'Totó', 'Fifi'})
+        self.assertEqual(resp.context['sugestoes_busca'][0]['valor'], 'Pinscher')
+        self.assertContains(resp, 'Nenhum resultado exato')
+
+    def test_busca_exata_nao_usa_sugestoes(self):
+        resp = self.client.get(reverse('core:pets_list'), {'search': 'pinscher'})
+        self.assertEqual(resp.context['sugestoes_busca'], [])
+
+    def test_api(self):
+        dados = self.client.get(reverse('core:busca_aproximada_pets'), {'termo': 'lunna', 'campo': 'nome'}).json()
+        self.assertEqual([s['valor'] for s in dados['sugestoes']], ['Luna'])
+        self.assertEqual(self.client.get(reverse('core:busca_aproximada_pets'), {'termo': 'x', 'campo': 'cor'}).status_code, 400)
@@ -27,9 +27,11 @@ class AnonymizeUtilsTests(TestCase):
         self.assertEqual(interessado.endereco, '***')
 
 
+@patch.dict('os.environ', {'GOOGLE_MAPS_API_KEY': 'chave-teste'})
 class GeocodeUtilsTests(TestCase):
-    @patch('core.utils.requests.get')
-    def test_geocodificar_endereco_returns_coordinates_on_ok(self, mock_get):
+    @patch('core.geocoding.obter_sessao')
+    def test_geocodificar_endereco_returns_coordinates_on_ok(self, mock_sessao):
+        mock_get = mock_sessao.return_value.get
         mock_resp = Mock()
         mock_resp.json.return_value = {
             'status': 'OK',
@@ -43,8 +45,9 @@ class GeocodeUtilsTests(TestCase):
         self.assertIsNotNone(coords)
         self.assertEqual(coords, (12.34, 56.78))
 
-    @patch('core.utils.requests.get')
-    def test_geocodificar_endereco_returns_none_on_not_found(self, mock_get):
+    @patch('core.geocoding.obter_sessao')
+    def test_geocodificar_endereco_returns_none_on_not_found(self, mock_sessao):
+        mock_get = mock_sessao.return_value.get
         mock_resp = Mock()
         mock_resp.json.return_value = {'status': 'ZERO_RESULTS', 'results': []}
         mock_get.return_value = mock_resp
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from core import utils
+from core.utils import calcular_distancia, calcular_distancia_km, calcular_distancias, matriz_distancias
+
+
+class DistanciasEmLoteTests(SimpleTestCase):
+    origem = (-23.55052, -46.633308)
+    lats = [-23.55052, -22.906847, -19.916681, -30.034647]
+    lons = [-46.633308, -43.172896, -43.934493, -51.217658]
+
+    def test_escalares_consistentes(self):
+        d = calcular_distancia(*self.origem, self.lats[1], self.lons[1])
+        self.assertAlmostEqual(d, 357.0, delta=5)
+        self.assertEqual(calcular_distancia_km(*self.origem, self.lats[1], self.lons[1]), round(d, 2))
+        self.assertEqual(calcular_distancia(*self.origem, *self.origem), 0.0)
+
+    def test_lote_igual_ao_escalar(self):
+        esperado = [calcular_distancia(*self.origem, la, lo) for la, lo in zip(self.lats, self.lons)]
+        obtido = calcular_distancias(*self.origem, self.lats, self.lons)
+        for e, o in zip(esperado, obtido):
+            self.assertAlmostEqual(e, float(o), places=9)
+
+    def test_fallback_python_puro(self):
+        with patch.object(utils, 'np', None):
+            obtido = calcular_distancias(*self.origem, self.lats, self.lons)
+            matriz = matriz_distancias(self.lats[:2], self.lons[:2], self.lats, self.lons)
+        self.assertIsInstance(obtido, list)
+        self.assertAlmostEqual(obtido[1], calcular_distancia(*self.origem, self.lats[1], self.lons[1]), places=9)
+        self.assertEqual(len(matriz), 2)
+        self.assertEqual(len(matriz[0]), 4)
+
+    def test_matriz_muitos_para_muitos(self):
+        matriz = matriz_distancias(self.lats, self.lons, self.lats[:2], self.lons[:2])
+        for i, (la, lo) in enumerate(zip(self.lats, self.lons)):
+            for j in range(2):
+                self.assertAlmostEqual(
+                    float(matriz[i][j]), calcular_distancia(la, lo, self.lats[j], self.lons[j]), places=9
+                )
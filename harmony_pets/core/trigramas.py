@@ -0,0 +1,219 @@
+# Busca aproximada (tolerante a erros de digitação) em nomes e raças de pets por trigramas
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Count, FloatField, Max
+from django.db.models.expressions import RawSQL
+
+from .models import Pet
+
+CAMPOS = ('raca', 'nome')
+# Mesmo limiar padrão do pg_trgm (pg_trgm.similarity_threshold)
+LIMIAR = 0.3
+# Grafias populares que não se parecem com o valor cadastrado
+SINONIMOS = {
+    'vira lata': 'srd',
+    'viralata': 'srd',
+    'sem raca definida': 'srd',
+    'mestico': 'srd',
+}
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = ' '.join(re.findall(r'[a-z0-9]+', texto))
+    return SINONIMOS.get(texto, texto)
+
+
+def trigramas(texto):
+    """Trigramas como no pg_trgm: cada palavra com dois espaços antes e um depois.
+
+    A similaridade entre dois conjuntos é a de Jaccard, como a função similarity().
+    """
+    resultado = set()
+    for palavra in normalizar(texto).split():
+        palavra = f'  {palavra} '
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return frozenset(resultado)
+
+
+class IndiceTrigramas:
+    """Índice invertido trigrama -> valores distintos de raça/nome dos pets disponíveis.
+
+    Indexa os valores distintos (com a quantidade de pets de cada um), não as linhas:
+    uma consulta só visita as listas dos trigramas do termo. É construído sob demanda
+    e mantido pelos sinais de Pet (core.signals), como a pirâmide do mapa.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._campos = None  # campo -> {'valores': Counter, 'trigramas': {valor: frozenset}, 'listas': {tri: set(valor)}}
+        self._pets = {}  # id do pet -> {campo: valor} contado no índice
+        self._construido_em = None
+
+    @staticmethod
+    def habilitado():
+        return getattr(settings, 'BUSCA_TRIGRAMAS_ENABLED', False)
+
+    @property
+    def construido(self):
+        return self._campos is not None
+
+    def invalidar(self):
+        with self._lock:
+            self._campos = None
+            self._pets = {}
+            self._construido_em = None
+
+    def reconstruir(self):
+        linhas = Pet.objects.disponiveis().order_by().values_list('id', *CAMPOS)
+        with self._lock:
+            self._campos = {campo: {'valores': Counter(), 'trigramas': {}, 'listas': {}} for campo in CAMPOS}
+            self._pets = {}
+            for pet_id, *valores in linhas:
+                self._somar(pet_id, dict(zip(CAMPOS, valores)))
+            self._construido_em = time.monotonic()
+
+    def _garantir(self):
+        ttl = getattr(settings, 'BUSCA_TRIGRAMAS_TTL', 300)
+        if self._campos is None or (ttl and time.monotonic() - self._construido_em > ttl):
+            self.reconstruir()
+
+    def _somar(self, pet_id, registro):
+        for campo, valor in registro.items():
+            if not valor:
+                continue
+            indice = self._campos[campo]
+            if not indice['valores'][valor]:
+                tris = trigramas(valor)
+                indice['trigramas'][valor] = tris
+                for tri in tris:
+                    indice['listas'].setdefault(tri, set()).add(valor)
+            indice['valores'][valor] += 1
+        self._pets[pet_id] = registro
+
+    def _subtrair(self, pet_id):
+        registro = self._pets.pop(pet_id, None)
+        if registro is None:
+            return
+        for campo, valor in registro.items():
+            if not valor:
+                continue
+            indice = self._campos[campo]
+            indice['valores'][valor] -= 1
+            if indice['valores'][valor] <= 0:
+                del indice['valores'][valor]
+                for tri in indice['trigramas'].pop(valor):
+                    lista = indice['listas'][tri]
+                    lista.discard(valor)
+                    if not lista:
+                        del indice['listas'][tri]
+
+    # ---- atualização incremental ----
+
+    def atualizar_pet(self, pet):
+        if not self.construido:
+            return
+        with self._lock:
+            if self._campos is None:
+                return
+            self._subtrair(pet.pk)
+            if pet.status == 'disponivel' and pet.ativo:
+                self._somar(pet.pk, {campo: getattr(pet, campo) for campo in CAMPOS})
+
+    def remover(self, pet_id):
+        with self._lock:
+            if self._campos is not None:
+                self._subtrair(pet_id)
+
+    # ---- consulta ----
+
+    def buscar(self, termo, campo, limite, limiar=LIMIAR):
+        """[(valor, similaridade, quantidade)] com similaridade >= limiar, da mais parecida."""
+        alvo = trigramas(termo)
+        with self._lock:
+            self._garantir()
+            indice = self._campos[campo]
+            comuns = Counter()
+            for tri in alvo:
+                comuns.update(indice['listas'].get(tri, ()))
+            resultados = []
+            for valor, quantidade_comum in comuns.items():
+                total = len(alvo) + len(indice['trigramas'][valor]) - quantidade_comum
+                nota = quantidade_comum / total
+                if nota >= limiar:
+                    resultados.append((valor, nota, indice['valores'][valor]))
+        resultados.sort(key=lambda item: (-item[1], -item[2], item[0]))
+        return resultados[:limite]
+
+
+indice_trigramas = IndiceTrigramas()
+
+
+def _buscar_postgres(termo, campo, limite, limiar=LIMIAR):
+    # core_unaccent(lower(campo)) % termo usa o índice GIN gin_trgm_ops criado na migração 0023;
+    # sem acentos dos dois lados, como normalizar() e o índice em memória
+    termo = normalizar(termo)
+    coluna = f'core_unaccent(lower("core_pet"."{campo}"))'
+    linhas = (
+        Pet.objects.disponiveis().exclude(**{campo: ''})
+        .filter(RawSQL(f'{coluna} %% %s', [termo], output_field=BooleanField()))
+        .order_by().values(campo)
+        .annotate(
+            quantidade=Count('id'),
+            similaridade=Max(RawSQL(f'similarity({coluna}, %s)', [termo], output_field=FloatField())),
+        )
+        .filter(similaridade__gte=limiar)
+        .order_by('-similaridade', '-quantidade', campo)[:limite]
+    )
+    return [(linha[campo], linha['similaridade'], linha['quantidade']) for linha in linhas]
+
+
+def _buscar_no_banco(termo, campo, limite):
+    """[(valor, similaridade, quantidade)] dos valores que contêm o termo (`icontains`).
+
+    Usado com o índice em memória desligado: não tolera erros de digitação; a
+    similaridade só ordena os valores encontrados.
+    """
+    alvo = trigramas(termo)
+    linhas = (
+        Pet.objects.disponiveis().exclude(**{campo: ''})
+        .filter(**{f'{campo}__icontains': termo.strip()})
+        .order_by().values_list(campo).annotate(quantidade=Count('id'))
+    )
+    resultados = []
+    for valor, quantidade in linhas:
+        tris = trigramas(valor)
+        resultados.append((valor, len(alvo & tris) / len(alvo | tris), quantidade))
+    resultados.sort(key=lambda item: (-item[1], -item[2], item[0]))
+    return resultados[:limite]
+
+
+def sugestoes(termo, campos=CAMPOS, limite=10):
+    """Valores de raça/nome parecidos com `termo`, do mais parecido (e mais frequente) ao menos.
+
+    Postgres usa pg_trgm com índice GIN; os demais bancos usam o índice em memória
+    (BUSCA_TRIGRAMAS_ENABLED) ou, sem ele, um `icontains` que só acha o termo exato.
+    Retorna [{'campo', 'valor', 'similaridade', 'quantidade'}].
+    """
+    if not trigramas(termo):
+        return []
+    if connection.vendor == 'postgresql':
+        buscar = _buscar_postgres
+    elif indice_trigramas.habilitado():
+        buscar = indice_trigramas.buscar
+    else:
+        buscar = _buscar_no_banco
+    resultados = [
+        {'campo': campo, 'valor': valor, 'similaridade': round(nota, 3), 'quantidade': quantidade}
+        for campo in campos
+        for valor, nota, quantidade in buscar(termo, campo, limite)
+    ]
+    resultados.sort(key=lambda item: (-item['similaridade'], -item['quantidade'], item['valor']))
+    return resultados[:limite]
@@ -23,11 +23,15 @@ from .views_gerenciamento import gerenciar_pets, adicionar_pet, editar_pet, excl
 from .views_cadastro import register_view, register_interessado_view, register_local_view
 from .views_2fa import setup_2fa, verify_2fa, set_2fa_preference, disable_2fa
 from .views_legais import aceitar_termos, recusar_termos, revogar_termos
-from .views_api import sugerir_emoji
+from .views_api import sugerir_emoji, busca_aproximada_pets, autocompletar_pets, series_adocao, funil_adocao
 
 urlpatterns = [
     # API utilitária
     path('api/emoji/sugerir/', sugerir_emoji, name='sugerir_emoji'),
+    path('api/pets/busca-aproximada/', busca_aproximada_pets, name='busca_aproximada_pets'),
+    path('api/pets/autocompletar/', autocompletar_pets, name='autocompletar_pets'),
+    path('api/series-adocao/', series_adocao, name='series_adocao'),
+    path('api/funil-adocao/', funil_adocao, name='funil_adocao'),
     path('minhas-solicitacoes-adocao/', minhas_solicitacoes_adocao, name='minhas_solicitacoes_adocao'),
     path('meus-pets-adotados/', meus_pets_adotados, name='meus_pets_adotados'),
     path('', home, name='home'),
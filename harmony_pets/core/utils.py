@@ -1,21 +1,28 @@
-# Utilitário para calcular distância entre dois pontos (Haversine)
-from math import radians, sin, cos, sqrt, atan2
+# Utilitários de distância entre pontos geográficos (Haversine)
+import math
+from typing import Tuple, Optional
+
+try:  # NumPy é opcional: sem ele os cálculos em lote usam Python puro
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+RAIO_TERRA_KM = 6371.0
+
+
+def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Núcleo escalar da fórmula de Haversine (km); mesma expressão da versão vetorizada."""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
 
 def calcular_distancia_km(lat1, lon1, lat2, lon2):
     """
     Calcula a distância em km entre dois pontos geográficos usando a fórmula de Haversine.
     """
-    R = 6371.0  # Raio da Terra em km
-    lat1, lon1, lat2, lon2 = map(float, [lat1, lon1, lat2, lon2])
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    distancia = R * c
-    return round(distancia, 2)
-import math
-from typing import Tuple, Optional
+    return round(_haversine(float(lat1), float(lon1), float(lat2), float(lon2)), 2)
+
 
 def calcular_distancia(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -28,46 +35,56 @@ def calcular_distancia(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     Returns:
         Distância em quilômetros
     """
-    # Converte graus para radianos
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    
-    # Fórmula de Haversine
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    
-    # Raio da Terra em quilômetros
-    r = 6371
-    
-    return c * r
+    return _haversine(lat1, lon1, lat2, lon2)
+
+
+def calcular_distancias(lat: float, lon: float, lats, lons):
+    """Distâncias (km) de uma origem até vários pontos em uma única passada.
+
+    Args:
+        lat, lon: coordenadas da origem
+        lats, lons: sequências (ou arrays NumPy) de mesmo tamanho com os destinos
+
+    Returns:
+        Array NumPy de floats quando NumPy está disponível; caso contrário, lista.
+    """
+    if np is None:
+        return [_haversine(lat, lon, la, lo) for la, lo in zip(lats, lons)]
+    lat0 = math.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    dlon = np.radians(np.asarray(lons, dtype=np.float64)) - math.radians(lon)
+    a = np.sin((lats - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def matriz_distancias(lats_origem, lons_origem, lats_destino, lons_destino):
+    """Matriz de distâncias (km) entre todas as origens (linhas) e todos os destinos (colunas).
+
+    Útil para cruzamentos em lote, como interessados x pets disponíveis.
+    Retorna array 2D com NumPy ou lista de listas no modo Python puro.
+    """
+    if np is None:
+        return [
+            calcular_distancias(la, lo, lats_destino, lons_destino)
+            for la, lo in zip(lats_origem, lons_origem)
+        ]
+    lat1 = np.radians(np.asarray(lats_origem, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons_origem, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(lats_destino, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(lons_destino, dtype=np.float64))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
 
 import os
 import requests
 
 def geocodificar_endereco(endereco: str) -> Optional[Tuple[float, float]]:
     """
-    Função para geocodificar um endereço usando a API do Google Maps.
-    Retorna uma tupla (lat, lng) ou None se não encontrar.
+    Geocodifica um endereço (API do Google Maps com cache persistente e fallback offline).
+    Retorna uma tupla (lat, lng) ou None se não encontrar. Ver core.geocoding.
     """
-    API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        'address': endereco,
-        'key': API_KEY
-    }
-    try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        if data['status'] == 'OK' and data['results']:
-            lat = data['results'][0]['geometry']['location']['lat']
-            lng = data['results'][0]['geometry']['location']['lng']
-            return (lat, lng)
-        else:
-            return None
-    except Exception as e:
-        print(f"Erro ao geocodificar endereço: {e}")
-        return None
+    from .geocoding import geocodificar
+    return geocodificar(endereco)
 
 # Função para anonimizar dados sensíveis de InteressadoAdocao e User
 def anonimizar_dados_interessado(interessado):
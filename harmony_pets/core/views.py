@@ -125,55 +125,6 @@ def solicitacoes_adocao(request):
     
     return render(request, 'core/solicitacoes_adocao.html', context)
 
-@login_required
-def responder_solicitacao(request, solicitacao_id):
-    """View para responder solicitação de adoção"""
-    try:
-        local = request.user.localadocao
-        solicitacao = get_object_or_404(
-            SolicitacaoAdocao, 
-            id=solicitacao_id, 
-            pet__local_adocao=local
-        )
-    except LocalAdocao.DoesNotExist:
-        messages.error(request, 'Acesso negado.')
-        return redirect('home')
-    
-    if request.method == 'POST':
-        acao = request.POST.get('acao')
-        resposta = request.POST.get('resposta', '')
-        
-        if acao in ['aprovar', 'rejeitar']:
-            from django.utils import timezone
-            
-            solicitacao.status = 'aprovada' if acao == 'aprovar' else 'rejeitada'
-            solicitacao.resposta_local = resposta
-            solicitacao.data_resposta = timezone.now()
-            solicitacao.save()
-            
-            # Se aprovada, marcar pet como reservado
-            if acao == 'aprovar':
-                solicitacao.pet.status = 'reservado'
-                solicitacao.pet.adotado_por = solicitacao.interessado
-                solicitacao.pet.save()
-                
-                # Rejeitar outras solicitações para o mesmo pet
-                SolicitacaoAdocao.objects.filter(
-                    pet=solicitacao.pet,
-                    status='pendente'
-                ).exclude(id=solicitacao.id).update(
-                    status='rejeitada',
-                    resposta_local='Pet já foi reservado para outro interessado.',
-                    data_resposta=timezone.now()
-                )
-            
-            action_text = 'aprovada' if acao == 'aprovar' else 'rejeitada'
-            messages.success(request, f'Solicitação {action_text} com sucesso!')
-        else:
-            messages.error(request, 'Ação inválida.')
-    
-    return redirect('solicitacoes_adocao')
-
 @login_required
 def agendar_entrevista(request, solicitacao_id):
     """View para agendar entrevista com o interessado"""
@@ -335,91 +286,6 @@ Equipe Harmony Pets"""
     
     return redirect('solicitacoes_adocao')
 
-@login_required
-def agendar_retirada(request, solicitacao_id):
-    """View para agendar data de retirada do pet"""
-    try:
-        local = request.user.localadocao
-        solicitacao = get_object_or_404(
-                solicitacao.pet.status = 'reservado'
-                solicitacao.pet.save()
-                # Rejeitar outras solicitações pendentes para o mesmo pet
-                from django.utils import timezone
-            if data_retirada_str:
-                try:
-                    data_retirada_naive = datetime.strptime(data_retirada_str, '%Y-%m-%dT%H:%M')
-                    data_retirada = timezone.make_aware(data_retirada_naive)
-                    solicitacao.data_retirada = data_retirada
-                    solicitacao.observacoes_retirada = observacoes
-                    solicitacao.status = 'agendado'
-                    solicitacao.save()
-                    # Marcar pet como reservado
-                    solicitacao.pet.status = 'reservado'
-                    solicitacao.pet.adotado_por = solicitacao.interessado
-                    solicitacao.pet.save()
-                    # Rejeitar outras solicitações pendentes para o mesmo pet
-                    from django.utils import timezone
-                    SolicitacaoAdocao.objects.filter(
-                        pet=solicitacao.pet,
-                        status__in=['pendente', 'em_entrevista']
-                    ).exclude(id=solicitacao.id).update(
-                        status='rejeitada',
-                        resposta_local='Pet já foi reservado para outro interessado.',
-                        data_resposta=timezone.now()
-                    )
-                    # Enviar e-mail com data de retirada agendada
-                    assunto = f'Retirada Agendada! Seu novo pet {solicitacao.pet.nome} te espera! 🎉'
-                    mensagem = f"""Olá {solicitacao.interessado.usuario.first_name},
-
-                    'data_hora': data_retirada.strftime('%d/%m/%Y às %H:%M'),
-
-                    'endereco': solicitacao.pet.local_adocao.endereco,
-
-                    'observacoes': observacoes,
-                    'contato_email': solicitacao.pet.local_adocao.usuario.email,
-                    context = {
-                        'solicitacao': solicitacao,
-                        'data_hora': data_retirada.strftime('%d/%m/%Y às %H:%M'),
-                        'endereco': solicitacao.pet.local_adocao.endereco,
-                        'observacoes': observacoes,
-                        'contato_email': solicitacao.pet.local_adocao.usuario.email,
-                        'contato_telefone': solicitacao.pet.local_adocao.telefone,
-                    }
-                    enviar_email_notificacao(
-                        solicitacao.interessado.usuario.email,
-                        assunto,
-                        mensagem,
-                        'core/email_retirada_agendada.html',
-                        context
-                    )
-                    messages.success(request, f'Retirada agendada para {data_retirada.strftime("%d/%m/%Y às %H:%M")}!')
-                    return redirect('core:solicitacoes_adocao')
-                except ValueError:
-                    messages.error(request, 'Data inválida.')
-                    return redirect('core:solicitacoes_adocao')
-            else:
-                messages.error(request, 'Por favor, informe a data da retirada.')
-                return redirect('core:solicitacoes_adocao')
-        else:
-            return redirect('core:solicitacoes_adocao')
-                    'contato_telefone': solicitacao.pet.local_adocao.telefone,
-                }
-                enviar_email_notificacao(
-                    solicitacao.interessado.usuario.email,
-                    assunto,
-                    mensagem,
-                    'core/email_retirada_agendada.html',
-                    context
-                )
-                
-                messages.success(request, f'Retirada agendada para {data_retirada.strftime("%d/%m/%Y às %H:%M")}!')
-            except ValueError:
-                messages.error(request, 'Data inválida.')
-        else:
-            messages.error(request, 'Por favor, informe a data da retirada.')
-    
-    return redirect('core:solicitacoes_adocao')
-
 @login_required
 def aceitar_termo(request, solicitacao_id):
     """View para o interessado aceitar o termo de responsabilidade"""
@@ -852,87 +718,6 @@ def get_client_ip(request):
     return ip
 
 
-# ==================== LOGS PARA ADMINISTRADORES ==================== #
-@staff_member_required
-def admin_logs(request):
-    """Exibe últimas linhas do arquivo de logs para administradores/staff"""
-    from django.conf import settings
-    log_path = os.path.join(settings.LOG_DIR, 'app.log') if hasattr(settings, 'LOG_DIR') else ''
-
-    # Parâmetros de filtro
-    q = request.GET.get('q', '').strip()
-    level = request.GET.get('level', '')
-    try:
-        n = int(request.GET.get('n', '500'))
-    except ValueError:
-        n = 500
-    n = max(50, min(n, 5000))
-
-    lines = []
-    error = None
-    if log_path and os.path.exists(log_path):
-        try:
-            # Lê o arquivo e pega as últimas N linhas
-            with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-                all_lines = f.readlines()
-            lines = all_lines[-n:]
-            # Aplica filtros simples
-            if level:
-                level = level.upper()
-                lines = [ln for ln in lines if f" {level} " in ln]
-            if q:
-                lines = [ln for ln in lines if q.lower() in ln.lower()]
-        except Exception as e:
-            error = f"Não foi possível ler o arquivo de logs: {e}"
-    else:
-        error = 'Arquivo de logs não encontrado. A aplicação gravará logs assim que eventos ocorrerem.'
-
-    # ==== AuditLog (banco) com filtro por usuário ====
-    audit_user_param = request.GET.get('usuario') or request.GET.get('user') or ''
-    audit_user_param = audit_user_param.strip()
-    try:
-        audit_limit = int(request.GET.get('audit_n', '200'))
-    except ValueError:
-        audit_limit = 200
-    # Permite limites pequenos (ex.: 10) para testes e uso prático
-    audit_limit = max(1, min(audit_limit, 1000))
-
-    audit_qs = AuditLog.objects.select_related('usuario').all()
-    # filtro adicional por caminho, se fornecido
-    audit_path_q = (request.GET.get('audit_path') or '').strip()
-    selected_user = None
-    if audit_user_param:
-        # Tenta interpretar como ID numérico primeiro
-        if audit_user_param.isdigit():
-            audit_qs = audit_qs.filter(usuario_id=int(audit_user_param))
-            selected_user = User.objects.filter(id=int(audit_user_param)).first()
-        else:
-            audit_qs = audit_qs.filter(usuario__username__iexact=audit_user_param)
-            selected_user = User.objects.filter(username__iexact=audit_user_param).first()
-
-    if audit_path_q:
-        audit_qs = audit_qs.filter(caminho__icontains=audit_path_q)
-    audit_logs = list(audit_qs.order_by('-criado_em')[:audit_limit])
-    # Lista de usuários distintos presentes em AuditLog (para dropdown)
-    audit_users = User.objects.filter(auditlog__isnull=False).distinct().order_by('username')
-
-    context = {
-        'log_path': log_path,
-        'lines': lines,
-        'q': q,
-        'level': level,
-        'n': n,
-        'error': error,
-        # AuditLog extras
-        'audit_logs': audit_logs,
-        'audit_users': audit_users,
-        'audit_user_param': audit_user_param,
-        'selected_audit_user': selected_user,
-        'audit_limit': audit_limit,
-        'audit_path_q': audit_path_q,
-    }
-    return render(request, 'core/admin_logs.html', context)
-
 # ==================== PAINEL QUALIDADE (Cobertura de Testes) ==================== #
 @staff_member_required
 def admin_quality(request):
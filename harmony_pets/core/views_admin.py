@@ -1,52 +1,122 @@
-from django.shortcuts import render
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.shortcuts import redirect, render
 from django.contrib.admin.views.decorators import staff_member_required
-from .models import AuditLog, User, Pet, InteressadoAdocao, LocalAdocao, SolicitacaoAdocao, TwoFactorAuth
+from .auditoria import gravador
+from .kpis import idade_segundos, obter_snapshot
+from .indice_logs import buscar
+from .leitor_logs import ultimas_linhas
+from .models import AuditLog
 
 @staff_member_required
 def admin_dashboard(request):
-    users_total = User.objects.count()
-    interessados_total = InteressadoAdocao.objects.count()
-    locais_total = LocalAdocao.objects.count()
-    pets_total = Pet.objects.count()
-    pets_disponiveis = Pet.objects.filter(status='disponivel').count()
-    pets_adotados = Pet.objects.filter(status='adotado').count()
-    pets_reservados = Pet.objects.filter(status='reservado').count()
-    sol_total = SolicitacaoAdocao.objects.count()
-    sol_pendentes = SolicitacaoAdocao.objects.filter(status='pendente').count()
-    sol_aprovadas = SolicitacaoAdocao.objects.filter(status='entrevista_aprovada').count()
-    sol_rejeitadas = SolicitacaoAdocao.objects.filter(status__in=['rejeitada', 'entrevista_rejeitada']).count()
-    twofa_total = TwoFactorAuth.objects.count()
-    twofa_ativos = TwoFactorAuth.objects.filter(is_enabled=True).count()
-    twofa_taxa = round((twofa_ativos / twofa_total * 100) if twofa_total else 0, 2)
-    audit_recent = list(AuditLog.objects.order_by('-criado_em')[:10])
-    audit_errors_recent = list(AuditLog.objects.filter(status_code__gte=400).order_by('-criado_em')[:10])
+    if request.method == 'POST':
+        # Atualização explícita do instantâneo (com intervalo mínimo entre recálculos)
+        obter_snapshot(forcar=True)
+        return redirect('core:admin_dashboard')
+    snapshot = obter_snapshot()
+    audit_recent = list(AuditLog.objects.select_related('usuario').order_by('-criado_em')[:10])
+    audit_errors_recent = list(AuditLog.objects.select_related('usuario').filter(status_code__gte=400).order_by('-criado_em')[:10])
     context = {
-        'kpis': {
-            'users_total': users_total,
-            'interessados_total': interessados_total,
-            'locais_total': locais_total,
-            'pets_total': pets_total,
-            'pets_disponiveis': pets_disponiveis,
-            'pets_adotados': pets_adotados,
-            'pets_reservados': pets_reservados,
-            'sol_total': sol_total,
-            'sol_pendentes': sol_pendentes,
-            'sol_aprovadas': sol_aprovadas,
-            'sol_rejeitadas': sol_rejeitadas,
-            'twofa_total': twofa_total,
-            'twofa_ativos': twofa_ativos,
-            'twofa_taxa': twofa_taxa,
-        },
+        'kpis': snapshot['kpis'],
+        'kpis_calculado_em': snapshot['calculado_em'],
+        'kpis_idade_segundos': idade_segundos(snapshot),
         'audit_recent': audit_recent,
         'audit_errors_recent': audit_errors_recent,
+        'auditoria': gravador.estatisticas(),
     }
     return render(request, 'core/admin_dashboard.html', context)
 
+def _horario_do_log(valor, segundos):
+    """'AAAA-MM-DDTHH:MM' do formulário no formato dos logs ('AAAA-MM-DD HH:MM:SS'); '' se inválido."""
+    try:
+        return datetime.strptime(valor.strip(), '%Y-%m-%dT%H:%M').strftime('%Y-%m-%d %H:%M') + segundos
+    except ValueError:
+        return ''
+
 @staff_member_required
 def admin_logs(request):
-    logs = AuditLog.objects.all().order_by('-criado_em')
+    """Exibe as últimas linhas do arquivo de logs e o AuditLog filtrado, para staff."""
+    log_path = os.path.join(settings.LOG_DIR, 'app.log') if hasattr(settings, 'LOG_DIR') else ''
+
+    # Parâmetros de filtro
+    q = request.GET.get('q', '').strip()
+    level = request.GET.get('level', '').upper()
+    try:
+        n = int(request.GET.get('n', '500'))
+    except ValueError:
+        n = 500
+    n = max(50, min(n, 5000))
+
+    # Período (datetime-local do formulário) e escopo: com período, ou escopo "todos",
+    # a busca usa o índice dos blocos de app.log e de todos os backups
+    inicio = _horario_do_log(request.GET.get('inicio', ''), ':00')
+    fim = _horario_do_log(request.GET.get('fim', ''), ':59')
+    escopo = 'todos' if inicio or fim or request.GET.get('escopo') == 'todos' else 'recentes'
+
+    lines = []
+    error = None
+    if log_path and os.path.exists(log_path):
+        # Arquivos corrompidos ou truncados são pulados pelos leitores e listados aqui
+        falhas = []
+        if escopo == 'todos':
+            lines = buscar(log_path, inicio=inicio, fim=fim, niveis=[level] if level else None, busca=q, limite=n, falhas=falhas)
+        else:
+            # Lê só o fim do arquivo (e dos backups da rotação, se N passar dele), filtrando na leitura
+            lines = ultimas_linhas(log_path, n, nivel=level, busca=q, falhas=falhas)
+        if falhas:
+            error = 'Não foi possível ler: ' + '; '.join(f'{os.path.basename(arquivo)} ({erro})' for arquivo, erro in falhas)
+    else:
+        error = 'Arquivo de logs não encontrado. A aplicação gravará logs assim que eventos ocorrerem.'
+
+    # ==== AuditLog (banco) com filtro por usuário ====
+    audit_user_param = (request.GET.get('usuario') or request.GET.get('user') or '').strip()
+    try:
+        audit_limit = int(request.GET.get('audit_n', '200'))
+    except ValueError:
+        audit_limit = 200
+    # Permite limites pequenos (ex.: 10) para testes e uso prático
+    audit_limit = max(1, min(audit_limit, 1000))
+
+    audit_qs = AuditLog.objects.select_related('usuario').all()
+    # filtro adicional por caminho, se fornecido
+    audit_path_q = (request.GET.get('audit_path') or '').strip()
+    selected_user = None
+    if audit_user_param:
+        # Tenta interpretar como ID numérico primeiro
+        if audit_user_param.isdigit():
+            audit_qs = audit_qs.filter(usuario_id=int(audit_user_param))
+            selected_user = User.objects.filter(id=int(audit_user_param)).first()
+        else:
+            audit_qs = audit_qs.filter(usuario__username__iexact=audit_user_param)
+            selected_user = User.objects.filter(username__iexact=audit_user_param).first()
+
+    if audit_path_q:
+        audit_qs = audit_qs.filter(caminho__icontains=audit_path_q)
+    audit_logs = list(audit_qs.order_by('-criado_em')[:audit_limit])
+    # Lista de usuários distintos presentes em AuditLog (para dropdown)
+    audit_users = User.objects.filter(auditlog__isnull=False).distinct().order_by('username')
+
     context = {
-        'logs': logs,
+        'log_path': log_path,
+        'lines': lines,
+        'q': q,
+        'level': level,
+        'n': n,
+        'inicio': request.GET.get('inicio', '') if inicio else '',
+        'fim': request.GET.get('fim', '') if fim else '',
+        'escopo': escopo,
+        'error': error,
+        # AuditLog extras
+        'audit_logs': audit_logs,
+        'audit_users': audit_users,
+        'audit_user_param': audit_user_param,
+        'selected_audit_user': selected_user,
+        'audit_limit': audit_limit,
+        'audit_path_q': audit_path_q,
     }
     return render(request, 'core/admin_logs.html', context)
 
@@ -1,12 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.utils import timezone
 from django.urls import reverse
+from django.db import transaction
+from . import contadores
 from .models import Pet, InteressadoAdocao, SolicitacaoAdocao, LocalAdocao, AceitacaoTermos
 from .forms import InteressadoAdocaoForm
 from .utils import enviar_email_notificacao
+from .paginacao import paginar_por_cursor
 
 @login_required
 def solicitar_adocao_view(request, pet_id):
@@ -29,12 +31,13 @@ def solicitar_adocao_view(request, pet_id):
 
     if request.method == 'POST':
         # Cria a solicitação
-        solicitacao = SolicitacaoAdocao.objects.create(
-            pet=pet,
-            interessado=interessado,
-            status='pendente',
-            data_solicitacao=timezone.now()
-        )
+        with transaction.atomic():
+            solicitacao = SolicitacaoAdocao.objects.create(
+                pet=pet,
+                interessado=interessado,
+                status='pendente',
+                data_solicitacao=timezone.now()
+            )
         # Notifica o local de adoção
         assunto = f'Nova Solicitação de Adoção - {pet.nome}'
         mensagem = f"""Olá {pet.local_adocao.usuario.first_name},\n\n{interessado.usuario.first_name} solicitou a adoção do pet {pet.nome}.\n\nAcesse o painel para gerenciar as solicitações.\n\nAtenciosamente,\nEquipe Harmony Pets"""
@@ -59,7 +62,10 @@ def solicitar_adocao_view(request, pet_id):
 def minhas_solicitacoes_adocao(request):
     try:
         interessado = request.user.interessadoadocao
-        solicitacoes = interessado.solicitacoes.select_related('pet', 'pet__local_adocao').order_by('-data_solicitacao')
+        solicitacoes = paginar_por_cursor(
+            request, interessado.solicitacoes.select_related('pet', 'pet__local_adocao'),
+            ('-data_solicitacao', '-id'), por_pagina=10, com_total=True,
+        )
         return render(request, 'core/minhas_solicitacoes_adocao.html', {'solicitacoes': solicitacoes})
     except InteressadoAdocao.DoesNotExist:
         messages.warning(request, 'Você precisa completar seu cadastro como interessado em adoção para acessar suas solicitações. Preencha seus dados abaixo.')
@@ -98,18 +104,17 @@ def solicitacoes_adocao(request):
     ]
     if status_filtro and status_filtro in status_validos:
         solicitacoes = solicitacoes.filter(status=status_filtro)
-    # Paginação
-    paginator = Paginator(solicitacoes, 10)
-    page_number = request.GET.get('page')
-    solicitacoes_page = paginator.get_page(page_number)
+    # Paginação por cursor (keyset)
+    solicitacoes_page = paginar_por_cursor(request, solicitacoes, ('-data_solicitacao', '-id'), por_pagina=10)
     # Estatísticas
+    por_status = contadores.do_local(local, contadores.SOLICITACOES)
     stats = {
-        'total': SolicitacaoAdocao.objects.filter(pet__local_adocao=local).count(),
-        'pendentes': SolicitacaoAdocao.objects.filter(pet__local_adocao=local, status='pendente').count(),
-        'em_entrevista': SolicitacaoAdocao.objects.filter(pet__local_adocao=local, status='em_entrevista').count(),
-        'aprovadas': SolicitacaoAdocao.objects.filter(pet__local_adocao=local, status='entrevista_aprovada').count(),
-        'agendadas': SolicitacaoAdocao.objects.filter(pet__local_adocao=local, status='agendado').count(),
-        'concluidas': SolicitacaoAdocao.objects.filter(pet__local_adocao=local, status='concluida').count(),
+        'total': sum(por_status.values()),
+        'pendentes': por_status.get('pendente', 0),
+        'em_entrevista': por_status.get('em_entrevista', 0),
+        'aprovadas': por_status.get('entrevista_aprovada', 0),
+        'agendadas': por_status.get('agendado', 0),
+        'concluidas': por_status.get('concluida', 0),
     }
     context = {
         'solicitacoes': solicitacoes_page,
@@ -134,24 +139,26 @@ def responder_solicitacao(request, solicitacao_id):
         acao = request.POST.get('acao')
         resposta = request.POST.get('resposta', '')
         if acao in ['aprovar', 'rejeitar']:
-            solicitacao.status = 'aprovada' if acao == 'aprovar' else 'rejeitada'
-            solicitacao.resposta_local = resposta
-            solicitacao.data_resposta = timezone.now()
-            solicitacao.save()
-            # Se aprovada, marcar pet como reservado
-            if acao == 'aprovar':
-                solicitacao.pet.status = 'reservado'
-                solicitacao.pet.adotado_por = solicitacao.interessado
-                solicitacao.pet.save()
-                # Rejeitar outras solicitações para o mesmo pet
-                SolicitacaoAdocao.objects.filter(
-                    pet=solicitacao.pet,
-                    status='pendente'
-                ).exclude(id=solicitacao.id).update(
-                    status='rejeitada',
-                    resposta_local='Pet já foi reservado para outro interessado.',
-                    data_resposta=timezone.now()
-                )
+            with transaction.atomic():
+                solicitacao.status = 'aprovada' if acao == 'aprovar' else 'rejeitada'
+                solicitacao.resposta_local = resposta
+                solicitacao.data_resposta = timezone.now()
+                solicitacao.save()
+                # Se aprovada, marcar pet como reservado
+                if acao == 'aprovar':
+                    solicitacao.pet.status = 'reservado'
+                    solicitacao.pet.adotado_por = solicitacao.interessado
+                    solicitacao.pet.save()
+                    # Rejeitar outras solicitações para o mesmo pet
+                    contadores.atualizar_solicitacoes(
+                        SolicitacaoAdocao.objects.filter(
+                            pet=solicitacao.pet,
+                            status='pendente'
+                        ).exclude(id=solicitacao.id),
+                        'rejeitada',
+                        resposta_local='Pet já foi reservado para outro interessado.',
+                        data_resposta=timezone.now()
+                    )
             action_text = 'aprovada' if acao == 'aprovar' else 'rejeitada'
             messages.success(request, f'Solicitação {action_text} com sucesso!')
         else:
@@ -185,7 +192,8 @@ def agendar_entrevista(request, solicitacao_id):
                 solicitacao.local_entrevista = local_entrevista
                 solicitacao.observacoes_entrevista = observacoes
                 solicitacao.status = 'em_entrevista'
-                solicitacao.save()
+                with transaction.atomic():
+                    solicitacao.save()
                 # Enviar e-mail para o interessado sobre o agendamento da entrevista
                 assunto = f'Entrevista Agendada - Adoção de {solicitacao.pet.nome}'
                 mensagem = f"""Olá {solicitacao.interessado.usuario.first_name},\n\nSua entrevista para adoção do pet {solicitacao.pet.nome} foi agendada!\n\nData e Hora: {data_entrevista.strftime('%d/%m/%Y às %H:%M')}\nLocal: {local_entrevista}\n\nCompareça no horário marcado.\n\nAtenciosamente,\n{solicitacao.pet.local_adocao.usuario.first_name}"""
@@ -237,7 +245,8 @@ def responder_entrevista(request, solicitacao_id):
             else:
                 solicitacao.observacoes_entrevista = f"{solicitacao.observacoes_entrevista}\n\nResultado: Aprovado".strip()
             solicitacao.data_resposta = timezone.now()
-            solicitacao.save()
+            with transaction.atomic():
+                solicitacao.save()
             # Enviar e-mail de aprovação na entrevista
             assunto = f'Parabéns! Entrevista Aprovada - {solicitacao.pet.nome}'
             mensagem = f"""Olá {solicitacao.interessado.usuario.first_name},\n\nVocê foi aprovado na entrevista para adoção do {solicitacao.pet.nome}! 🎉\n\nAtenciosamente,\nEquipe Harmony Pets"""
@@ -260,7 +269,8 @@ def responder_entrevista(request, solicitacao_id):
                 solicitacao.observacoes_entrevista = f"{solicitacao.observacoes_entrevista}\n\nResultado: Rejeitado\nMotivo: {observacoes}".strip()
             solicitacao.resposta_local = observacoes
             solicitacao.data_resposta = timezone.now()
-            solicitacao.save()
+            with transaction.atomic():
+                solicitacao.save()
             # Enviar e-mail de rejeição na entrevista
             assunto = f'Resultado da Entrevista - {solicitacao.pet.nome}'
             mensagem = f"""Olá {solicitacao.interessado.usuario.first_name},\n\nAgradecemos seu interesse em adotar o {solicitacao.pet.nome}.\n\nApós análise, não foi possível aprovar sua solicitação neste momento.\n\nAtenciosamente,\nEquipe Harmony Pets"""
@@ -307,20 +317,22 @@ def agendar_retirada(request, solicitacao_id):
                 solicitacao.data_retirada = data_retirada
                 solicitacao.observacoes_retirada = observacoes
                 solicitacao.status = 'agendado'
-                solicitacao.save()
-                # Marcar pet como reservado
-                solicitacao.pet.status = 'reservado'
-                solicitacao.pet.adotado_por = solicitacao.interessado
-                solicitacao.pet.save()
-                # Rejeitar outras solicitações pendentes para o mesmo pet
-                SolicitacaoAdocao.objects.filter(
-                    pet=solicitacao.pet,
-                    status__in=['pendente', 'em_entrevista']
-                ).exclude(id=solicitacao.id).update(
-                    status='rejeitada',
-                    resposta_local='Pet já foi reservado para outro interessado.',
-                    data_resposta=timezone.now()
-                )
+                with transaction.atomic():
+                    solicitacao.save()
+                    # Marcar pet como reservado
+                    solicitacao.pet.status = 'reservado'
+                    solicitacao.pet.adotado_por = solicitacao.interessado
+                    solicitacao.pet.save()
+                    # Rejeitar outras solicitações pendentes para o mesmo pet
+                    contadores.atualizar_solicitacoes(
+                        SolicitacaoAdocao.objects.filter(
+                            pet=solicitacao.pet,
+                            status__in=['pendente', 'em_entrevista']
+                        ).exclude(id=solicitacao.id),
+                        'rejeitada',
+                        resposta_local='Pet já foi reservado para outro interessado.',
+                        data_resposta=timezone.now()
+                    )
                 # Enviar e-mail com data de retirada agendada
                 assunto = f'Retirada Agendada! Seu novo pet {solicitacao.pet.nome} te espera! 🎉'
                 mensagem = f"""Olá {solicitacao.interessado.usuario.first_name},\n\nA retirada do {solicitacao.pet.nome} foi agendada!\n\nData e Hora: {data_retirada.strftime('%d/%m/%Y às %H:%M')}\n\nAtenciosamente,\nEquipe Harmony Pets"""
@@ -406,12 +418,13 @@ def cancelar_solicitacao(request, solicitacao_id):
         solicitacao.status = 'cancelada'
         solicitacao.justificativa_cancelamento = justificativa
         solicitacao.data_cancelamento = timezone.now()
-        solicitacao.save()
-        # Se o pet estava reservado, liberar para outras solicitações
-        if solicitacao.pet.status == 'reservado' and solicitacao.pet.adotado_por == interessado:
-            solicitacao.pet.status = 'disponivel'
-            solicitacao.pet.adotado_por = None
-            solicitacao.pet.save()
+        with transaction.atomic():
+            solicitacao.save()
+            # Se o pet estava reservado, liberar para outras solicitações
+            if solicitacao.pet.status == 'reservado' and solicitacao.pet.adotado_por == interessado:
+                solicitacao.pet.status = 'disponivel'
+                solicitacao.pet.adotado_por = None
+                solicitacao.pet.save()
         # Notificar o local de adoção sobre o cancelamento
         assunto = f'Solicitação Cancelada - {solicitacao.pet.nome}'
         mensagem = f"""Olá {solicitacao.pet.local_adocao.usuario.first_name},\n\n{interessado.usuario.first_name} cancelou a solicitação de adoção do {solicitacao.pet.nome}.\n\nO pet foi liberado novamente.\n\nAtenciosamente,\nEquipe Harmony Pets"""
@@ -443,19 +456,20 @@ def historico_pet(request, pet_id):
     solicitacoes = SolicitacaoAdocao.objects.filter(pet=pet).select_related(
         'interessado__usuario'
     ).order_by('-data_solicitacao')
+    por_status = contadores.do_pet(pet)
     stats = {
-        'total': solicitacoes.count(),
-        'pendentes': solicitacoes.filter(status='pendente').count(),
-        'em_entrevista': solicitacoes.filter(status='em_entrevista').count(),
-        'aprovadas': solicitacoes.filter(status='entrevista_aprovada').count(),
-        'agendadas': solicitacoes.filter(status='agendado').count(),
-        'concluidas': solicitacoes.filter(status='concluida').count(),
-        'rejeitadas': solicitacoes.filter(status__in=['rejeitada', 'entrevista_rejeitada']).count(),
-        'canceladas': solicitacoes.filter(status='cancelada').count(),
+        'total': sum(por_status.values()),
+        'pendentes': por_status.get('pendente', 0),
+        'em_entrevista': por_status.get('em_entrevista', 0),
+        'aprovadas': por_status.get('entrevista_aprovada', 0),
+        'agendadas': por_status.get('agendado', 0),
+        'concluidas': por_status.get('concluida', 0),
+        'rejeitadas': por_status.get('rejeitada', 0) + por_status.get('entrevista_rejeitada', 0),
+        'canceladas': por_status.get('cancelada', 0),
     }
     context = {
         'pet': pet,
-        'solicitacoes': solicitacoes,
+        'solicitacoes': paginar_por_cursor(request, solicitacoes, ('-data_solicitacao', '-id'), por_pagina=10),
         'stats': stats,
     }
     return render(request, 'core/historico_pet.html', context)
@@ -486,9 +500,12 @@ def confirmar_adocao(request, solicitacao_id):
             messages.error(request, 'Não é possível confirmar a adoção. O interessado ainda não aceitou o termo de responsabilidade.')
             return redirect('core:solicitacoes_adocao')
         solicitacao.status = 'concluida'
-        solicitacao.save()
-        solicitacao.pet.status = 'adotado'
-        solicitacao.pet.save()
+        with transaction.atomic():
+            solicitacao.save()
+            solicitacao.pet.status = 'adotado'
+            solicitacao.pet.adotado_por = solicitacao.interessado
+            solicitacao.pet.data_adocao = timezone.now()
+            solicitacao.pet.save()
         assunto = f'Parabéns! Adoção Concluída - {solicitacao.pet.nome} ❤️'
         mensagem = f"""Olá {solicitacao.interessado.usuario.first_name},\n\nA adoção do {solicitacao.pet.nome} foi concluída com sucesso! 🎉\n\nDesejamos muita felicidade!\n\nAtenciosamente,\nEquipe Harmony Pets"""
         context = {
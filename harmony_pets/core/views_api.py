@@ -1,6 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
 from django.views.decorators.http import require_GET
+from . import funil, rollups
+from .models import LocalAdocao, Pet
 from .utils import obter_emoji_animal, buscar_emoji_animais, EmojiAPIError
+from .autocompletar import sugerir
+from .trigramas import CAMPOS as CAMPOS_TRIGRAMAS, sugestoes
 
 @require_GET
 def sugerir_emoji(request):
@@ -23,3 +34,129 @@ def sugerir_emoji(request):
     except EmojiAPIError as e:
         return JsonResponse({'ok': False, 'emoji': '', 'error': str(e)})
     return JsonResponse({'ok': bool(emoji_char), 'emoji': emoji_char})
+
+
+@require_GET
+def busca_aproximada_pets(request):
+    """Raças/nomes de pets disponíveis parecidos com o termo (tolerante a erros de digitação)."""
+    termo = (request.GET.get('termo') or '').strip()
+    campo = (request.GET.get('campo') or '').strip()
+    if campo and campo not in CAMPOS_TRIGRAMAS:
+        return JsonResponse({'ok': False, 'sugestoes': [], 'error': 'Campo inválido'}, status=400)
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 10)), 50))
+    except ValueError:
+        return JsonResponse({'ok': False, 'sugestoes': [], 'error': 'Limite inválido'}, status=400)
+    campos = (campo,) if campo else CAMPOS_TRIGRAMAS
+    return JsonResponse({'ok': True, 'sugestoes': sugestoes(termo, campos=campos, limite=limite)})
+
+
+@require_GET
+def autocompletar_pets(request):
+    """Conclusões de raça/nome para o prefixo digitado, das mais frequentes às menos.
+
+    Sem conclusão por prefixo (erro de digitação), recorre à busca aproximada.
+    A resposta depende só da query string, então pode ficar em caches HTTP.
+    """
+    termo = (request.GET.get('termo') or '').strip()
+    campo = (request.GET.get('campo') or '').strip()
+    if campo and campo not in CAMPOS_TRIGRAMAS:
+        return JsonResponse({'ok': False, 'sugestoes': [], 'error': 'Campo inválido'}, status=400)
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 8)), 10))
+    except ValueError:
+        return JsonResponse({'ok': False, 'sugestoes': [], 'error': 'Limite inválido'}, status=400)
+    campos = (campo,) if campo else CAMPOS_TRIGRAMAS
+    resultados = sugerir(termo, campos=campos, limite=limite) if termo else []
+    if not resultados and len(termo) >= 3:
+        resultados = [
+            {'campo': s['campo'], 'valor': s['valor'], 'quantidade': s['quantidade']}
+            for s in sugestoes(termo, campos=campos, limite=limite)
+        ]
+    resposta = JsonResponse({'ok': True, 'sugestoes': resultados})
+    patch_cache_control(resposta, public=True, max_age=getattr(settings, 'AUTOCOMPLETAR_CACHE_SEGUNDOS', 60))
+    return resposta
+
+
+def _local_do_painel(request):
+    """(local, resposta de erro) dos painéis: a equipe escolhe com ?local= (ou vê todos); um local vê só o seu."""
+    if request.user.is_staff:
+        local = request.GET.get('local') or None
+        if local is not None and not local.isdigit():
+            return None, JsonResponse({'ok': False, 'error': 'Local inválido'}, status=400)
+        return local, None
+    try:
+        return request.user.localadocao.pk, None
+    except LocalAdocao.DoesNotExist:
+        return None, JsonResponse({'ok': False, 'error': 'Acesso negado'}, status=403)
+
+
+@require_GET
+@login_required
+def series_adocao(request):
+    """Séries de adoções, solicitações, rejeições e cancelamentos para os gráficos de tendência.
+
+    Lê as tabelas consolidadas (core.rollups). A equipe vê todos os locais (ou um,
+    com ?local=); um local de adoção vê só os seus números.
+    """
+    granularidade = request.GET.get('granularidade') or 'dia'
+    if granularidade not in rollups.GRANULARIDADES:
+        return JsonResponse({'ok': False, 'error': 'Granularidade inválida'}, status=400)
+    especie = request.GET.get('especie') or None
+    if especie and especie not in dict(Pet.ESPECIES_CHOICES):
+        return JsonResponse({'ok': False, 'error': 'Espécie inválida'}, status=400)
+    local, erro = _local_do_painel(request)
+    if erro:
+        return erro
+    passo = rollups.GRANULARIDADES[granularidade][2]
+    try:
+        fim = parse_date(request.GET['fim']) if request.GET.get('fim') else timezone.localdate()
+        inicio = parse_date(request.GET['inicio']) if request.GET.get('inicio') else fim - timedelta(days=passo * 89)
+    except ValueError:
+        fim = inicio = None
+    if not fim or not inicio or inicio > fim:
+        return JsonResponse({'ok': False, 'error': 'Intervalo inválido'}, status=400)
+    # Limita o tamanho da resposta
+    inicio = max(inicio, fim - timedelta(days=passo * (getattr(settings, 'ROLLUPS_MAXIMO_PERIODOS', 400) - 1)))
+    # Consolidação só pelo comando atualizar_rollups (cron); aqui apenas se informa até quando vale
+    atualizado_ate = rollups.processado_ate()
+    dados = rollups.serie(granularidade, inicio, fim, local=local, especie=especie)
+    dados['periodos'] = [periodo.isoformat() for periodo in dados['periodos']]
+    return JsonResponse({
+        'ok': True,
+        'granularidade': granularidade,
+        'atualizado_ate': atualizado_ate.isoformat() if atualizado_ate else None,
+        'series': dados,
+    })
+
+
+@require_GET
+@login_required
+def funil_adocao(request):
+    """Funil das solicitações (conversão e p50/p90 do tempo até cada etapa), lido dos agregados mensais.
+
+    ?inicio= e ?fim= são meses (AAAA-MM) de criação das solicitações; o padrão são os últimos 12.
+    """
+    local, erro = _local_do_painel(request)
+    if erro:
+        return erro
+    def mes(parametro, padrao):
+        valor = request.GET.get(parametro)
+        return parse_date(f'{valor}-01') if valor else padrao
+
+    try:
+        fim = mes('fim', timezone.localdate().replace(day=1))
+        inicio = mes('inicio', fim and (fim - timedelta(days=335)).replace(day=1))
+    except ValueError:
+        fim = inicio = None
+    if not fim or not inicio or inicio > fim:
+        return JsonResponse({'ok': False, 'error': 'Intervalo inválido'}, status=400)
+    # Recalculado só pelo comando atualizar_funil (cron)
+    atualizado_em = funil.processado_ate()
+    return JsonResponse({
+        'ok': True,
+        'inicio': inicio.strftime('%Y-%m'),
+        'fim': fim.strftime('%Y-%m'),
+        'atualizado_em': atualizado_em.isoformat() if atualizado_em else None,
+        **funil.funil(local=local, inicio=inicio, fim=fim),
+    })
@@ -1,7 +1,10 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from .paginacao import paginar_por_cursor
 from django.contrib import messages
+from django.db import transaction
+from django.utils import timezone
+from . import contadores
 from .models import Pet, LocalAdocao
 from .forms import PetForm
 
@@ -12,21 +15,17 @@ def gerenciar_pets(request):
     except LocalAdocao.DoesNotExist:
         local = None
     pets = Pet.objects.filter(local_adocao=local, ativo=True).order_by('-data_cadastro')
-    total_pets = pets.count()
-    pets_disponiveis = pets.filter(status='disponivel').count()
-    pets_adotados = pets.filter(status='adotado').count()
-    pets_reservados = pets.filter(status='reservado').count()
-    paginator = Paginator(pets, 12)
-    page_number = request.GET.get('page')
-    pets_page = paginator.get_page(page_number)
+    # Contadores mantidos a cada mudança de status (core.contadores)
+    por_status = contadores.do_local(local, contadores.PETS)
+    pets_page = paginar_por_cursor(request, pets, ('-data_cadastro', '-id'), por_pagina=12)
     context = {
         'pets': pets_page,
         'local': local,
         'stats': {
-            'total': total_pets,
-            'disponiveis': pets_disponiveis,
-            'adotados': pets_adotados,
-            'reservados': pets_reservados,
+            'total': sum(por_status.values()),
+            'disponiveis': por_status.get('disponivel', 0),
+            'adotados': por_status.get('adotado', 0),
+            'reservados': por_status.get('reservado', 0),
         }
     }
     return render(request, 'core/gerenciar_pets.html', context)
@@ -63,7 +62,8 @@ def excluir_pet(request, pet_id):
     pet = get_object_or_404(Pet, id=pet_id, local_adocao=request.user.localadocao)
     if request.method == 'POST':
         pet.ativo = False
-        pet.save()
+        with transaction.atomic():
+            pet.save()
         messages.success(request, 'Pet excluído com sucesso!')
         return redirect('core:gerenciar_pets')
     return render(request, 'core/excluir_pet.html', {'pet': pet})
@@ -75,7 +75,13 @@ def alterar_status_pet(request, pet_id):
         novo_status = request.POST.get('status')
         if novo_status in dict(Pet.STATUS_CHOICES).keys():
             pet.status = novo_status
-            pet.save()
+            # Data da adoção alimenta as séries de tendência (core.rollups)
+            if novo_status == 'adotado':
+                pet.data_adocao = pet.data_adocao or timezone.now()
+            else:
+                pet.data_adocao = None
+            with transaction.atomic():
+                pet.save()
             messages.success(request, 'Status do pet alterado com sucesso!')
         else:
             messages.error(request, 'Status inválido!')
@@ -1,8 +1,12 @@
 from django.shortcuts import render
 from .models import Pet, InteressadoAdocao, SolicitacaoAdocao
+from .pet_snapshot import carregar_pets, snapshot
 
 def home(request):
-    pets_destaque = Pet.objects.filter(status='disponivel', ativo=True)[:6]
+    if snapshot.habilitado():
+        pets_destaque = carregar_pets(snapshot.top_k(6))
+    else:
+        pets_destaque = Pet.objects.disponiveis()[:6]
     context = {'pets_destaque': pets_destaque}
     if request.user.is_authenticated:
         try:
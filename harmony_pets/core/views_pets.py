@@ -1,23 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from .models import Pet, InteressadoAdocao, SolicitacaoAdocao
-from .utils import calcular_distancia
+from .config_maps import GOOGLE_MAPS_CONFIG
+from .mapa_clusters import ZOOM_PETS_INDIVIDUAIS, clusters_para_zoom
+from .pet_snapshot import carregar_pets, snapshot
+from .trigramas import sugestoes
+from .paginacao import paginar_por_cursor
+from .facetas import CARACTERISTICAS, DIMENSOES, contar_com_cache, filtros_da_requisicao
+from django.db.models import Q
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def _localizacao_usuario(user):
+    """Retorna (lat, lon) do perfil do usuário (interessado ou local) ou (None, None)."""
+    for perfil_attr in ('interessadoadocao', 'localadocao'):
+        perfil = getattr(user, perfil_attr, None)
+        if perfil is not None and perfil.latitude is not None and perfil.longitude is not None:
+            return perfil.latitude, perfil.longitude
+    return None, None
+
 
 def pets_list_view(request):
     mostrar_adotados = request.GET.get('adotados') == 'true'
     if mostrar_adotados and request.user.is_authenticated:
         try:
             interessado = InteressadoAdocao.objects.get(usuario=request.user)
-            solicitacoes_concluidas = SolicitacaoAdocao.objects.filter(
-                interessado=interessado,
-                status='concluida'
-            ).select_related('pet', 'pet__local_adocao')
-            pets = [solicitacao.pet for solicitacao in solicitacoes_concluidas if solicitacao.pet]
-            paginator = Paginator(pets, 12)
-            page_number = request.GET.get('page')
-            page_obj = paginator.get_page(page_number)
+            pets = Pet.objects.filter(
+                solicitacoes__interessado=interessado,
+                solicitacoes__status='concluida'
+            ).select_related('local_adocao')
+            page_obj = paginar_por_cursor(request, pets, ('-data_cadastro', '-id'), por_pagina=12)
             context = {
                 'page_obj': page_obj,
                 'mostrar_adotados': True,
@@ -28,7 +46,7 @@ def pets_list_view(request):
             return render(request, 'core/pets_list.html', context)
         except InteressadoAdocao.DoesNotExist:
             pass
-    pets = Pet.objects.filter(status='disponivel', ativo=True).select_related('local_adocao')
+    pets = Pet.objects.disponiveis().select_related('local_adocao')
     mostrar_proximos = request.GET.get('proximos') == 'true'
     user_lat = None
     user_lon = None
@@ -37,31 +55,91 @@ def pets_list_view(request):
     porte = request.GET.get('porte')
     sexo = request.GET.get('sexo')
     search = request.GET.get('search')
-    if especie:
-        pets = [pet for pet in pets if pet.especie == especie] if mostrar_proximos else pets.filter(especie=especie)
-    if porte:
-        pets = [pet for pet in pets if pet.porte == porte] if mostrar_proximos else pets.filter(porte=porte)
-    if sexo:
-        pets = [pet for pet in pets if pet.sexo == sexo] if mostrar_proximos else pets.filter(sexo=sexo)
-    paginator = Paginator(pets, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    filtros = filtros_da_requisicao(request.GET)
+    sugestoes_busca = []
+    if search:
+        # Índice textual (tsvector/GIN ou FTS5); sem o filtro de proximidade, ordena por relevância
+        encontrados = pets.buscar(search)
+        if not encontrados.filter(**filtros).exists():
+            # Nada encontrado: tenta raças/nomes parecidos (erros de digitação, sinônimos)
+            sugestoes_busca = sugestoes(search, limite=5)
+            filtro = Q(pk__in=[])
+            for sugestao in sugestoes_busca:
+                filtro |= Q(**{sugestao['campo']: sugestao['valor']})
+            encontrados = pets.filter(filtro)
+        pets = encontrados
+    raio_km = GOOGLE_MAPS_CONFIG['max_distance_km']
+    if mostrar_proximos and request.user.is_authenticated:
+        user_lat, user_lon = _localizacao_usuario(request.user)
+    if user_lat is not None:
+        pets = pets.with_distance(user_lat, user_lon, raio_km)
+    # Contagens de todas as facetas em uma consulta (agregação condicional), em cache
+    # até a próxima alteração de pet; busca e raio restringem a base das contagens
+    localizacao = (round(user_lat, 3), round(user_lon, 3), raio_km) if user_lat is not None else None
+    facetas = contar_com_cache(pets, filtros, (search or '', localizacao))
+    pets = pets.filter(**filtros)
+    if user_lat is not None:
+        # Raio (índice geo_cell + retângulo), distância e ordenação no banco
+        ordenacao = ('distancia', '-data_cadastro', 'id')
+    elif search and not sugestoes_busca:
+        ordenacao = ('-relevancia', '-data_cadastro', 'id')
+    else:
+        ordenacao = ('-data_cadastro', '-id')
+    # Keyset sobre a mesma consulta preguiçosa: páginas profundas custam como a primeira
+    page_obj = paginar_por_cursor(request, pets, ordenacao, por_pagina=12)
+    if user_lat is not None:
+        pets_com_distancia = {pet.id: round(pet.distancia, 1) for pet in page_obj}
     context = {
         'page_obj': page_obj,
         'especie_atual': especie,
         'porte_atual': porte,
         'sexo_atual': sexo,
         'search_atual': search,
+        'sugestoes_busca': sugestoes_busca,
         'mostrar_proximos': mostrar_proximos,
         'tem_localizacao': user_lat is not None,
         'pets_com_distancia': pets_com_distancia,
+        'raio_km': raio_km,
         'especies_choices': Pet.ESPECIES_CHOICES,
         'portes_choices': Pet.PORTES_CHOICES,
         'sexos_choices': Pet.SEXOS_CHOICES,
+        'facetas': _opcoes_facetas(request.GET, facetas, filtros),
     }
     return render(request, 'core/pets_list.html', context)
 
 
+def _opcoes_facetas(params, contagens, filtros):
+    """Opções de filtro com contagem e link (mantendo os demais parâmetros) para o template."""
+    def link(**alteracoes):
+        copia = params.copy()
+        # Filtro novo recomeça da primeira página: o cursor é posição na listagem anterior
+        copia.pop('page', None)
+        copia.pop('cursor', None)
+        for campo, valor in alteracoes.items():
+            if valor is None:
+                copia.pop(campo, None)
+            else:
+                copia[campo] = valor
+        return '?' + copia.urlencode()
+
+    opcoes = {'total': contagens['total']}
+    for dimensao, choices in DIMENSOES.items():
+        opcoes[dimensao] = {
+            'todas_url': link(**{dimensao: None}),
+            'opcoes': [
+                {'valor': valor, 'rotulo': rotulo, 'quantidade': contagens[dimensao][valor],
+                 'ativo': filtros.get(dimensao) == valor, 'url': link(**{dimensao: valor})}
+                for valor, rotulo in choices
+            ],
+        }
+    opcoes['caracteristicas'] = [
+        {'valor': valor, 'rotulo': rotulo, 'quantidade': contagens['caracteristicas'][valor],
+         'ativo': valor in filtros, 'url': link(**{valor: None if valor in filtros else '1'})}
+        for valor, rotulo in CARACTERISTICAS
+    ]
+    return opcoes
+
+
 def pet_detail_view(request, pet_id):
     pet = get_object_or_404(Pet, id=pet_id)
     interessado = None
@@ -82,36 +160,180 @@ def pet_detail_view(request, pet_id):
 
 @login_required
 def pets_proximos(request):
-    pets = Pet.objects.filter(status='disponivel', ativo=True).select_related('local_adocao')
-    user_lat = request.user.profile.latitude
-    user_lon = request.user.profile.longitude
+    user_lat, user_lon = _localizacao_usuario(request.user)
     distancia_maxima = 5  # em quilômetros
+    if user_lat is None:
+        return render(request, 'core/pets_proximos.html', {'sem_localizacao': True, 'tem_localizacao': False})
 
-    # Filtrar pets por proximidade
-    pets_proximos = []
-    for pet in pets:
-        distancia = calcular_distancia(user_lat, user_lon, pet.local_adocao.latitude, pet.local_adocao.longitude)
-        if distancia <= distancia_maxima:
-            pets_proximos.append(pet)
-
-    paginator = Paginator(pets_proximos, 12)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if snapshot.habilitado():
+        # Raio e ordenação resolvidos no instantâneo em memória; o banco só carrega a página
+        paginator = Paginator(snapshot.no_raio(user_lat, user_lon, distancia_maxima), 12)
+        page_obj = paginator.get_page(page_number)
+        distancias = dict(page_obj.object_list)
+        pets = carregar_pets(list(distancias))
+    else:
+        # Filtro por raio, ordenação e paginação acontecem no banco (índice geo_cell + Haversine)
+        pets = Pet.objects.disponiveis().with_distance(user_lat, user_lon, distancia_maxima).select_related('local_adocao').order_by('distancia', 'id')
+        paginator = Paginator(pets, 12)
+        page_obj = paginator.get_page(page_number)
+        pets = list(page_obj)
+        distancias = {pet.id: pet.distancia for pet in pets}
+    pets_proximos = [
+        {'pet': pet, 'distancia': round(distancias[pet.id], 2), 'local': pet.local_adocao}
+        for pet in pets
+    ]
     context = {
         'page_obj': page_obj,
+        'pets_proximos': pets_proximos,
+        'total_encontrados': paginator.count,
         'tem_localizacao': True,
     }
     return render(request, 'core/pets_proximos.html', context)
 
 
+def _pet_mapa(pet, distancia=None):
+    item = {
+        'id': pet['id'],
+        'nome': pet['nome'],
+        'latitude': pet['lat_efetiva'],
+        'longitude': pet['lon_efetiva'],
+    }
+    if distancia is not None:
+        item['distancia'] = round(distancia, 2)
+    return item
+
+
+def _parametros_mapa(params):
+    """Lê zoom, viewport (north/south/east/west) e since/since_id; ValueError se algum for inválido.
+
+    `since` volta como o par (instante, id) do ponto de sincronização.
+    """
+    zoom = None
+    if 'zoom' in params:
+        zoom = max(0, min(21, int(params['zoom'])))
+    viewport = None
+    limites = [params.get(nome) for nome in ('south', 'north', 'west', 'east')]
+    if any(limites):
+        if not all(limites):
+            raise ValueError('Informe north, south, east e west')
+        sul, norte, oeste, leste = (float(valor) for valor in limites)
+        if sul > norte:
+            raise ValueError('south maior que north')
+        viewport = (sul, norte, oeste, leste)
+    since = None
+    if params.get('since'):
+        since = parse_datetime(params['since'])
+        if since is None:
+            raise ValueError('since deve estar no formato ISO 8601')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        since = (since, int(params.get('since_id') or 0))
+    return zoom, viewport, since
+
+
 def pets_mapa_api(request):
-    pets = Pet.objects.filter(status='disponivel', ativo=True).select_related('local_adocao')
-    pets_data = []
-    for pet in pets:
-        pets_data.append({
-            'id': pet.id,
-            'nome': pet.nome,
-            'latitude': pet.local_adocao.latitude,
-            'longitude': pet.local_adocao.longitude,
-        })
+    limite = GOOGLE_MAPS_CONFIG['max_pets_display']
+    try:
+        zoom, viewport, since = _parametros_mapa(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': f'Parâmetros inválidos: {e}'}, status=400)
+    if zoom is not None and zoom < ZOOM_PETS_INDIVIDUAIS:
+        precisao, clusters = clusters_para_zoom(zoom, limite, viewport)
+        return JsonResponse({'zoom': zoom, 'tipo': 'clusters', 'precisao': precisao, 'clusters': clusters})
+    if zoom is not None or viewport is not None or since is not None:
+        dados = _sincronizar_mapa(viewport, since, limite)
+        if zoom is not None:
+            dados = {'zoom': zoom, 'tipo': 'pets', **dados}
+        return JsonResponse(dados)
+
+    pets = Pet.objects.disponiveis()
+    campos = ['id', 'nome', 'lat_efetiva', 'lon_efetiva']
+    try:
+        lat = float(request.GET['lat'])
+        lon = float(request.GET['lon'])
+        raio = float(request.GET.get('raio', GOOGLE_MAPS_CONFIG['max_distance_km']))
+    except (KeyError, ValueError):
+        lat = lon = None
+    if lat is not None and snapshot.habilitado():
+        distancias = dict(snapshot.no_raio(lat, lon, raio)[:limite])
+        pets = pets.com_coordenadas().filter(id__in=list(distancias))
+        pets_data = [_pet_mapa(pet, distancias[pet['id']]) for pet in pets.values(*campos)]
+        pets_data.sort(key=lambda item: (item['distancia'], item['id']))
+        return JsonResponse(pets_data, safe=False)
+    if lat is not None:
+        pets = pets.with_distance(lat, lon, raio).order_by('distancia', 'id')
+        campos.append('distancia')
+    else:
+        pets = pets.com_coordenadas().filter(lat_efetiva__isnull=False).order_by('-data_cadastro', 'id')
+    pets_data = [_pet_mapa(pet, pet.get('distancia')) for pet in pets.values(*campos)[:limite]]
     return JsonResponse(pets_data, safe=False)
+
+
+def _no_viewport(pet, viewport):
+    """Mesmo critério de PetQuerySet.no_retangulo, para uma linha já lida."""
+    latitude, longitude = pet['lat_efetiva'], pet['lon_efetiva']
+    if latitude is None or longitude is None:
+        return False
+    if viewport is None:
+        return True
+    sul, norte, oeste, leste = viewport
+    if not sul <= latitude <= norte:
+        return False
+    if oeste > leste:
+        return longitude >= oeste or longitude <= leste
+    return oeste <= longitude <= leste
+
+
+def _sincronizar_mapa(viewport, since, limite):
+    """Pets do viewport (no máximo `limite`) e, com `since`, apenas o que mudou desde então.
+
+    O ponto de sincronização é o par (`sincronizado_em`, `sincronizado_id`), porque
+    várias linhas podem ter o mesmo updated_at (LocalAdocao.atualizar_celula_dos_pets
+    grava um único instante para todos os pets do local). No modo incremental, todo pet
+    alterado que não está disponível, perdeu as coordenadas ou saiu do viewport volta em
+    `removidos`. Se as alterações passarem do limite, `completo` é False e o par aponta a
+    última linha enviada; senão, recua MAPA_SINCRONIA_MARGEM_SEGUNDOS a partir de agora.
+    """
+    margem = timedelta(seconds=getattr(settings, 'MAPA_SINCRONIA_MARGEM_SEGUNDOS', 60))
+    ponto, ponto_id = timezone.now() - margem, 0
+    campos = ('id', 'nome', 'lat_efetiva', 'lon_efetiva', 'especie')
+    if since is None:
+        pets = Pet.objects.no_retangulo(*viewport) if viewport else Pet.objects.com_coordenadas()
+        disponiveis = pets.filter(lat_efetiva__isnull=False).disponiveis()
+        total = disponiveis.count()
+        linhas = disponiveis.order_by('-data_cadastro', 'id').values(*campos)[:limite]
+        return {
+            'total': total,
+            'completo': total <= limite,
+            'sincronizado_em': ponto.isoformat(),
+            'sincronizado_id': ponto_id,
+            'pets': [dict(_pet_mapa(pet), especie=pet['especie']) for pet in linhas],
+            'removidos': [],
+        }
+
+    # Sem filtro de viewport: quem saiu dele também precisa ser informado
+    desde, desde_id = since
+    linhas = list(
+        Pet.objects.com_coordenadas()
+        .filter(Q(updated_at__gt=desde) | Q(updated_at=desde, id__gt=desde_id))
+        .order_by('updated_at', 'id')
+        .values(*campos, 'status', 'ativo', 'updated_at')[:limite + 1]
+    )
+    completo = len(linhas) <= limite
+    if not completo:
+        linhas = linhas[:limite]
+        ponto, ponto_id = linhas[-1]['updated_at'], linhas[-1]['id']
+    pets_data, removidos = [], []
+    for pet in linhas:
+        if pet['status'] == 'disponivel' and pet['ativo'] and _no_viewport(pet, viewport):
+            pets_data.append(dict(_pet_mapa(pet), especie=pet['especie']))
+        else:
+            removidos.append(pet['id'])
+    return {
+        'completo': completo,
+        'sincronizado_em': ponto.isoformat(),
+        'sincronizado_id': ponto_id,
+        'pets': pets_data,
+        'removidos': removidos,
+    }
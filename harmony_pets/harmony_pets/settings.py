@@ -174,6 +174,18 @@ else:
         }
     }
 
+# Cache fora do banco: facetas (core.facetas) e indicadores (core.kpis) existem para poupar
+# consultas. O padrão é a memória de cada processo, e então a invalidação das facetas só
+# alcança o processo que alterou o pet (os demais esperam o FACETAS_PETS_TTL). Com vários
+# workers, CACHE_BACKEND/CACHE_LOCATION apontam para um cache compartilhado, ex.:
+# django.core.cache.backends.redis.RedisCache e redis://127.0.0.1:6379/1.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -246,10 +258,12 @@ LOGGING = {
     'handlers': {
         'app_file': {
             'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
+            # Backups comprimidos (app.log.1.gz) com índice lateral para a busca do admin_logs
+            'class': 'core.indice_logs.ArquivoRotativoIndexado',
             'filename': os.path.join(LOG_DIR, 'app.log'),
             'maxBytes': 1024*1024*5,  # 5MB
             'backupCount': 3,
+            'compactar': True,
             'formatter': 'verbose',
             'encoding': 'utf-8',
         },
@@ -271,3 +285,82 @@ LOGGING = {
 # Política de exclusão de conta (tornar opcional via ambiente)
 # Quando False, a exclusão de conta é desativada para os usuários finais.
 ACCOUNT_DELETION_ENABLED = os.environ.get('ACCOUNT_DELETION_ENABLED', 'True') == 'True'
+
+# Instantâneo em memória dos pets disponíveis (core.pet_snapshot) usado por home,
+# pets próximos e API do mapa. Opcional, ligado por implantação; desligado, tudo vem do banco
+PET_SNAPSHOT_ENABLED = os.environ.get('PET_SNAPSHOT_ENABLED', 'False') == 'True'
+# Reconstrução completa periódica (segundos), limitando a defasagem entre processos; também
+# é a idade máxima da versão publicada usada com PET_SNAPSHOT_MMAP
+PET_SNAPSHOT_TTL = int(os.environ.get('PET_SNAPSHOT_TTL', '300'))
+# Instantâneo compartilhado entre workers: `python manage.py publicar_snapshot_pets`
+# grava versões .npy em PET_SNAPSHOT_DIR e cada processo as mapeia somente leitura.
+PET_SNAPSHOT_MMAP = os.environ.get('PET_SNAPSHOT_MMAP', 'False') == 'True'
+PET_SNAPSHOT_DIR = Path(os.environ.get('PET_SNAPSHOT_DIR', BASE_DIR / 'snapshots'))
+# Republica o arquivo após cada alteração de Pet/LocalAdocao (uma vez por transação)
+PET_SNAPSHOT_PUBLICAR_AO_SALVAR = os.environ.get('PET_SNAPSHOT_PUBLICAR_AO_SALVAR', 'False') == 'True'
+
+# Pirâmide de clusters da API do mapa (core.mapa_clusters), em memória por processo.
+# Opcional, ligada por implantação; desligada, o banco agrega por zoom
+MAPA_PIRAMIDE_ENABLED = os.environ.get('MAPA_PIRAMIDE_ENABLED', 'False') == 'True'
+MAPA_PIRAMIDE_TTL = int(os.environ.get('MAPA_PIRAMIDE_TTL', '300'))
+# Sincronização incremental do mapa: o ponto devolvido recua estes segundos para não perder
+# alterações de transações que ainda estavam abertas na leitura (reenvios são inofensivos)
+MAPA_SINCRONIA_MARGEM_SEGUNDOS = int(os.environ.get('MAPA_SINCRONIA_MARGEM_SEGUNDOS', '60'))
+
+# Geocodificação (core.geocoding): validade do cache persistente, tempo limite
+# (conexão, leitura) das chamadas ao Google e fallback pela tabela local de centroides.
+GEOCODE_CACHE_TTL_DIAS = int(os.environ.get('GEOCODE_CACHE_TTL_DIAS', '90'))
+GEOCODE_CACHE_TTL_NEGATIVO_HORAS = int(os.environ.get('GEOCODE_CACHE_TTL_NEGATIVO_HORAS', '24'))
+GEOCODE_TIMEOUT = (3.05, float(os.environ.get('GEOCODE_TIMEOUT', '5')))
+GEOCODE_OFFLINE_FALLBACK = os.environ.get('GEOCODE_OFFLINE_FALLBACK', 'True') == 'True'
+
+# Índice de trigramas em memória (core.trigramas) da busca aproximada fora do Postgres,
+# que usa pg_trgm. Opcional, ligado por implantação; desligado, a busca vira um icontains sem tolerância a erros
+BUSCA_TRIGRAMAS_ENABLED = os.environ.get('BUSCA_TRIGRAMAS_ENABLED', 'False') == 'True'
+BUSCA_TRIGRAMAS_TTL = int(os.environ.get('BUSCA_TRIGRAMAS_TTL', '300'))
+
+# Trie de prefixos do autocompletar de raça/nome (core.autocompletar), em memória por processo.
+# Opcional, ligada por implantação; desligada, cada consulta agrupa no banco
+AUTOCOMPLETAR_ENABLED = os.environ.get('AUTOCOMPLETAR_ENABLED', 'False') == 'True'
+AUTOCOMPLETAR_TTL = int(os.environ.get('AUTOCOMPLETAR_TTL', '300'))
+# Validade (segundos) das respostas do autocompletar em caches HTTP
+AUTOCOMPLETAR_CACHE_SEGUNDOS = int(os.environ.get('AUTOCOMPLETAR_CACHE_SEGUNDOS', '60'))
+
+# Validade (segundos) das contagens por faceta da listagem de pets (core.facetas);
+# qualquer alteração de pet as invalida antes disso (em todos os processos se CACHES for compartilhado)
+FACETAS_PETS_TTL = int(os.environ.get('FACETAS_PETS_TTL', '300'))
+
+# Instantâneo dos indicadores do admin_dashboard (core.kpis): validade no cache e
+# intervalo mínimo (segundos) entre recálculos pedidos pelo botão "Atualizar"
+ADMIN_KPIS_TTL = int(os.environ.get('ADMIN_KPIS_TTL', '60'))
+ADMIN_KPIS_INTERVALO_MINIMO = int(os.environ.get('ADMIN_KPIS_INTERVALO_MINIMO', '5'))
+
+# Séries consolidadas de adoções (core.rollups): consolidadas só pelo comando
+# `atualizar_rollups` (cron); a API lê as tabelas e informa até quando valem
+ROLLUPS_MAXIMO_PERIODOS = int(os.environ.get('ROLLUPS_MAXIMO_PERIODOS', '400'))
+
+# Funil de adoção (core.funil): recalculado só pelo comando `atualizar_funil` (cron); a
+# margem cobre transições gravadas por transações que ainda estavam abertas na leitura anterior
+FUNIL_MARGEM_SEGUNDOS = int(os.environ.get('FUNIL_MARGEM_SEGUNDOS', '60'))
+
+# Gravação do AuditLog (core.auditoria): em lote numa thread, fora da requisição.
+# Registros além de AUDITLOG_FILA_MAXIMA pendentes são descartados (e contados);
+# opcional, ligada por implantação; desligada, cada registro é gravado na hora
+AUDITLOG_ASYNC = os.environ.get('AUDITLOG_ASYNC', 'False') == 'True'
+AUDITLOG_FILA_MAXIMA = int(os.environ.get('AUDITLOG_FILA_MAXIMA', '10000'))
+AUDITLOG_LOTE = int(os.environ.get('AUDITLOG_LOTE', '200'))
+AUDITLOG_INTERVALO = float(os.environ.get('AUDITLOG_INTERVALO', '2.0'))
+
+# Retenção do AuditLog (core.retencao_auditoria, comando `prune_auditlog`): dias guardados
+# para as respostas até 3xx e para as 4xx/5xx (0 = para sempre). A poda apaga em
+# lotes de AUDITLOG_PODA_LOTE com uma pausa entre eles; no Postgres a tabela é particionada
+# por mês e o comando também cria as partições dos próximos meses
+AUDITLOG_RETENCAO_DIAS = int(os.environ.get('AUDITLOG_RETENCAO_DIAS', '180'))
+AUDITLOG_RETENCAO_ERROS_DIAS = int(os.environ.get('AUDITLOG_RETENCAO_ERROS_DIAS', '365'))
+AUDITLOG_PODA_LOTE = int(os.environ.get('AUDITLOG_PODA_LOTE', '1000'))
+AUDITLOG_PODA_PAUSA = float(os.environ.get('AUDITLOG_PODA_PAUSA', '0.05'))
+AUDITLOG_PODA_LOCK_TIMEOUT = os.environ.get('AUDITLOG_PODA_LOCK_TIMEOUT', '2s')
+AUDITLOG_PARTICOES_A_FRENTE = int(os.environ.get('AUDITLOG_PARTICOES_A_FRENTE', '3'))
+
+# Exportações do admin (core.exportacao): registros lidos do banco por bloco
+EXPORTACAO_CHUNK = int(os.environ.get('EXPORTACAO_CHUNK', '2000'))
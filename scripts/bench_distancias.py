@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Microbenchmark do cálculo de distâncias (Haversine): escalar x lote (NumPy).
+
+LOCALIZAÇÃO: harmony-pets-system/scripts/bench_distancias.py
+
+COMO EXECUTAR (da raiz do projeto):
+    python scripts/bench_distancias.py
+    python scripts/bench_distancias.py --tamanhos 1000 100000 1000000 --repeticoes 3
+
+Compara, para cada quantidade de pontos:
+- laço com `calcular_distancia` (uma chamada por ponto, como as views faziam)
+- `calcular_distancias` em Python puro (fallback sem NumPy)
+- `calcular_distancias` vetorizado com NumPy
+
+DEPENDÊNCIAS:
+- Não precisa de banco de dados nem de settings do Django
+- NumPy (opcional; sem ele apenas as versões em Python puro são medidas)
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'harmony_pets'))
+
+from core import utils  # noqa: E402
+
+
+def medir(func, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    origem = (-23.55052, -46.633308)
+    print(f"NumPy: {'disponível ' + utils.np.__version__ if utils.np is not None else 'indisponível'}")
+    print(f"{'pontos':>10} | {'escalar (s)':>12} | {'lote puro (s)':>13} | {'lote NumPy (s)':>14} | {'ganho':>7}")
+    for n in args.tamanhos:
+        lats = [rnd.uniform(-33.7, 5.2) for _ in range(n)]
+        lons = [rnd.uniform(-73.9, -34.8) for _ in range(n)]
+
+        t_escalar = medir(lambda: [utils.calcular_distancia(origem[0], origem[1], la, lo) for la, lo in zip(lats, lons)], args.repeticoes)
+
+        np_original = utils.np
+        utils.np = None
+        try:
+            t_puro = medir(lambda: utils.calcular_distancias(origem[0], origem[1], lats, lons), args.repeticoes)
+        finally:
+            utils.np = np_original
+
+        if utils.np is not None:
+            arr_lats = utils.np.asarray(lats)
+            arr_lons = utils.np.asarray(lons)
+            t_numpy = medir(lambda: utils.calcular_distancias(origem[0], origem[1], arr_lats, arr_lons), args.repeticoes)
+            ganho = f"{t_escalar / t_numpy:6.1f}x"
+            t_numpy_txt = f"{t_numpy:14.4f}"
+        else:
+            ganho = '     -'
+            t_numpy_txt = f"{'-':>14}"
+        print(f"{n:>10} | {t_escalar:12.4f} | {t_puro:13.4f} | {t_numpy_txt} | {ganho:>7}")
+
+
+if __name__ == '__main__':
+    main()